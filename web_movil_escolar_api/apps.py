@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class WebMovilEscolarApiConfig(AppConfig):
+    name = 'web_movil_escolar_api'
+
+    def ready(self):
+        # Registra los receivers de señales (índices, caches y contadores)
+        from web_movil_escolar_api import signals  # noqa: F401
@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+
+# Caches locales registrados, para exponer sus estadísticas
+registry = {}
+
+
+def all_stats():
+    return [local_cache.stats() for local_cache in registry.values()]
+
+
+class Generation:
+    """
+    Contador de generación compartido a través del cache de Django.
+
+    Los índices y caches en memoria de cada proceso guardan la generación con
+    la que se construyeron; cuando otro proceso registra un cambio, la
+    generación compartida avanza y el índice local sabe que debe
+    reconstruirse. Con el LocMemCache por defecto la generación es local al
+    proceso; en producción conviene configurar un cache compartido.
+    """
+
+    def __init__(self, name):
+        self.key = f'generation:{name}'
+
+    def current(self):
+        value = cache.get(self.key)
+        if value is None:
+            cache.add(self.key, 1, None)
+            value = cache.get(self.key, 1)
+        return value
+
+    def bump(self):
+        try:
+            return cache.incr(self.key)
+        except ValueError:
+            cache.add(self.key, 1, None)
+            return cache.incr(self.key)
+
+    @staticmethod
+    def current_many(generations):
+        """Valores de varias generaciones con una sola lectura (get_many)"""
+        values = cache.get_many([generation.key for generation in generations])
+        return tuple(
+            values[generation.key] if values.get(generation.key) is not None else generation.current()
+            for generation in generations
+        )
+
+
+
+class ChangeLog:
+    """
+    Generación compartida más los ids que cambiaron en cada generación.
+
+    record(ids) avanza la generación y guarda esos ids en el cache
+    (`changes:{name}:{generación}`). Un proceso cuyo índice en memoria quedó
+    en una generación anterior lee con un solo get_many lo registrado desde
+    entonces (since) y vuelve a leer de la base solo esos ids, en lugar de
+    reconstruir el índice completo. Si falta alguna entrada (expiró, se
+    avanzó con bump() sin registrar ids o son más de max_entries), since
+    regresa None y el índice se reconstruye.
+    """
+
+    def __init__(self, name, max_entries=1000, timeout=3600):
+        self.name = name
+        self.generation = Generation(name)
+        self.max_entries = max_entries
+        self.timeout = timeout
+
+    def _key(self, generation):
+        return f'changes:{self.name}:{generation}'
+
+    def current(self):
+        return self.generation.current()
+
+    def bump(self):
+        """Avanza sin registrar ids: los demás procesos reconstruyen completo"""
+        return self.generation.bump()
+
+    def record(self, ids):
+        generation = self.generation.bump()
+        cache.set(self._key(generation), list(ids), self.timeout)
+        return generation
+
+    def since(self, generation, current):
+        """Ids que cambiaron después de `generation` y hasta `current`, o None"""
+        if current < generation or current - generation > self.max_entries:
+            return None
+        keys = [self._key(n) for n in range(generation + 1, current + 1)]
+        entries = cache.get_many(keys) if keys else {}
+        if len(entries) < len(keys):
+            return None
+        return {pk for ids in entries.values() for pk in ids}
+
+
+class LRUCache:
+    """
+    Cache local al proceso con desalojo LRU y expiración opcional (TTL).
+
+    Es seguro entre hilos y lleva contadores de aciertos, fallos,
+    desalojos y expiraciones que se exponen en /api/cache-stats/.
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        registry[name] = self
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires, value = item
+            if expires is not None and expires <= time.monotonic():
+                del self.data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self.lock:
+            self.data[key] = (expires, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            return self.data.pop(key, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self.data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / requests, 4) if requests else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
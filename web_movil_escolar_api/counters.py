@@ -0,0 +1,78 @@
+import hashlib
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from web_movil_escolar_api.models import *
+
+# Modelo del perfil de cada rol
+ROLE_MODELS = {
+    'admins': Administradores,
+    'maestros': Maestros,
+    'alumnos': Alumnos,
+}
+
+
+def count_role(role):
+    return ROLE_MODELS[role].objects.filter(user__is_active=True).count()
+
+
+def reconcile():
+    """Recalcula los tres totales desde la base de datos y los guarda"""
+    totals = {role: count_role(role) for role in ROLE_MODELS}
+    with transaction.atomic():
+        for role, total in totals.items():
+            TotalUsuarios.objects.update_or_create(rol=role, defaults={'total': total})
+    return totals
+
+
+def get_totals():
+    """
+    Totales de usuarios activos por rol. Se leen de la tabla TotalUsuarios en
+    una sola consulta (compartida por todos los procesos); solo los roles que
+    todavía no tienen fila se cuentan en la base.
+    """
+    totals = dict(TotalUsuarios.objects.filter(rol__in=ROLE_MODELS).values_list('rol', 'total'))
+    for role in ROLE_MODELS:
+        if role not in totals:
+            total = count_role(role)
+            TotalUsuarios.objects.get_or_create(rol=role, defaults={'total': total})
+            totals[role] = total
+    return {role: totals[role] for role in ROLE_MODELS}
+
+
+def request_totals(request):
+    # condition() pide el ETag antes de la vista: se leen una vez por petición
+    if '_total_usuarios' not in request.__dict__:
+        request.__dict__['_total_usuarios'] = get_totals()
+    return request.__dict__['_total_usuarios']
+
+
+def etag_for(totals):
+    payload = ','.join(f'{role}={totals[role]}' for role in ROLE_MODELS)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def adjust(role, delta):
+    # En la misma transacción que el cambio; si la fila no existe no hay nada
+    # que ajustar: la siguiente lectura cuenta
+    TotalUsuarios.objects.filter(rol=role).update(total=F('total') + delta, updated_at=timezone.now())
+
+
+def adjust_user(user_id, delta):
+    """Ajusta los totales de los roles en los que el usuario tiene perfil (activación)"""
+    for role, model in ROLE_MODELS.items():
+        profiles = model.objects.filter(user_id=user_id).count()
+        if profiles:
+            adjust(role, delta * profiles)
+
+
+def invalidate_after_commit():
+    # Recuento completo: solo cuando no se sabe qué cambió
+    transaction.on_commit(reconcile)
+
+
+def role_for_model(model):
+    for role, role_model in ROLE_MODELS.items():
+        if role_model is model:
+            return role
+    return None
@@ -1,28 +1,98 @@
 import base64
-from cryptography.fernet import Fernet, InvalidToken
+import functools
+import hashlib
+import hmac
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from django.conf import settings
 
+
+@functools.lru_cache(maxsize=32)
+def _derive_fernet(password, salt, iterations):
+    # PBKDF2 es lento a propósito: se deriva una vez por (contraseña, sal)
+    key = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations, backend=default_backend()).derive(password)
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+@functools.lru_cache(maxsize=8)
+def _multi_fernet(passwords, salt, iterations):
+    return MultiFernet([_derive_fernet(password, salt, iterations) for password in passwords])
+
+
+@functools.lru_cache(maxsize=4)
+def _index_key(secret, salt, iterations):
+    return PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt + b':indice', iterations=iterations, backend=default_backend()).derive(secret)
+
+
 class CypherUtils:
+    """
+    Cifrado Fernet con llave derivada de settings.CRYPTO_PASSWORD.
+
+    Para rotar la llave se pone la nueva en CRYPTO_PASSWORD y la anterior en
+    CRYPTO_OLD_PASSWORDS: se cifra siempre con la nueva y se descifra con
+    cualquiera; `rota`/`rota_many` vuelven a cifrar con la nueva.
+    """
+
+    @staticmethod
+    def _salt():
+        return getattr(settings, 'CRYPTO_SALT', 'hdjk').encode('utf-8')
+
+    @staticmethod
+    def _iterations():
+        return getattr(settings, 'CRYPTO_ITERATIONS', 1000)
+
+    @staticmethod
+    def keyring():
+        """MultiFernet con la llave actual primero y después las anteriores"""
+        passwords = (settings.CRYPTO_PASSWORD,) + tuple(getattr(settings, 'CRYPTO_OLD_PASSWORDS', ()))
+        return _multi_fernet(tuple(p.encode('utf-8') for p in passwords), CypherUtils._salt(), CypherUtils._iterations())
 
     @staticmethod
     def encripta(plaintext):
-        password = settings.CRYPTO_PASSWORD
-        enc_bytes =  CypherUtils.encrypt1(plaintext.encode('utf-8'), password.encode('utf-8'))
-        return enc_bytes.decode('utf-8')
+        return CypherUtils.keyring().encrypt(plaintext.encode('utf-8')).decode('utf-8')
 
     @staticmethod
     def desencripta(cyphertext):
-        password = settings.CRYPTO_PASSWORD
-        denc_bytes =  CypherUtils.decrypt1(cyphertext.encode('utf-8'), password.encode('utf-8'))
-        return denc_bytes.decode('utf-8')
+        return CypherUtils.keyring().decrypt(cyphertext.encode('utf-8')).decode('utf-8')
+
+    @staticmethod
+    def encripta_many(plaintexts):
+        """Cifra una lista de textos con una sola llave; None se conserva"""
+        keyring = CypherUtils.keyring()
+        return [None if p is None else keyring.encrypt(p.encode('utf-8')).decode('utf-8') for p in plaintexts]
+
+    @staticmethod
+    def desencripta_many(cyphertexts):
+        keyring = CypherUtils.keyring()
+        return [None if c is None else keyring.decrypt(c.encode('utf-8')).decode('utf-8') for c in cyphertexts]
+
+    @staticmethod
+    def rota(cyphertext):
+        """Vuelve a cifrar con la llave actual un texto cifrado con una anterior"""
+        return CypherUtils.keyring().rotate(cyphertext.encode('utf-8')).decode('utf-8')
+
+    @staticmethod
+    def rota_many(cyphertexts):
+        keyring = CypherUtils.keyring()
+        return [None if c is None else keyring.rotate(c.encode('utf-8')).decode('utf-8') for c in cyphertexts]
+
+    @staticmethod
+    def indice_ciego(value):
+        """
+        HMAC-SHA256 del valor normalizado (sin espacios, en mayúsculas) con una
+        llave propia (CRYPTO_INDEX_KEY): permite buscar por igualdad un campo
+        cifrado sin descifrarlo. No cambia al rotar CRYPTO_PASSWORD.
+        """
+        if value is None:
+            return None
+        key = _index_key(settings.CRYPTO_INDEX_KEY.encode('utf-8'), CypherUtils._salt(), CypherUtils._iterations())
+        return hmac.new(key, str(value).strip().upper().encode('utf-8'), hashlib.sha256).hexdigest()
 
     @staticmethod
-    def cipherFernet(password):
-        key = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=b'hdjk', iterations=1000, backend=default_backend()).derive(password)
-        return Fernet(base64.urlsafe_b64encode(key))
+    def cipherFernet(password, salt=None):
+        return _derive_fernet(password, salt or CypherUtils._salt(), CypherUtils._iterations())
 
     @staticmethod
     def encrypt1(plaintext, password):
@@ -30,4 +100,4 @@ class CypherUtils:
 
     @staticmethod
     def decrypt1(ciphertext, password):
-        return CypherUtils.cipherFernet(password).decrypt(ciphertext)
\ No newline at end of file
+        return CypherUtils.cipherFernet(password).decrypt(ciphertext)
@@ -1,6 +1,6 @@
 from web_movil_escolar_api.models import *
+from web_movil_escolar_api.image_urls import image_url_validator
 import json
-import requests
 import datetime
 import random
 import string
@@ -66,12 +66,13 @@ class DataUtils:
 
     @staticmethod
     def is_url_image(image_url):
-        image_formats = ("image/png", "image/jpeg", "image/jpg")
-        r = requests.head(image_url)
-        print("Content type:: "+str(r.headers["content-type"]))
-        if r.headers["content-type"] in image_formats:
-            return True
-        return False
+        # HEAD con timeouts, sesión compartida y cache (web_movil_escolar_api/image_urls.py)
+        return image_url_validator.is_image(image_url)
+
+    @staticmethod
+    def are_urls_images(image_urls):
+        """Regresa {url: es imagen} revisando las URLs en paralelo"""
+        return image_url_validator.validate_many(image_urls)
 
     @staticmethod
     def getUrl(request):
@@ -0,0 +1,14 @@
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+from web_movil_escolar_api.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, MySQLDatabaseWrapper):
+    """Backend MySQL con pool de conexiones (ENGINE = 'web_movil_escolar_api.db.mysql')"""
+
+    def pool_connection_is_usable(self, connection):
+        try:
+            connection.ping()
+        except Database.Error:
+            return False
+        return True
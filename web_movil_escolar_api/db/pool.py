@@ -0,0 +1,245 @@
+import threading
+import time
+
+# Pools de este proceso por alias de DATABASES, para /api/cache-stats/
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def all_stats():
+    return [pool.stats() for pool in list(pools.values())]
+
+
+class _Entry:
+    __slots__ = ('connection', 'created', 'last_used')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones DB-API compartido por los hilos de un proceso.
+
+    - MAX_SIZE: conexiones abiertas como máximo (en uso + libres); al
+      llegar al límite las peticiones esperan hasta TIMEOUT segundos.
+    - MIN_SIZE: conexiones libres que se conservan aunque lleven más de
+      MAX_IDLE segundos sin usarse; las demás se cierran.
+    - MAX_AGE: segundos de vida de una conexión antes de reemplazarla
+      (None = sin límite), por debajo del wait_timeout del servidor.
+    - CHECK_IDLE: una conexión que lleva más de estos segundos libre se
+      verifica (ping) antes de entregarla.
+    """
+
+    def __init__(self, alias, connect, is_usable, options=None):
+        options = options or {}
+        self.alias = alias
+        self.connect = connect
+        self.is_usable = is_usable
+        self.min_size = options.get('MIN_SIZE', 1)
+        self.max_size = options.get('MAX_SIZE', 10)
+        self.timeout = options.get('TIMEOUT', 10)
+        self.max_idle = options.get('MAX_IDLE', 300)
+        self.max_age = options.get('MAX_AGE', 3600)
+        self.check_idle = options.get('CHECK_IDLE', 30)
+        self.condition = threading.Condition()
+        self.idle = []
+        self.in_use = {}
+        self.size = 0
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.failed_checks = 0
+
+    def acquire(self):
+        """Conexión libre (la usada más recientemente) o una nueva si hay lugar"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            entry, stale = self._take(deadline)
+            for old in stale:
+                self._close(old)
+            if entry is None:
+                break
+            now = time.monotonic()
+            if now - entry.last_used > self.check_idle and not self.is_usable(entry.connection):
+                with self.condition:
+                    self.failed_checks += 1
+                self._discard(entry)
+                continue
+            entry.last_used = now
+            with self.condition:
+                self.reused += 1
+                self.in_use[id(entry.connection)] = entry
+            return entry.connection
+
+        # Hay lugar en el pool: se abre una conexión fuera del candado
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        entry = _Entry(connection)
+        with self.condition:
+            self.created += 1
+            self.in_use[id(connection)] = entry
+        return connection
+
+    def _take(self, deadline):
+        # Regresa (entrada libre o None para abrir una nueva, conexiones vencidas)
+        stale = []
+        with self.condition:
+            waited = False
+            while True:
+                now = time.monotonic()
+                while self.idle:
+                    entry = self.idle.pop()
+                    if self.max_age is not None and now - entry.created > self.max_age:
+                        self.size -= 1
+                        stale.append(entry)
+                        continue
+                    return entry, stale
+                if self.size < self.max_size:
+                    self.size += 1
+                    return None, stale
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self.closed += len(stale)
+                    for entry in stale:
+                        self._close_quietly(entry)
+                    raise TimeoutError(
+                        f"No hay conexiones libres en el pool '{self.alias}' "
+                        f"({self.max_size}) después de {self.timeout} s"
+                    )
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self.condition.wait(remaining)
+
+    def release(self, connection, discard=False):
+        """Regresa la conexión al pool; con discard=True se cierra"""
+        with self.condition:
+            entry = self.in_use.pop(id(connection), None)
+        if entry is None:
+            self._close_quietly(_Entry(connection))
+            return
+        if discard:
+            self._discard(entry)
+            return
+        entry.last_used = now = time.monotonic()
+        expired = []
+        with self.condition:
+            self.idle.append(entry)
+            # Las libres más antiguas están al principio de la lista
+            while len(self.idle) > self.min_size and now - self.idle[0].last_used > self.max_idle:
+                expired.append(self.idle.pop(0))
+                self.size -= 1
+            self.condition.notify()
+        for old in expired:
+            self._close(old)
+
+    def _discard(self, entry):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+        self._close(entry)
+
+    def _close(self, entry):
+        self._close_quietly(entry)
+        with self.condition:
+            self.closed += 1
+
+    def _close_quietly(self, entry):
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'alias': self.alias,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self.size,
+                'in_use': len(self.in_use),
+                'idle': len(self.idle),
+                'created': self.created,
+                'reused': self.reused,
+                'closed': self.closed,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'failed_checks': self.failed_checks,
+            }
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mezcla para un DatabaseWrapper de Django: get_new_connection() toma la
+    conexión del pool del alias y close() la regresa en lugar de cerrarla.
+
+    Con el pool conviene CONN_MAX_AGE = 0: cada petición regresa su conexión
+    al terminar y el pool la presta a la siguiente, de cualquier hilo.
+    """
+
+    def get_pool(self):
+        pool = pools.get(self.alias)
+        if pool is None:
+            with _pools_lock:
+                pool = pools.get(self.alias)
+                if pool is None:
+                    params = self.get_connection_params()
+                    pool = ConnectionPool(
+                        self.alias,
+                        lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(params),
+                        self.pool_connection_is_usable,
+                        self.settings_dict.get('POOL'),
+                    )
+                    pools[self.alias] = pool
+        return pool
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.get_pool().acquire()
+        except TimeoutError as exc:
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def pool_connection_is_usable(self, connection):
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        # Si se cierra dentro de atomic() Django conserva self.connection hasta
+        # salir del bloque: esa conexión no puede prestarse a otro hilo
+        discard = self.in_atomic_block
+        if not discard and not self.autocommit:
+            # La conexión no se presta con una transacción abierta
+            try:
+                connection.rollback()
+            except self.Database.Error:
+                discard = True
+        if self.errors_occurred and not discard:
+            discard = not self.pool_connection_is_usable(connection)
+        self.get_pool().release(connection, discard=discard)
@@ -0,0 +1,180 @@
+import itertools
+from cryptography.fernet import InvalidToken
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+from web_movil_escolar_api.cypher_utils import CypherUtils
+
+
+class Cifrado(str):
+    """Texto cifrado tal como viene de la base (todavía no se descifra)"""
+
+    def descifra(self):
+        try:
+            return CypherUtils.desencripta(self)
+        except InvalidToken:
+            # Fila escrita antes de cifrar la columna: el valor está en claro
+            return str(self)
+
+
+def descifra_many(values):
+    """Descifra una lista de valores de la base con una sola llave; None y texto en claro se conservan"""
+    tokens = [v for v in values if isinstance(v, Cifrado)]
+    try:
+        plain = iter(CypherUtils.desencripta_many(tokens))
+    except InvalidToken:
+        plain = (token.descifra() for token in tokens)
+    return [next(plain) if isinstance(v, Cifrado) else v for v in values]
+
+
+def token_length(max_length):
+    """Largo del token Fernet de un texto de max_length caracteres (hasta 4 bytes en UTF-8)"""
+    # versión (1) + fecha (8) + IV (16) + AES-CBC con relleno + HMAC (32), en base64
+    size = 1 + 8 + 16 + (max_length * 4 // 16 + 1) * 16 + 32
+    return (size + 2) // 3 * 4
+
+
+class _DescifradoPerezoso(DeferredAttribute):
+    # El valor se descifra la primera vez que se lee el atributo (p. ej. al
+    # serializar) y se guarda descifrado en la instancia. Con __set__ es un
+    # descriptor de datos: si no, el valor de __dict__ taparía a __get__
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if type(value) is Cifrado:
+            value = value.descifra()
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class EncryptedCharField(models.CharField):
+    """
+    CharField que se guarda cifrado con CypherUtils (Fernet, llave en caché).
+
+    Al leer de la base el valor queda como Cifrado y se descifra sólo cuando
+    se usa el atributo; una instancia que se guarda sin leer el campo
+    conserva el mismo texto cifrado. max_length valida el texto en claro;
+    la columna se crea con el largo del token cifrado (token_length).
+
+    El texto cifrado cambia en cada escritura, así que filter(campo=valor)
+    no encuentra nada: las búsquedas por igualdad usan un BlindIndexField
+    (ver busqueda_exacta). Con .values()/.values_list() se obtiene el
+    Cifrado; para descifrar por lotes están descifra_many, descifra_filas y
+    descifra_instancias.
+    """
+    descriptor_class = _DescifradoPerezoso
+
+    def db_type(self, connection):
+        return connection.data_types['CharField'] % {'max_length': token_length(self.max_length)}
+
+    def cast_db_type(self, connection):
+        return self.db_type(connection)
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else Cifrado(value)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or isinstance(value, Cifrado):
+            return value
+        return CypherUtils.encripta(value)
+
+    def pre_save(self, model_instance, add):
+        # Sin pasar por el descriptor: un valor que no se leyó no se descifra
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return super().pre_save(model_instance, add)
+
+
+def descifra_instancias(instances):
+    """
+    Descifra por lotes los campos cifrados que no se han leído en una lista
+    de instancias: una llamada a descifra_many por modelo y campo en lugar
+    de un descifrado por fila y campo al leer cada atributo.
+    """
+    por_modelo = {}
+    for instance in instances:
+        por_modelo.setdefault(type(instance), []).append(instance)
+    for model, grupo in por_modelo.items():
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, EncryptedCharField):
+                continue
+            pendientes = [instance for instance in grupo if type(instance.__dict__.get(field.attname)) is Cifrado]
+            valores = descifra_many([instance.__dict__[field.attname] for instance in pendientes])
+            for instance, value in zip(pendientes, valores):
+                instance.__dict__[field.attname] = value
+    return instances
+
+
+class BlindIndexField(models.CharField):
+    """
+    Índice ciego de un EncryptedCharField (`source`): CypherUtils.indice_ciego
+    del valor en claro, indexado en la base. Se recalcula al guardar si el
+    campo cifrado cambió; QuerySet.update() y bulk_update() no lo recalculan.
+    """
+
+    def __init__(self, source, *args, **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', 64)
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('db_index', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        source = model_instance._meta.get_field(self.source).attname
+        value = model_instance.__dict__.get(source)
+        if isinstance(value, Cifrado) or source not in model_instance.__dict__:
+            return getattr(model_instance, self.attname)
+        value = CypherUtils.indice_ciego(value)
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+def _blind_index(model, field_name):
+    for field in model._meta.concrete_fields:
+        if isinstance(field, BlindIndexField) and field.source == field_name:
+            return field
+    raise ValueError(f"{model.__name__}.{field_name} no tiene índice ciego")
+
+
+def busqueda_exacta(model, field_name, value):
+    """
+    Filtro para buscar por valor exacto un campo cifrado a través de su índice
+    ciego, p. ej. Alumnos.objects.filter(**busqueda_exacta(Alumnos, 'curp', curp))
+    """
+    return {_blind_index(model, field_name).attname: CypherUtils.indice_ciego(value)}
+
+
+def existentes(model, field_name, values):
+    """
+    Cuáles de `values` ya están guardados en el campo cifrado `field_name`,
+    con una sola consulta `__in` sobre su índice ciego
+    """
+    attname = _blind_index(model, field_name).attname
+    indices = {CypherUtils.indice_ciego(value): value for value in values}
+    found = model.objects.filter(**{f'{attname}__in': list(indices)}).values_list(attname, flat=True)
+    return {indices[index] for index in found}
+
+
+def descifra_filas(rows, fields, chunk_size=500):
+    """
+    Descifra en cada fila de .values() los `fields` cifrados, por bloques de
+    filas y con una llamada a descifra_many por campo y bloque.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        for field in fields:
+            for row, value in zip(chunk, descifra_many([row[field] for row in chunk])):
+                row[field] = value
+        yield from chunk
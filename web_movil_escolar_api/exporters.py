@@ -0,0 +1,109 @@
+import csv
+import itertools
+from datetime import date, datetime, time
+from rest_framework.utils.encoders import JSONEncoder
+
+# Filas que se acumulan antes de entregar un bloque a la respuesta
+ROWS_PER_BLOCK = 500
+
+
+class Column:
+    """
+    Columna exportada: nombre de salida, campo de .values() y conversión
+    opcional. Las columnas `attached` no salen de .values(); las agrega a
+    cada fila un paso posterior (p. ej. una relación consultada por bloque).
+    """
+
+    def __init__(self, name, lookup=None, convert=None, attached=False):
+        self.name = name
+        self.lookup = lookup or name
+        self.convert = convert
+        self.attached = attached
+
+
+def lookups(columns, *extra):
+    """Campos para .values(): los de las columnas más los que pida el ordenamiento"""
+    fields = [column.lookup for column in columns if not column.attached]
+    for field in extra:
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def _values(row, columns):
+    for column in columns:
+        value = row[column.lookup]
+        yield column.convert(value) if column.convert and value is not None else value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value)
+    return value
+
+
+class _Buffer:
+    # csv.writer escribe en este objeto y regresamos la línea en lugar de guardarla
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows, columns):
+    """Genera el CSV por bloques de texto (encabezado + filas)"""
+    writer = csv.writer(_Buffer())
+    yield writer.writerow([column.name for column in columns])
+    block = []
+    for row in rows:
+        block.append(writer.writerow([_csv_value(v) for v in _values(row, columns)]))
+        if len(block) >= ROWS_PER_BLOCK:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def json_stream(rows, columns):
+    """Genera un arreglo JSON por bloques; fechas con el mismo formato que la API"""
+    encoder = JSONEncoder(ensure_ascii=False)
+    names = [column.name for column in columns]
+    yield '['
+    block = []
+    separator = ''
+    for row in rows:
+        block.append(separator + encoder.encode(dict(zip(names, _values(row, columns)))))
+        separator = ','
+        if len(block) >= ROWS_PER_BLOCK:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+    yield ']'
+
+
+def attach_related(rows, name, values_list, chunk_size=ROWS_PER_BLOCK):
+    """
+    Agrega a cada fila la lista `name` con los valores de una relación,
+    consultando una vez por bloque de filas: values_list(ids) debe regresar
+    pares (id de la fila, valor).
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        related = {}
+        for row_id, value in values_list([row['id'] for row in chunk]):
+            related.setdefault(row_id, []).append(value)
+        for row in chunk:
+            row[name] = related.get(row['id'], [])
+            yield row
+
+
+FORMATS = {
+    'csv': (csv_stream, 'text/csv; charset=utf-8'),
+    'json': (json_stream, 'application/json'),
+}
@@ -0,0 +1,164 @@
+import operator
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601, SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+from web_movil_escolar_api.encrypted_fields import descifra_instancias
+from web_movil_escolar_api.serializers import *
+
+_SKIP = object()
+
+# Conversión de DRF para los tipos simples (CharField.to_representation es str(), etc.)
+SIMPLE_FIELDS = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+    serializers.BooleanField: bool,
+}
+
+
+def _model_field(model, attrs):
+    """Campo del modelo al final de `attrs` (siguiendo llaves foráneas) o None"""
+    field = None
+    for attr in attrs:
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        model = field.related_model if field.is_relation else None
+    return field
+
+
+def _generic(field):
+    # Mismo camino que Serializer.to_representation para un campo
+    def get(instance, tz):
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return _SKIP
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        return None if check_for_none is None else field.to_representation(attribute)
+    return get
+
+
+def _compiled(attrs, convert, generic):
+    # operator.attrgetter sigue la ruta en C; si falla (relación vacía) se
+    # usa el camino de DRF, que decide entre None, el default u omitir el campo
+    read = operator.attrgetter('.'.join(attrs))
+
+    def get(instance, tz):
+        try:
+            value = read(instance)
+        except AttributeError:
+            return generic(instance, tz)
+        if value is None or convert is None:
+            return value
+        return convert(value, tz)
+    return get
+
+
+def _datetime(field):
+    # DateTimeField con salida ISO 8601 y la zona horaria activa: la zona se
+    # resuelve una vez por lista en lugar de una vez por valor
+    def convert(value, tz):
+        if tz is None or isinstance(value, str) or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _getter(field, model):
+    attrs = field.source_attrs
+    model_field = _model_field(model, attrs) if attrs else None
+    generic = _generic(field)
+    if model_field is None or not (model_field.concrete or model_field.one_to_many or model_field.many_to_many):
+        return generic
+
+    if isinstance(field, serializers.Serializer):
+        nested = FastSerializer(field).to_representation
+        return _compiled(attrs, nested, generic)
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None and model_field.concrete:
+        # El id sale de la columna <campo>_id sin cargar el objeto relacionado
+        return _compiled(attrs[:-1] + [model_field.attname], None, generic)
+
+    if isinstance(field, serializers.ManyRelatedField) and isinstance(field.child_relation, serializers.SlugRelatedField):
+        slug = field.child_relation.slug_field
+        return _compiled(attrs, lambda manager, tz: [getattr(related, slug) for related in manager.all()], generic)
+
+    if type(field) in SIMPLE_FIELDS:
+        python_type = SIMPLE_FIELDS[type(field)]
+        return _compiled(attrs, lambda value, tz: value if type(value) is python_type else python_type(value), generic)
+
+    if type(field) is serializers.JSONField and not field.binary:
+        return _compiled(attrs, None, generic)
+
+    if (
+        type(field) is serializers.DateTimeField and not hasattr(field, 'timezone') and
+        getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601
+    ):
+        return _compiled(attrs, _datetime(field), generic)
+
+    if type(field) in (serializers.DateField, serializers.TimeField):
+        to_representation = field.to_representation
+        return _compiled(attrs, lambda value, tz: to_representation(value), generic)
+
+    return generic
+
+
+class FastSerializer:
+    """
+    Serialización de solo lectura para las listas: mismo resultado que
+    `serializer_class(instances, many=True).data`, pero sin el recorrido
+    genérico de DRF por cada campo.
+
+    Los campos del serializer se revisan una sola vez y se convierten en
+    funciones de lectura: columnas simples (texto, enteros, JSON, fechas),
+    el id de las llaves foráneas sin cargar el objeto relacionado, listas de
+    SlugRelatedField (desde la relación precargada) y serializers anidados.
+    Cualquier otro campo usa el camino normal de DRF. Los campos cifrados
+    de toda la lista se descifran por lotes antes de serializar.
+    """
+
+    def __init__(self, serializer):
+        # Clase de serializer o instancia (para los anidados)
+        self.serializer = serializer
+        self._getters = None
+
+    @property
+    def getters(self):
+        if self._getters is None:
+            serializer = self.serializer() if isinstance(self.serializer, type) else self.serializer
+            model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+            self._getters = [
+                (name, _getter(field, model))
+                for name, field in serializer.fields.items()
+                if not field.write_only
+            ]
+        return self._getters
+
+    def to_representation(self, instance, tz=None):
+        data = {}
+        for name, get in self.getters:
+            value = get(instance, tz)
+            if value is not _SKIP:
+                data[name] = value
+        return data
+
+    def many(self, instances):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        # Los campos cifrados de la página se descifran juntos, no uno por fila
+        instances = descifra_instancias(list(instances))
+        to_representation = self.to_representation
+        return [to_representation(instance, tz) for instance in instances]
+
+
+fast_materia_serializer = FastSerializer(MateriaSerializer)
+fast_alumno_serializer = FastSerializer(AlumnoSerializer)
+fast_maestro_serializer = FastSerializer(MaestroSerializer)
+fast_admin_serializer = FastSerializer(AdminSerializer)
@@ -0,0 +1,172 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth import hashers
+from django.contrib.auth.backends import ModelBackend
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'El servidor está ocupado, intenta de nuevo en unos segundos'
+    default_code = 'hashing_busy'
+
+
+def _init_process_worker():
+    # Con el método "spawn" los procesos hijos no heredan Django configurado
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _check_password(password, encoded):
+    # Sin setter: la actualización del hash se hace en el hilo de la petición
+    return hashers.check_password(password, encoded)
+
+
+def _must_update(encoded):
+    # Igual que hashers.check_password: hay que volver a cifrar si el hasher
+    # preferido (el primero de PASSWORD_HASHERS) es otro algoritmo o si es el
+    # mismo con otros parámetros (p. ej. más iteraciones)
+    preferred = hashers.get_hasher('default')
+    return hashers.identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+class PasswordHashingService:
+    """
+    Limitador de concurrencia para cifrar y verificar contraseñas (PBKDF2).
+
+    No hace más rápida una petición: quien llama espera el resultado
+    (.result()) igual que si cifrara en su propio hilo. Lo que hace es:
+
+    - Correr a lo más max_workers PBKDF2 a la vez en el proceso. Con muchos
+      hilos de servidor, en lugar de repartir la CPU entre todos los logins
+      (y que todos tarden), se atienden en orden y baja el p99.
+    - Acotar la espera a max_workers + max_pending: con el semáforo lleno la
+      petición espera hasta `timeout` segundos y después recibe 503
+      (HashingBusy) en lugar de acumularse en los workers del servidor.
+    - Cifrar en paralelo los lotes de make_passwords (importaciones); hashlib
+      libera el GIL, así que un pool de hilos usa varios núcleos (también se
+      puede usar un pool de procesos).
+
+    `python manage.py medir_login` compara la latencia con y sin el pool.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, timeout=None, executor=None):
+        self.max_workers = max_workers or getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+        self.max_pending = max_pending if max_pending is not None else getattr(settings, 'PASSWORD_HASHING_MAX_PENDING', 32)
+        self.timeout = timeout if timeout is not None else getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 10)
+        self.executor_kind = executor or getattr(settings, 'PASSWORD_HASHING_EXECUTOR', 'thread')
+        self.slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def get_executor(self):
+        # Se crea al primer uso, ya dentro del worker del servidor (después del fork)
+        with self.lock:
+            if self.executor is None:
+                if self.executor_kind == 'process':
+                    self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_process_worker)
+                else:
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hashing')
+            return self.executor
+
+    def submit(self, fn, *args, wait=False):
+        # wait=True espera turno sin límite (lotes); si no, a lo más `timeout`
+        acquired = self.slots.acquire() if wait else self.slots.acquire(timeout=self.timeout)
+        if not acquired:
+            with self.lock:
+                self.rejected += 1
+            raise HashingBusy()
+        with self.lock:
+            self.in_flight += 1
+        try:
+            future = self.get_executor().submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self.lock:
+            self.in_flight -= 1
+            if future is not None:
+                self.completed += 1
+        self.slots.release()
+
+    def make_password(self, password):
+        return self.submit(hashers.make_password, password).result()
+
+    def make_passwords(self, passwords):
+        """Cifra muchas contraseñas; espera turno en lugar de rechazar (uso en lotes)"""
+        futures = [self.submit(hashers.make_password, password, wait=True) for password in passwords]
+        return [future.result() for future in futures]
+
+    def check_password(self, password, encoded):
+        return self.submit(_check_password, password, encoded).result()
+
+    def set_password(self, user, password):
+        """Equivalente a user.set_password() pero cifrando en el pool"""
+        user.password = self.make_password(password)
+        user._password = password
+
+    def check_user_password(self, user, password):
+        """Equivalente a user.check_password(), actualiza el hash si cambió el algoritmo"""
+        if password is None or not user.has_usable_password():
+            return False
+        valid = self.check_password(password, user.password)
+        if valid and _must_update(user.password):
+            self.set_password(user, password)
+            user._password = None
+            user.save(update_fields=['password'])
+        return valid
+
+    def stats(self):
+        with self.lock:
+            return {
+                'executor': self.executor_kind,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+
+hashing_service = PasswordHashingService()
+
+# Pool aparte y acotado para /api/importar-usuarios/: una importación no ocupa
+# los turnos de los logins (que recibirían 503) ni más de
+# IMPORT_HASHING_WORKERS núcleos; las importaciones simultáneas esperan turno
+import_hashing_service = PasswordHashingService(
+    max_workers=getattr(settings, 'IMPORT_HASHING_WORKERS', 1), max_pending=0,
+)
+
+
+class HashingModelBackend(ModelBackend):
+    """ModelBackend que verifica la contraseña en el pool de PasswordHashingService"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Igual que ModelBackend: cifrar de todos modos para no revelar por
+            # el tiempo de respuesta si el usuario existe
+            hashing_service.make_password(password)
+            return None
+        if hashing_service.check_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+from web_movil_escolar_api.cache_utils import LRUCache
+
+IMAGE_FORMATS = ("image/png", "image/jpeg", "image/jpg")
+
+# Marca de "no está en el cache" (None es un resultado válido: la URL falló)
+_MISS = object()
+
+
+class ImageUrlValidator:
+    """
+    Revisa si una URL apunta a una imagen con un HEAD y su Content-Type.
+
+    - Una sola requests.Session por proceso con un pool de hasta
+      IMAGE_URL_POOL_SIZE conexiones por host (keep-alive entre validaciones).
+    - Timeouts de conexión y de lectura (IMAGE_URL_CONNECT_TIMEOUT,
+      IMAGE_URL_READ_TIMEOUT) y a lo más IMAGE_URL_MAX_REDIRECTS redirecciones:
+      un host lento no detiene al worker más de eso.
+    - El Content-Type de cada URL se guarda IMAGE_URL_CACHE_TTL segundos; las
+      URLs que fallan (timeout, conexión, 4xx/5xx) se guardan como None por
+      IMAGE_URL_ERROR_TTL segundos para no reintentarlas en cada petición.
+    - validate_many() revisa varias URLs a la vez en un pool compartido de
+      IMAGE_URL_WORKERS hilos; is_image_async()/validate_many_async() usan el
+      mismo pool desde código async sin bloquear el event loop.
+
+    `session` permite usar otra sesión (p. ej. contra un servidor HTTP local).
+    """
+
+    def __init__(self, session=None):
+        self._session = session
+        self._executor = None
+        self.lock = threading.Lock()
+        self.cache = LRUCache(
+            'image_urls',
+            maxsize=getattr(settings, 'IMAGE_URL_CACHE_MAXSIZE', 1024),
+            ttl=getattr(settings, 'IMAGE_URL_CACHE_TTL', 3600),
+        )
+        self.requests = 0
+        self.errors = 0
+
+    def _setting(self, name, default):
+        return getattr(settings, name, default)
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self.lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.max_redirects = self._setting('IMAGE_URL_MAX_REDIRECTS', 3)
+                    pool_size = self._setting('IMAGE_URL_POOL_SIZE', 10)
+                    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self.lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._setting('IMAGE_URL_WORKERS', 8), thread_name_prefix='image-url',
+                    )
+        return self._executor
+
+    def _fetch(self, url):
+        # Content-Type sin parámetros (image/png; charset=... -> image/png) o None si falla
+        with self.lock:
+            self.requests += 1
+        timeout = (self._setting('IMAGE_URL_CONNECT_TIMEOUT', 2), self._setting('IMAGE_URL_READ_TIMEOUT', 3))
+        try:
+            response = self.session.head(url, timeout=timeout, allow_redirects=True)
+            response.close()
+            response.raise_for_status()
+        except requests.RequestException:
+            with self.lock:
+                self.errors += 1
+            return None
+        return response.headers.get('content-type', '').split(';')[0].strip().lower()
+
+    def content_type(self, url):
+        """Content-Type de la URL (desde el cache si se revisó hace poco)"""
+        if not (url.startswith('http://') or url.startswith('https://')):
+            return None
+        value = self.cache.get(url, _MISS)
+        if value is _MISS:
+            value = self._fetch(url)
+            ttl = None if value is not None else self._setting('IMAGE_URL_ERROR_TTL', 60)
+            self.cache.set(url, value, ttl)
+        return value
+
+    def is_image(self, url):
+        return self.content_type(url) in IMAGE_FORMATS
+
+    def validate_many(self, urls):
+        """Regresa {url: es imagen}; las URLs que no están en el cache se revisan en paralelo"""
+        urls = list(dict.fromkeys(urls))
+        pending = [url for url in urls if self.cache.get(url, _MISS) is _MISS]
+        if len(pending) > 1:
+            list(self.executor.map(self.content_type, pending))
+        return {url: self.is_image(url) for url in urls}
+
+    async def is_image_async(self, url):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.is_image, url)
+
+    async def validate_many_async(self, urls):
+        """Como validate_many, sin bloquear el event loop"""
+        urls = list(dict.fromkeys(urls))
+        return dict(zip(urls, await asyncio.gather(*(self.is_image_async(url) for url in urls))))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'cache': self.cache.stats(),
+            }
+
+
+image_url_validator = ImageUrlValidator()
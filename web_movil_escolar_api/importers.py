@@ -0,0 +1,277 @@
+import csv
+import io
+import itertools
+import zipfile
+from datetime import date
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import Q
+from web_movil_escolar_api import counters, versions
+from web_movil_escolar_api.encrypted_fields import existentes
+from web_movil_escolar_api.hashing import PasswordHashingService, hashing_service
+from web_movil_escolar_api.models import *
+from web_movil_escolar_api.search_index import alumnos_index, maestros_index
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # XLSX es opcional
+    load_workbook = None
+
+
+USER_COLUMNS = ('first_name', 'last_name', 'email', 'password')
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _upper(value):
+    value = _text(value)
+    return value.upper() if value else value
+
+
+def _int(value):
+    value = _text(value)
+    return int(float(value)) if value is not None else None
+
+
+def _date(value):
+    if isinstance(value, date):
+        return value
+    value = _text(value)
+    if value is None:
+        return None
+    return date.fromisoformat(value[:10])
+
+
+# Errores al leer un archivo mal formado; ver file_error_message
+FILE_ERRORS = (csv.Error, zipfile.BadZipFile, UnicodeDecodeError)
+
+
+def read_csv(file):
+    """Itera las filas de un CSV (archivo binario) como diccionarios, sin cargarlo completo"""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        for row in csv.DictReader(text):
+            yield row
+    finally:
+        # Sin cerrar `file`: se puede volver a leer después de count_rows
+        text.detach()
+
+
+def read_xlsx(file):
+    """Itera las filas de la primera hoja de un XLSX en modo de solo lectura"""
+    if load_workbook is None:
+        raise ValueError('Se requiere el paquete openpyxl para importar archivos XLSX')
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(file)
+    return read_csv(file)
+
+
+def count_rows(file, filename, limit):
+    """
+    Cuenta las filas de datos hasta limit + 1 y regresa el archivo al inicio.
+    Un archivo dañado lanza el error aquí, antes de escribir nada.
+    """
+    count = sum(1 for row in itertools.islice(read_rows(file, filename), limit + 1))
+    file.seek(0)
+    return count
+
+
+def file_error_message(error):
+    """Mensaje para el usuario de uno de FILE_ERRORS"""
+    if isinstance(error, UnicodeDecodeError):
+        return 'El archivo CSV debe estar en UTF-8'
+    if isinstance(error, zipfile.BadZipFile):
+        return 'El archivo XLSX está dañado o no es un XLSX válido'
+    return f'El archivo CSV no es válido: {error}'
+
+
+class UserImporter:
+    """
+    Importa alumnos o maestros en bloques desde un iterador de filas.
+
+    Cada bloque se valida completo, se consultan los correos (y las CURP de
+    los alumnos, por su índice ciego) existentes con un solo `__in`, las
+    contraseñas se cifran en paralelo con PasswordHashingService (`hashing`,
+    el pool compartido, o uno de procesos propio si se indica `workers`) y
+    usuarios, membresías de grupo y perfiles se insertan con bulk_create
+    dentro de una transacción por bloque. Los errores se
+    reportan por fila (la fila 2 es la primera después del encabezado).
+    """
+
+    profiles = {
+        'alumno': Alumnos,
+        'maestro': Maestros,
+    }
+
+    def __init__(self, rol, chunk_size=1000, workers=None, hashing=None, progress=None, max_errors=1000):
+        if rol not in self.profiles:
+            raise ValueError(f'Rol inválido: {rol}. Valores válidos: {", ".join(self.profiles)}')
+        self.rol = rol
+        self.model = self.profiles[rol]
+        self.chunk_size = chunk_size
+        if hashing is not None:
+            self.hashing = hashing
+        elif workers:
+            self.hashing = PasswordHashingService(max_workers=workers, executor='process')
+        else:
+            self.hashing = hashing_service
+        self.progress = progress
+        self.max_errors = max_errors
+        self.processed = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.seen_emails = set()
+        self.seen_curps = set()
+
+    def run(self, rows):
+        group, created = Group.objects.get_or_create(name=self.rol)
+        rows = enumerate(rows, start=2)
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk, group)
+            if self.progress:
+                self.progress(self)
+        return self.summary()
+
+    def summary(self):
+        return {
+            "rol": self.rol,
+            "procesadas": self.processed,
+            "creadas": self.created,
+            "con_errores": self.error_count,
+            "errores": self.errors,
+        }
+
+    def add_error(self, line, error):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"fila": line, "error": error})
+
+    def clean_row(self, row):
+        """Regresa (datos del usuario, datos del perfil, materias) o lanza ValueError"""
+        missing = [c for c in USER_COLUMNS if not _text(row.get(c))]
+        if missing:
+            raise ValueError(f'Faltan columnas requeridas: {", ".join(missing)}')
+        user = {c: _text(row.get(c)) for c in USER_COLUMNS}
+        user['email'] = user['email'].lower()
+        try:
+            if self.rol == 'alumno':
+                profile = {
+                    'matricula': _text(row.get('matricula')),
+                    'curp': _upper(row.get('curp')),
+                    'rfc': _upper(row.get('rfc')),
+                    'fecha_nacimiento': _date(row.get('fecha_nacimiento')),
+                    'edad': _int(row.get('edad')),
+                    'telefono': _text(row.get('telefono')),
+                    'ocupacion': _text(row.get('ocupacion')),
+                }
+            else:
+                profile = {
+                    'id_trabajador': _text(row.get('id_trabajador')),
+                    'fecha_nacimiento': _date(row.get('fecha_nacimiento')),
+                    'telefono': _text(row.get('telefono')),
+                    'rfc': _upper(row.get('rfc')),
+                    'cubiculo': _text(row.get('cubiculo')),
+                    'edad': _int(row.get('edad')),
+                    'area_investigacion': _text(row.get('area_investigacion')),
+                }
+        except ValueError as e:
+            raise ValueError(f'Valor inválido: {e}')
+        materias = MaestroMateria.parse(row.get('materias_json') or '') if self.rol == 'maestro' else []
+        return user, profile, materias
+
+    def import_chunk(self, chunk, group):
+        valid = []
+        for line, row in chunk:
+            self.processed += 1
+            try:
+                user, profile, materias = self.clean_row(row)
+            except ValueError as e:
+                self.add_error(line, str(e))
+                continue
+            if user['email'] in self.seen_emails:
+                self.add_error(line, f"El correo {user['email']} está repetido en el archivo")
+                continue
+            curp = profile.get('curp')
+            if curp and curp in self.seen_curps:
+                self.add_error(line, f"La CURP {curp} está repetida en el archivo")
+                continue
+            self.seen_emails.add(user['email'])
+            if curp:
+                self.seen_curps.add(curp)
+            valid.append((line, user, profile, materias))
+
+        emails = [user['email'] for line, user, profile, materias in valid]
+        taken = set()
+        for username, email in User.objects.filter(Q(username__in=emails) | Q(email__in=emails)).values_list('username', 'email'):
+            taken.add(username.lower())
+            taken.add(email.lower())
+        # La CURP está cifrada: igual que AlumnosView.post, por su índice ciego
+        curps = [profile['curp'] for line, user, profile, materias in valid if profile.get('curp')]
+        registered = existentes(Alumnos, 'curp', curps) if curps else set()
+        pending = []
+        for line, user, profile, materias in valid:
+            if user['email'] in taken:
+                self.add_error(line, f"Username {user['email']}, is already taken")
+            elif profile.get('curp') in registered:
+                self.add_error(line, f"La CURP {profile['curp']} ya está registrada")
+            else:
+                pending.append((line, user, profile, materias))
+        if not pending:
+            return
+
+        hashes = self.hashing.make_passwords([user['password'] for line, user, profile, materias in pending])
+
+        with transaction.atomic():
+            User.objects.bulk_create([
+                User(username=user['email'], email=user['email'], first_name=user['first_name'],
+                     last_name=user['last_name'], is_active=True, password=password)
+                for (line, user, profile, materias), password in zip(pending, hashes)
+            ], batch_size=500)
+
+            # MySQL no regresa los ids de bulk_create: se leen por username
+            user_ids = dict(User.objects.filter(username__in=[user['email'] for line, user, profile, materias in pending]).values_list('username', 'id'))
+            Membership = User.groups.through
+            Membership.objects.bulk_create([
+                Membership(user_id=user_ids[user['email']], group_id=group.id)
+                for line, user, profile, materias in pending
+            ], batch_size=500)
+            self.model.objects.bulk_create([
+                self.model(user_id=user_ids[user['email']], **profile)
+                for line, user, profile, materias in pending
+            ], batch_size=500)
+            profile_ids = dict(self.model.objects.filter(user_id__in=user_ids.values()).values_list('user_id', 'id'))
+            if self.rol == 'maestro':
+                MaestroMateria.objects.bulk_create([
+                    MaestroMateria(maestro_id=profile_ids[user_ids[user['email']]], nombre=nombre)
+                    for line, user, profile, materias in pending
+                    for nombre in materias
+                ], batch_size=500)
+
+            # bulk_create no dispara post_save: se ajusta el total (todos los
+            # usuarios nuevos están activos) y se reindexa la búsqueda
+            counters.adjust(counters.role_for_model(self.model), len(pending))
+            index = alumnos_index if self.rol == 'alumno' else maestros_index
+            index.refresh(profile_ids.values())
+
+        versions.bump_after_commit('alumnos' if self.rol == 'alumno' else 'maestros')
+        self.created += len(pending)
@@ -0,0 +1,165 @@
+import random
+from datetime import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from web_movil_escolar_api.models import *
+from web_movil_escolar_api.pagination import KeysetPagination
+from web_movil_escolar_api.views.alumnos import AlumnosAll
+from web_movil_escolar_api.views.maestros import MaestrosAll
+from web_movil_escolar_api.views.materias import MateriasAll
+from web_movil_escolar_api.views.users import AdminAll
+
+LIST_VIEWS = {
+    'lista-materias': MateriasAll,
+    'lista-alumnos': AlumnosAll,
+    'lista-maestros': MaestrosAll,
+    'lista-admins': AdminAll,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def explain(sql, params):
+    """Plan de la consulta como lista de líneas de texto, según el motor"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute('EXPLAIN ' + sql, params)
+        if connection.vendor == 'mysql':
+            columns = [c[0] for c in cursor.description]
+            return [' '.join(f'{k}={v}' for k, v in zip(columns, row)) for row in cursor.fetchall()]
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan, sort_field):
+    """
+    Líneas del plan que leen una tabla completa o la ordenan sin índice.
+    Recorrer la llave primaria en orden es válido cuando se ordena por id
+    (el LIMIT de la página corta el recorrido).
+    """
+    problems = []
+    for line in plan:
+        if connection.vendor == 'sqlite':
+            if 'TEMP B-TREE' in line:
+                problems.append(line)
+            elif line.startswith('SCAN ') and 'USING' not in line and sort_field != 'id':
+                problems.append(line)
+        elif connection.vendor == 'mysql':
+            if 'type=ALL' in line or 'Using filesort' in line:
+                problems.append(line)
+        elif 'Seq Scan' in line or line.strip().startswith('Sort'):
+            problems.append(line)
+    return problems
+
+
+def seed(total):
+    """Inserta `total` registros de prueba por tabla (usuarios, perfiles y materias)"""
+    rng = random.Random(0)
+    User.objects.bulk_create([
+        User(username=f'auditoria{i}@example.com', email=f'auditoria{i}@example.com',
+             first_name=f'Nombre{rng.randrange(total)}', last_name=f'Apellido{rng.randrange(total)}',
+             is_active=rng.random() > 0.1)
+        for i in range(total * 3)
+    ], batch_size=1000)
+    ids = list(User.objects.filter(username__startswith='auditoria').values_list('id', flat=True))
+    rng.shuffle(ids)
+    alumnos, maestros, admins = ids[:total], ids[total:total * 2], ids[total * 2:]
+    Alumnos.objects.bulk_create([Alumnos(user_id=pk, matricula=f'{rng.randrange(10**9):09d}') for pk in alumnos], batch_size=1000)
+    Maestros.objects.bulk_create([Maestros(user_id=pk, id_trabajador=f'{rng.randrange(10**7):07d}') for pk in maestros], batch_size=1000)
+    Administradores.objects.bulk_create([Administradores(user_id=pk, clave_admin=f'A{rng.randrange(10**6)}') for pk in admins], batch_size=1000)
+    Materia.objects.bulk_create([
+        Materia(nrc=f'{i % 1000000:06d}', nombre_materia=f'Materia {rng.randrange(total)}',
+                seccion=f'{rng.randrange(1000):03d}', dias=['Lunes'], hora_inicio=time(7), hora_fin=time(8),
+                salon=f'S{rng.randrange(500)}', programa_educativo='Ingeniería en Ciencias de la Computación',
+                creditos='6')
+        for i in range(total)
+    ], batch_size=1000, ignore_conflicts=True)
+    # Estadísticas para el planificador (en MySQL ANALYZE TABLE hace commit implícito)
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def list_pages(view_class, request):
+    """
+    Consultas de página de una lista: la primera página por número (ORDER BY
+    campo) y una página por cursor de KeysetPagination, que ordena por
+    (campo, id) y busca a partir del primer registro con WHERE (campo, id) >
+    (valor, id); esta última es la que deben resolver los índices
+    compuestos (campo, id) de 0010_indices_listados.
+    """
+    queryset, sort_field, descending = view_class().filter_queryset(request)
+    yield '', queryset.order_by(f'-{sort_field}' if descending else sort_field)[:10]
+
+    paginator = KeysetPagination()
+    paginator.sort_field = sort_field
+    paginator.descending = descending
+    ordered = queryset.order_by(*paginator.get_ordering())
+    yield ' cursor', ordered[:paginator.page_size + 1]
+    first = ordered.values(sort_field, 'id').first()
+    if first is not None:
+        value = None if sort_field == 'id' else first[sort_field]
+        seek = ordered.filter(paginator.get_seek_filter(value, first['id']))
+        yield ' cursor siguiente', seek[:paginator.page_size + 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre la primera página de cada lista (lista-materias, "
+        "lista-alumnos, lista-maestros, lista-admins) con cada opción de sort_by "
+        "y sort_order, por número de página y por cursor (keyset), y termina con "
+        "error si alguna recorre una tabla completa o la ordena sin índice. "
+        "Con --seed N primero inserta N registros por tabla dentro de una "
+        "transacción que se revierte al final (pensado para CI). Conviene "
+        "ejecutarlo con el motor de producción (MySQL): en SQLite Django compila "
+        "user__is_active=True sin comparación y el planificador no puede usar "
+        "los índices (is_active, ...) de auth_user."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Registros de prueba por tabla (se revierten al terminar)')
+
+    def handle(self, *args, **options):
+        problems = []
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    seed(options['seed'])
+                problems = self.audit(options['verbosity'])
+                if options['seed']:
+                    raise Rollback()
+        except Rollback:
+            pass
+
+        if problems:
+            for name, sort, lines in problems:
+                self.stderr.write(f"{name} sort_by={sort}:")
+                for line in lines:
+                    self.stderr.write(f"    {line}")
+            raise CommandError(f"{len(problems)} consultas de listado recorren tablas completas")
+        self.stdout.write(self.style.SUCCESS("Todas las consultas de listado usan índices"))
+
+    def audit(self, verbosity=1):
+        factory = RequestFactory()
+        problems = []
+        for name, view_class in LIST_VIEWS.items():
+            for sort_by in view_class.sort_mapping:
+                for sort_order in ('asc', 'desc'):
+                    request = factory.get('/', {'sort_by': sort_by, 'sort_order': sort_order})
+                    sort_field = view_class.sort_mapping[sort_by]
+                    for kind, page in list_pages(view_class, request):
+                        sql, params = page.query.sql_with_params()
+                        plan = explain(sql, params)
+                        found = full_scans(plan, sort_field)
+                        label = f'{sort_by} {sort_order}{kind}'
+                        if found:
+                            problems.append((name, label, found))
+                        elif verbosity > 1:
+                            self.stdout.write(f"{name} sort_by={label}: OK")
+        return problems
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from web_movil_escolar_api.importers import FILE_ERRORS, UserImporter, file_error_message, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa alumnos o maestros desde un archivo CSV o XLSX. El archivo se "
+        "lee en bloques; la primera fila debe traer los nombres de columna "
+        "(first_name, last_name, email, password y los campos del perfil)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--rol', required=True, choices=sorted(UserImporter.profiles))
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Usar un pool propio de N procesos para cifrar contraseñas (por defecto, el pool compartido)')
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+
+        def progress(importer):
+            self.stdout.write(
+                f"{importer.processed} filas procesadas, {importer.created} creadas, "
+                f"{importer.error_count} con errores ({time.monotonic() - start:.1f}s)"
+            )
+
+        importer = UserImporter(options['rol'], chunk_size=options['chunk_size'],
+                                workers=options['workers'], progress=progress)
+        try:
+            with open(options['archivo'], 'rb') as file:
+                summary = importer.run(read_rows(file, options['archivo']))
+        except FILE_ERRORS as e:
+            raise CommandError(file_error_message(e))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in summary['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación terminada: {summary['creadas']} creadas de {summary['procesadas']} filas"
+        ))
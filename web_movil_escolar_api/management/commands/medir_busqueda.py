@@ -0,0 +1,80 @@
+import functools
+import operator
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from web_movil_escolar_api.management.commands.auditar_consultas import Rollback, seed
+from web_movil_escolar_api.management.commands.medir_serializacion import best_of
+from web_movil_escolar_api.search_index import admins_index, alumnos_index, maestros_index, materias_index
+
+INDEXES = (materias_index, alumnos_index, maestros_index, admins_index)
+
+# Términos de búsqueda de prueba (coinciden con los datos de `seed`)
+DEFAULT_TERMS = ('nombre12', 'apellido7', 'materia 3', 'example.com', 'zzzz')
+
+
+def like_filter(index, term):
+    """El filtro OR de `__icontains` que usan las vistas cuando no hay índice"""
+    return functools.reduce(operator.or_, (Q(**{f'{field}__icontains': term}) for field in index.fields))
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el índice de trigramas de `search` (search_index.py) contra el "
+        "filtro LIKE: tiempo de construir cada índice y de cada búsqueda. "
+        "Termina con error si los ids encontrados no son los mismos. Con "
+        "--seed N primero inserta N registros por tabla (p. ej. 100000) dentro "
+        "de una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Registros de prueba por tabla (se revierten al terminar)')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--term', action='append', dest='terms',
+                            help='Término a buscar (se puede repetir)')
+
+    def handle(self, *args, **options):
+        terms = options['terms'] or DEFAULT_TERMS
+        mismatches = []
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    seed(options['seed'])
+                for index in INDEXES:
+                    mismatches += self.measure(index, terms, options['repeat'])
+                if options['seed']:
+                    raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            # Los índices se construyeron con los datos de prueba
+            for index in INDEXES:
+                index.built_generation = None
+        if mismatches:
+            raise CommandError(f"Resultados diferentes en: {', '.join(mismatches)}")
+
+    def measure(self, index, terms, repeat):
+        start = time.perf_counter()
+        index.build()
+        build_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(f"{index.name}: {len(index.values)} registros, índice construido en {build_ms:.0f} ms")
+
+        queryset = index.model.objects.all()
+        mismatches = []
+        for term in terms:
+            ids = index.search(term)
+            like_ids = set(queryset.filter(like_filter(index, term)).values_list('id', flat=True))
+            if ids is None:
+                self.stdout.write(f"  '{term}': {len(like_ids)} resultados, el índice usa LIKE (término corto o poco selectivo)")
+                continue
+            if set(ids) != like_ids:
+                mismatches.append(f'{index.name}:{term}')
+            index_ms = best_of(repeat, lambda: list(queryset.filter(id__in=index.search(term)).values_list('id', flat=True)))
+            like_ms = best_of(repeat, lambda: list(queryset.filter(like_filter(index, term)).values_list('id', flat=True)))
+            self.stdout.write(
+                f"  '{term}': {len(like_ids)} resultados, LIKE {like_ms:.2f} ms, "
+                f"índice {index_ms:.2f} ms (x{like_ms / index_ms:.1f}){'' if set(ids) == like_ids else ' DIFERENTE'}"
+            )
+        return mismatches
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from web_movil_escolar_api.cypher_utils import CypherUtils, _derive_fernet, _multi_fernet
+from web_movil_escolar_api.management.commands.medir_serializacion import best_of
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de cifrar y descifrar N campos con CypherUtils: "
+        "derivando la llave en cada campo (como antes), con la llave en caché "
+        "(encripta/desencripta) y por lote (encripta_many/desencripta_many). "
+        "Termina con error si algún valor no regresa igual."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fields', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        def clear_cache():
+            _multi_fernet.cache_clear()
+            _derive_fernet.cache_clear()
+
+        values = [f'CAMPO{i:013d}' for i in range(options['fields'])]
+        repeat = options['repeat']
+
+        def uncached_encrypt():
+            for value in values:
+                clear_cache()
+                CypherUtils.encripta(value)
+
+        encrypted = CypherUtils.encripta_many(values)
+
+        def uncached_decrypt():
+            for value in encrypted:
+                clear_cache()
+                CypherUtils.desencripta(value)
+
+        if CypherUtils.desencripta_many(encrypted) != values or [CypherUtils.desencripta(v) for v in encrypted] != values:
+            raise CommandError("Los valores descifrados no son iguales a los originales")
+
+        rows = [
+            ('cifrar', uncached_encrypt, lambda: [CypherUtils.encripta(v) for v in values],
+             lambda: CypherUtils.encripta_many(values)),
+            ('descifrar', uncached_decrypt, lambda: [CypherUtils.desencripta(v) for v in encrypted],
+             lambda: CypherUtils.desencripta_many(encrypted)),
+        ]
+        for name, uncached, cached, batch in rows:
+            uncached_ms = best_of(repeat, uncached)
+            cached_ms = best_of(repeat, cached)
+            batch_ms = best_of(repeat, batch)
+            self.stdout.write(
+                f"{name} {len(values)} campos: sin caché {uncached_ms:.2f} ms, "
+                f"con caché {cached_ms:.2f} ms (x{uncached_ms / cached_ms:.1f}), "
+                f"por lote {batch_ms:.2f} ms (x{uncached_ms / batch_ms:.1f})"
+            )
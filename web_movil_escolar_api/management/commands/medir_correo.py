@@ -0,0 +1,95 @@
+import hashlib
+import time
+from django.core.management.base import BaseCommand
+from web_movil_escolar_api.cache_utils import LRUCache
+from web_movil_escolar_api.management.commands.medir_serializacion import best_of
+from web_movil_escolar_api.puentes.mail import MailsBridge
+
+PARRAFO = (
+    '<p>Estimado alumno, le informamos que la sesión de orientación será el '
+    'miércoles a las 10:00 en el salón Ñ-1. Año académico 2026.</p>'
+)
+
+# Reemplazos que hacía send_mail_async antes de escape_html
+REEMPLAZOS = (
+    ('á', '&aacute;'), ('é', '&eacute;'), ('í', '&iacute;'), ('ó', '&oacute;'), ('ú', '&uacute;'),
+    ('Á', '&Aacute;'), ('É', '&Eacute;'), ('Í', '&Iacute;'), ('Ó', '&Oacute;'), ('Ú', '&Uacute;'),
+)
+
+
+def reemplazos(html):
+    for old, new in REEMPLAZOS:
+        html = html.replace(old, new)
+    return html
+
+
+def codificador(html):
+    return html.encode('ascii', 'xmlcharrefreplace').decode('ascii')
+
+
+def con_cache(key):
+    cache = LRUCache('medir_correo', maxsize=64)
+
+    def escape(html):
+        escaped = cache.get(key(html))
+        if escaped is None:
+            escaped = codificador(html)
+            cache.set(key(html), escaped)
+        return escaped
+    return escape
+
+
+def digest(html):
+    return hashlib.blake2b(html.encode('utf-8'), digest_size=16).digest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo por correo de escapar el cuerpo HTML (MailsBridge.escape_html) "
+        "con --correos copias del mismo aviso, cada una un str nuevo como al "
+        "armarlo para cada destinatario: los reemplazos anteriores, el "
+        "codificador xmlcharrefreplace solo y con un LRU (por el texto o por "
+        "su digest), comparado con armar y serializar el mensaje MIME que "
+        "envía cualquier backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--correos', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--parrafos', type=int, nargs='+', default=[5, 50, 500],
+                            help='Tamaños del cuerpo en párrafos (~110 bytes cada uno)')
+
+    def handle(self, *args, **options):
+        correos = options['correos']
+        for parrafos in options['parrafos']:
+            def cuerpos():
+                # Un str distinto por correo: su hash no está calculado todavía
+                return [''.join(('<html><body>', PARRAFO * parrafos, '</body></html>')) for _ in range(correos)]
+
+            def medir(escape):
+                # Mejor tiempo por correo; los cuerpos se arman fuera de la medición
+                best = None
+                for _ in range(options['repeat']):
+                    pendientes = cuerpos()
+                    start = time.perf_counter()
+                    for html in pendientes:
+                        escape(html)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                return best / correos * 1e6
+
+            size = len(cuerpos()[0].encode('utf-8'))
+            resultados = {
+                'reemplazos': medir(reemplazos),
+                'codificador': medir(codificador),
+                'LRU por texto': medir(con_cache(lambda html: html)),
+                'LRU por digest': medir(con_cache(digest)),
+            }
+            html = codificador(cuerpos()[0])
+            mime = best_of(options['repeat'], lambda: [
+                MailsBridge.build_message('Aviso', '', 'escuela@example.com', 'alumno@example.com',
+                                          None, None, html).message().as_bytes()
+                for _ in range(20)
+            ]) / 20 * 1000
+            detalle = ', '.join(f'{name} {us:.1f} µs' for name, us in resultados.items())
+            self.stdout.write(f"{size / 1024:.1f} KB: {detalle}; mensaje MIME {mime:.1f} µs")
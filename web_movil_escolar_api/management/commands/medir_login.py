@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+from web_movil_escolar_api.hashing import HashingBusy, PasswordHashingService
+
+PASSWORD = 'contraseña-de-prueba'
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de verificar la contraseña en un login (PBKDF2) con "
+        "--concurrency peticiones a la vez: directo en el hilo de la petición "
+        "(como ModelBackend) contra PasswordHashingService (HashingModelBackend). "
+        "Reporta p50, p99, máximo, logins por segundo y rechazos 503. No usa "
+        "la base de datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=64)
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Peticiones simultáneas (hilos del servidor)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hilos del pool (por defecto PASSWORD_HASHING_WORKERS o núcleos)')
+        parser.add_argument('--max-pending', type=int, default=None)
+        parser.add_argument('--timeout', type=float, default=None)
+        parser.add_argument('--hasher', default='default',
+                            help='Algoritmo de PASSWORD_HASHERS (por defecto el primero)')
+
+    def handle(self, *args, **options):
+        encoded = hashers.make_password(PASSWORD, hasher=options['hasher'])
+        algorithm = hashers.identify_hasher(encoded).algorithm
+        service = PasswordHashingService(max_workers=options['workers'], max_pending=options['max_pending'],
+                                         timeout=options['timeout'])
+        self.stdout.write(
+            f"{options['logins']} logins, {options['concurrency']} a la vez, pool de "
+            f"{service.max_workers} hilos + {service.max_pending} en espera ({algorithm})"
+        )
+        self.measure('directo', lambda: hashers.check_password(PASSWORD, encoded), options)
+        self.measure('pool', lambda: service.check_password(PASSWORD, encoded), options)
+
+    def measure(self, name, check, options):
+        latencies = []
+        rejected = 0
+        lock = threading.Lock()
+
+        def login():
+            nonlocal rejected
+            start = time.perf_counter()
+            try:
+                ok = check()
+            except HashingBusy:
+                with lock:
+                    rejected += 1
+                return
+            elapsed = (time.perf_counter() - start) * 1000
+            if not ok:
+                raise AssertionError('La contraseña no coincide')
+            with lock:
+                latencies.append(elapsed)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(lambda i: login(), range(options['logins'])))
+        total = time.perf_counter() - start
+        if not latencies:
+            self.stdout.write(f"{name}: todos los logins se rechazaron ({rejected})")
+            return
+        self.stdout.write(
+            f"{name}: p50 {percentile(latencies, 50):.0f} ms, p99 {percentile(latencies, 99):.0f} ms, "
+            f"máx {max(latencies):.0f} ms, {len(latencies) / total:.1f} logins/s, {rejected} rechazados (503)"
+        )
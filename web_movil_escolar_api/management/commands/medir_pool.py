@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from web_movil_escolar_api.db.pool import ConnectionPool, PooledDatabaseWrapperMixin
+from web_movil_escolar_api.management.commands.medir_login import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de una petición corta (obtener conexión, SELECT 1, "
+        "liberarla) con --concurrency hilos: abriendo y cerrando una conexión "
+        "por petición (CONN_MAX_AGE = 0 sin pool) contra ConnectionPool. Usa "
+        "los parámetros de conexión del alias (--database); --connect-delay "
+        "simula la latencia de red al conectar a un servidor remoto."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Peticiones simultáneas (hilos del servidor)')
+        parser.add_argument('--max-size', type=int, default=4, help='MAX_SIZE del pool')
+        parser.add_argument('--connect-delay', type=float, default=0,
+                            help='Segundos extra al abrir cada conexión')
+
+    def handle(self, *args, **options):
+        wrapper = connections[options['database']]
+        params = wrapper.get_connection_params()
+        if isinstance(wrapper, PooledDatabaseWrapperMixin):
+            # Conexión directa aunque el alias ya use el pool
+            base_connect = lambda: super(PooledDatabaseWrapperMixin, wrapper).get_new_connection(params)
+        else:
+            base_connect = lambda: wrapper.get_new_connection(params)
+
+        def connect():
+            if options['connect_delay']:
+                time.sleep(options['connect_delay'])
+            return base_connect()
+
+        pool = ConnectionPool('medir_pool', connect, lambda connection: True,
+                              {'MIN_SIZE': 1, 'MAX_SIZE': options['max_size']})
+        self.stdout.write(
+            f"{options['requests']} peticiones, {options['concurrency']} a la vez, "
+            f"{wrapper.vendor}, conexión +{options['connect_delay'] * 1000:.0f} ms"
+        )
+        self.measure('sin pool', connect, lambda connection: connection.close(), options)
+        try:
+            self.measure(f"pool de {options['max_size']}", pool.acquire, pool.release, options)
+            stats = pool.stats()
+            self.stdout.write(
+                f"  pool: {stats['created']} conexiones abiertas, {stats['reused']} reutilizadas, "
+                f"{stats['waits']} esperas, {stats['timeouts']} timeouts"
+            )
+        finally:
+            pool.close_all()
+
+    def measure(self, name, acquire, release, options):
+        latencies = []
+        lock = threading.Lock()
+
+        def request():
+            start = time.perf_counter()
+            connection = acquire()
+            try:
+                cursor = connection.cursor()
+                cursor.execute('SELECT 1')
+                cursor.fetchall()
+                cursor.close()
+            finally:
+                release(connection)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(lambda i: request(), range(options['requests'])))
+        total = time.perf_counter() - start
+        self.stdout.write(
+            f"{name}: p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms, "
+            f"máx {max(latencies):.2f} ms, {len(latencies) / total:.0f} peticiones/s"
+        )
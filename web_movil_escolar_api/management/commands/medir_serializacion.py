@@ -0,0 +1,97 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from web_movil_escolar_api.fast_serializers import FastSerializer
+from web_movil_escolar_api.management.commands.auditar_consultas import Rollback, seed
+from web_movil_escolar_api.renderers import FastJSONRenderer, orjson
+from web_movil_escolar_api.serializers import *
+from web_movil_escolar_api.views.alumnos import AlumnosAll
+from web_movil_escolar_api.views.maestros import MaestrosAll
+from web_movil_escolar_api.views.materias import MateriasAll
+from web_movil_escolar_api.views.users import AdminAll
+
+# Vista (para el queryset), serializer y relaciones precargadas de cada lista
+LISTS = {
+    'lista-materias': (MateriasAll, MateriaSerializer, ()),
+    'lista-alumnos': (AlumnosAll, AlumnoSerializer, ()),
+    'lista-maestros': (MaestrosAll, MaestroSerializer, ('materias_impartibles',)),
+    'lista-admins': (AdminAll, AdminSerializer, ()),
+}
+
+
+def best_of(repeat, func):
+    """Mejor tiempo en milisegundos de `repeat` ejecuciones"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de generar el JSON de una página de cada lista "
+        "(lista-materias, lista-alumnos, lista-maestros, lista-admins): el "
+        "serializer de DRF contra FastSerializer y JSONRenderer contra "
+        "FastJSONRenderer. Termina con error si los bytes no son idénticos. "
+        "Con --seed N primero inserta N registros por tabla dentro de una "
+        "transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Registros de prueba por tabla (se revierten al terminar)')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson no está instalado: FastJSONRenderer usa el json de DRF"))
+        mismatches = []
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    seed(options['seed'])
+                for name in LISTS:
+                    if not self.measure(name, options['page_size'], options['repeat']):
+                        mismatches.append(name)
+                if options['seed']:
+                    raise Rollback()
+        except Rollback:
+            pass
+        if mismatches:
+            raise CommandError(f"El JSON no es idéntico en: {', '.join(mismatches)}")
+
+    def page(self, name, page_size):
+        view_class, serializer_class, prefetch = LISTS[name]
+        queryset, sort_field, descending = view_class().filter_queryset(RequestFactory().get('/'))
+        return list(queryset.prefetch_related(*prefetch).order_by(f'-{sort_field}' if descending else sort_field)[:page_size])
+
+    def measure(self, name, page_size, repeat):
+        rows = self.page(name, page_size)
+        serializer_class = LISTS[name][1]
+        fast_serializer = FastSerializer(serializer_class)
+        data = serializer_class(rows, many=True).data
+        drf, fast = JSONRenderer(), FastJSONRenderer()
+        expected = drf.render(data)
+
+        identical = drf.render(fast_serializer.many(rows)) == expected
+        drf_ms = best_of(repeat, lambda: serializer_class(rows, many=True).data)
+        fast_ms = best_of(repeat, lambda: fast_serializer.many(rows))
+        self.stdout.write(
+            f"{name} ({len(rows)} filas): {serializer_class.__name__} {drf_ms:.3f} ms, "
+            f"FastSerializer {fast_ms:.3f} ms (x{drf_ms / fast_ms:.1f}){'' if identical else ' DIFERENTE'}"
+        )
+
+        rendered = fast.render(data) == expected
+        drf_ms = best_of(repeat, lambda: drf.render(data))
+        fast_ms = best_of(repeat, lambda: fast.render(data))
+        self.stdout.write(
+            f"{name} ({len(expected)} bytes): JSONRenderer {drf_ms:.3f} ms, "
+            f"FastJSONRenderer {fast_ms:.3f} ms (x{drf_ms / fast_ms:.1f}){'' if rendered else ' DIFERENTE'}"
+        )
+        return identical and rendered
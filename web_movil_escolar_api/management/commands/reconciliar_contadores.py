@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from web_movil_escolar_api import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde la base los totales de usuarios activos por rol que "
+        "usa /api/total-usuarios/ (tabla TotalUsuarios, compartida por todos "
+        "los procesos). Pensado para ejecutarse periódicamente (cron)."
+    )
+
+    def handle(self, *args, **options):
+        totals = counters.reconcile()
+        for role, total in totals.items():
+            self.stdout.write(f"{role}: {total}")
+        self.stdout.write(self.style.SUCCESS("Contadores reconciliados"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from web_movil_escolar_api import timetables
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye los horarios materializados de todos los maestros y "
+        "programas educativos (por ejemplo, después de migrar o de cargar "
+        "materias directamente en la base de datos)."
+    )
+
+    def handle(self, *args, **options):
+        total = timetables.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Horarios reconstruidos: {total}"))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_movil_escolar_api', '0007_alter_alumnos_fecha_nacimiento_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Horario',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('maestro', 'Maestro'), ('programa', 'Programa educativo')], max_length=10)),
+                ('clave', models.CharField(max_length=100)),
+                ('dias', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('tipo', 'clave')},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:42
+
+import json
+import unicodedata
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def normalizar(texto):
+    # Igual que search_index.normalize: minúsculas y sin acentos (collation *_ci/ai)
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in texto if not unicodedata.combining(c)).casefold()
+
+
+def parse_materias(value):
+    # Misma lógica que MaestroMateria.parse (las migraciones no importan el modelo real)
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError:
+        parsed = value.split(',')
+    if not isinstance(parsed, list):
+        return []
+    nombres = {}
+    for v in parsed:
+        nombre = str(v).strip()[:200] if v is not None else ''
+        if nombre:
+            nombres.setdefault(normalizar(nombre), nombre)
+    return list(nombres.values())
+
+
+def copiar_materias(apps, schema_editor):
+    Maestros = apps.get_model('web_movil_escolar_api', 'Maestros')
+    MaestroMateria = apps.get_model('web_movil_escolar_api', 'MaestroMateria')
+    pendientes = []
+    rows = Maestros.objects.exclude(materias_json__isnull=True).values_list('id', 'materias_json')
+    for maestro_id, materias_json in rows.iterator(chunk_size=2000):
+        for nombre in parse_materias(materias_json):
+            pendientes.append(MaestroMateria(maestro_id=maestro_id, nombre=nombre))
+        if len(pendientes) >= 2000:
+            MaestroMateria.objects.bulk_create(pendientes)
+            pendientes = []
+    MaestroMateria.objects.bulk_create(pendientes)
+
+
+def restaurar_materias(apps, schema_editor):
+    Maestros = apps.get_model('web_movil_escolar_api', 'Maestros')
+    MaestroMateria = apps.get_model('web_movil_escolar_api', 'MaestroMateria')
+    materias = {}
+    for maestro_id, nombre in MaestroMateria.objects.order_by('id').values_list('maestro_id', 'nombre'):
+        materias.setdefault(maestro_id, []).append(nombre)
+    for maestro_id, nombres in materias.items():
+        Maestros.objects.filter(id=maestro_id).update(materias_json=json.dumps(nombres))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_movil_escolar_api', '0008_horario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaestroMateria',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('nombre', models.CharField(db_index=True, max_length=200)),
+                ('maestro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materias_impartibles', to='web_movil_escolar_api.maestros')),
+            ],
+            options={
+                'ordering': ['id'],
+                'unique_together': {('maestro', 'nombre')},
+            },
+        ),
+        migrations.RunPython(copiar_materias, restaurar_materias),
+        migrations.RemoveField(
+            model_name='maestros',
+            name='materias_json',
+        ),
+    ]
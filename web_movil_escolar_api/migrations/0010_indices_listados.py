@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+# Índices en auth_user para las listas de perfiles: filtran user__is_active
+# y ordenan por user__first_name, user__last_name o user__email (desempate
+# por id). auth_user es de django.contrib.auth, así que no se pueden declarar
+# en Meta.indexes y se crean aquí con el schema editor (sirve en MySQL,
+# PostgreSQL y SQLite).
+USER_INDEXES = [
+    models.Index(fields=['is_active', 'first_name', 'id'], name='user_activo_nombre_idx'),
+    models.Index(fields=['is_active', 'last_name', 'id'], name='user_activo_apellido_idx'),
+    models.Index(fields=['is_active', 'email', 'id'], name='user_activo_email_idx'),
+]
+
+
+def crear_indices_usuario(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in USER_INDEXES:
+        schema_editor.add_index(User, index)
+
+
+def borrar_indices_usuario(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    for index in USER_INDEXES:
+        schema_editor.remove_index(User, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_movil_escolar_api', '0009_maestromateria'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='administradores',
+            index=models.Index(fields=['clave_admin', 'id'], name='admin_clave_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alumnos',
+            index=models.Index(fields=['matricula', 'id'], name='alumno_matricula_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maestros',
+            index=models.Index(fields=['id_trabajador', 'id'], name='maestro_trabajador_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materia',
+            index=models.Index(fields=['nombre_materia', 'id'], name='materia_nombre_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materia',
+            index=models.Index(fields=['seccion', 'id'], name='materia_seccion_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materia',
+            index=models.Index(fields=['salon', 'id'], name='materia_salon_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materia',
+            index=models.Index(fields=['programa_educativo', 'hora_inicio'], name='materia_programa_hora_idx'),
+        ),
+        migrations.RunPython(crear_indices_usuario, borrar_indices_usuario),
+    ]
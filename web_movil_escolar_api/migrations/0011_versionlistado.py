@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_movil_escolar_api', '0010_indices_listados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionListado',
+            fields=[
+                ('recurso', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
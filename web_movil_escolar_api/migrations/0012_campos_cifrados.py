@@ -0,0 +1,175 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:12
+
+import base64
+import hashlib
+import hmac
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from django.conf import settings
+from django.db import migrations
+import web_movil_escolar_api.encrypted_fields
+
+# Campos que pasan a guardarse cifrados, con su índice ciego <campo>_idx
+CAMPOS = {
+    'Administradores': ('telefono', 'rfc'),
+    'Alumnos': ('curp', 'rfc', 'telefono'),
+    'Maestros': ('telefono', 'rfc'),
+}
+
+
+class Cifrado:
+    """
+    Copia de CypherUtils (cypher_utils.py) tal como estaba al escribir esta
+    migración, para que los datos se sigan cifrando y descifrando igual
+    aunque ese módulo cambie después. Solo toma de settings las llaves.
+    """
+
+    def __init__(self):
+        salt = getattr(settings, 'CRYPTO_SALT', 'hdjk').encode('utf-8')
+        iterations = getattr(settings, 'CRYPTO_ITERATIONS', 1000)
+
+        def derive(secret, salt):
+            return PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations).derive(secret)
+
+        passwords = (settings.CRYPTO_PASSWORD,) + tuple(getattr(settings, 'CRYPTO_OLD_PASSWORDS', ()))
+        self.keyring = MultiFernet([
+            Fernet(base64.urlsafe_b64encode(derive(password.encode('utf-8'), salt))) for password in passwords
+        ])
+        self.index_key = derive(settings.CRYPTO_INDEX_KEY.encode('utf-8'), salt + b':indice')
+
+    def encripta(self, valor):
+        return None if valor is None else self.keyring.encrypt(valor.encode('utf-8')).decode('utf-8')
+
+    def desencripta(self, valor):
+        # Una fila que no se cifró conserva su valor en claro
+        if valor is None:
+            return None
+        try:
+            return self.keyring.decrypt(str(valor).encode('utf-8')).decode('utf-8')
+        except InvalidToken:
+            return str(valor)
+
+    def indice_ciego(self, valor):
+        if valor is None:
+            return None
+        return hmac.new(self.index_key, str(valor).strip().upper().encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _actualizar(schema_editor, Model, columnas, filas):
+    """UPDATE por id con executemany, por bloques de 500 filas"""
+    quote = schema_editor.quote_name
+    sql = 'UPDATE %s SET %s WHERE id = %%s' % (
+        quote(Model._meta.db_table), ', '.join(f'{quote(columna)} = %s' for columna in columnas),
+    )
+    with schema_editor.connection.cursor() as cursor:
+        for inicio in range(0, len(filas), 500):
+            cursor.executemany(sql, filas[inicio:inicio + 500])
+
+
+def cifrar_campos(apps, schema_editor):
+    cifrado = Cifrado()
+    for model_name, campos in CAMPOS.items():
+        Model = apps.get_model('web_movil_escolar_api', model_name)
+        columnas = [columna for campo in campos for columna in (campo, f'{campo}_idx')]
+        filas = []
+        for pk, *valores in Model.objects.values_list('id', *campos).iterator(chunk_size=2000):
+            fila = []
+            for valor in valores:
+                # Las filas anteriores están en claro
+                claro = cifrado.desencripta(valor)
+                fila += [cifrado.encripta(claro), cifrado.indice_ciego(claro)]
+            filas.append(fila + [pk])
+        _actualizar(schema_editor, Model, columnas, filas)
+
+
+def descifrar_campos(apps, schema_editor):
+    cifrado = Cifrado()
+    for model_name, campos in CAMPOS.items():
+        Model = apps.get_model('web_movil_escolar_api', model_name)
+        filas = [
+            [cifrado.desencripta(valor) for valor in valores] + [pk]
+            for pk, *valores in Model.objects.values_list('id', *campos).iterator(chunk_size=2000)
+        ]
+        _actualizar(schema_editor, Model, campos, filas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_movil_escolar_api', '0011_versionlistado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='administradores',
+            name='rfc_idx',
+            field=web_movil_escolar_api.encrypted_fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='rfc'),
+        ),
+        migrations.AddField(
+            model_name='administradores',
+            name='telefono_idx',
+            field=web_movil_escolar_api.encrypted_fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='telefono'),
+        ),
+        migrations.AddField(
+            model_name='alumnos',
+            name='curp_idx',
+            field=web_movil_escolar_api.encrypted_fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='curp'),
+        ),
+        migrations.AddField(
+            model_name='alumnos',
+            name='rfc_idx',
+            field=web_movil_escolar_api.encrypted_fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='rfc'),
+        ),
+        migrations.AddField(
+            model_name='alumnos',
+            name='telefono_idx',
+            field=web_movil_escolar_api.encrypted_fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='telefono'),
+        ),
+        migrations.AddField(
+            model_name='maestros',
+            name='rfc_idx',
+            field=web_movil_escolar_api.encrypted_fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='rfc'),
+        ),
+        migrations.AddField(
+            model_name='maestros',
+            name='telefono_idx',
+            field=web_movil_escolar_api.encrypted_fields.BlindIndexField(blank=True, db_index=True, editable=False, max_length=64, null=True, source='telefono'),
+        ),
+        migrations.AlterField(
+            model_name='administradores',
+            name='rfc',
+            field=web_movil_escolar_api.encrypted_fields.EncryptedCharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='administradores',
+            name='telefono',
+            field=web_movil_escolar_api.encrypted_fields.EncryptedCharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='alumnos',
+            name='curp',
+            field=web_movil_escolar_api.encrypted_fields.EncryptedCharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='alumnos',
+            name='rfc',
+            field=web_movil_escolar_api.encrypted_fields.EncryptedCharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='alumnos',
+            name='telefono',
+            field=web_movil_escolar_api.encrypted_fields.EncryptedCharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='maestros',
+            name='rfc',
+            field=web_movil_escolar_api.encrypted_fields.EncryptedCharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name='maestros',
+            name='telefono',
+            field=web_movil_escolar_api.encrypted_fields.EncryptedCharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(cifrar_campos, descifrar_campos),
+    ]
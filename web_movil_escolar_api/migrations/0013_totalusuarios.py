@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_movil_escolar_api', '0012_campos_cifrados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TotalUsuarios',
+            fields=[
+                ('rol', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('total', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
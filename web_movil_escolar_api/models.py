@@ -1,22 +1,37 @@
 # models.py - versión simplificada
+import json
 from django.db import models
 from django.contrib.auth.models import User
 from rest_framework.authentication import TokenAuthentication
+from web_movil_escolar_api.token_cache import token_cache
+from web_movil_escolar_api.encrypted_fields import BlindIndexField, EncryptedCharField
 
 class BearerTokenAuthentication(TokenAuthentication):
     keyword = "Bearer"
 
+    def authenticate_credentials(self, key):
+        # Evita la consulta Token + User en cada petición autenticada
+        return token_cache.authenticate(key, super().authenticate_credentials)
+
 class Administradores(models.Model):
     id = models.BigAutoField(primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=False, blank=False, default=None)
     clave_admin = models.CharField(max_length=255, null=True, blank=True)
-    telefono = models.CharField(max_length=255, null=True, blank=True)
-    rfc = models.CharField(max_length=255, null=True, blank=True)
+    telefono = EncryptedCharField(max_length=255, null=True, blank=True)
+    telefono_idx = BlindIndexField('telefono')
+    rfc = EncryptedCharField(max_length=255, null=True, blank=True)
+    rfc_idx = BlindIndexField('rfc')
     edad = models.IntegerField(null=True, blank=True)
     ocupacion = models.CharField(max_length=255, null=True, blank=True)
     creation = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     update = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        # Ordenamiento de lista-admins por clave_admin (desempate por id)
+        indexes = [
+            models.Index(fields=['clave_admin', 'id'], name='admin_clave_id_idx'),
+        ]
+
     def __str__(self):
         return f"Admin: {self.user.first_name} {self.user.last_name}"
 
@@ -24,15 +39,24 @@ class Alumnos(models.Model):
     id = models.BigAutoField(primary_key=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=False, blank=False, default=None)
     matricula = models.CharField(max_length=255, null=True, blank=True)
-    curp = models.CharField(max_length=255, null=True, blank=True)
-    rfc = models.CharField(max_length=255, null=True, blank=True)
+    curp = EncryptedCharField(max_length=255, null=True, blank=True)
+    curp_idx = BlindIndexField('curp')
+    rfc = EncryptedCharField(max_length=255, null=True, blank=True)
+    rfc_idx = BlindIndexField('rfc')
     fecha_nacimiento = models.DateField(null=True, blank=True)  # Cambiado a DateField
     edad = models.IntegerField(null=True, blank=True)
-    telefono = models.CharField(max_length=255, null=True, blank=True)
+    telefono = EncryptedCharField(max_length=255, null=True, blank=True)
+    telefono_idx = BlindIndexField('telefono')
     ocupacion = models.CharField(max_length=255, null=True, blank=True)
     creation = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     update = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        # Ordenamiento de lista-alumnos por matricula (desempate por id)
+        indexes = [
+            models.Index(fields=['matricula', 'id'], name='alumno_matricula_id_idx'),
+        ]
+
     def __str__(self):
         return f"Alumno: {self.user.first_name} {self.user.last_name}"
 
@@ -41,18 +65,70 @@ class Maestros(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=False, blank=False, default=None)
     id_trabajador = models.CharField(max_length=255, null=True, blank=True)
     fecha_nacimiento = models.DateField(null=True, blank=True)  # Cambiado a DateField
-    telefono = models.CharField(max_length=255, null=True, blank=True)
-    rfc = models.CharField(max_length=255, null=True, blank=True)
+    telefono = EncryptedCharField(max_length=255, null=True, blank=True)
+    telefono_idx = BlindIndexField('telefono')
+    rfc = EncryptedCharField(max_length=255, null=True, blank=True)
+    rfc_idx = BlindIndexField('rfc')
     cubiculo = models.CharField(max_length=255, null=True, blank=True)
     edad = models.IntegerField(null=True, blank=True)
     area_investigacion = models.CharField(max_length=255, null=True, blank=True)
-    materias_json = models.TextField(null=True, blank=True)
     creation = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     update = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        # Ordenamiento de lista-maestros por id_trabajador (desempate por id)
+        indexes = [
+            models.Index(fields=['id_trabajador', 'id'], name='maestro_trabajador_id_idx'),
+        ]
+
     def __str__(self):
         return f"Maestro: {self.user.first_name} {self.user.last_name}"
 
+# Materias que puede impartir un maestro (antes Maestros.materias_json, un
+# texto JSON); el índice en nombre permite filtrar maestros por materia
+class MaestroMateria(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    maestro = models.ForeignKey(Maestros, on_delete=models.CASCADE, related_name='materias_impartibles')
+    nombre = models.CharField(max_length=200, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        unique_together = ('maestro', 'nombre')
+
+    def __str__(self):
+        return f"{self.nombre} - {self.maestro_id}"
+
+    @staticmethod
+    def parse(value):
+        """
+        Acepta una lista, un texto JSON o un texto separado por comas; sin
+        repetidos. "Cálculo" y "calculo" son el mismo nombre para la
+        collation *_ci/ai de MySQL (y para unique_together): se conserva el
+        primero.
+        """
+        from web_movil_escolar_api.search_index import normalize
+        if isinstance(value, str):
+            try:
+                parsed = json.loads(value)
+            except json.JSONDecodeError:
+                parsed = value.split(',')
+            value = parsed
+        if not isinstance(value, (list, tuple)):
+            return []
+        nombres = {}
+        for v in value:
+            nombre = str(v).strip()[:200] if v is not None else ''
+            if nombre:
+                nombres.setdefault(normalize(nombre), nombre)
+        return list(nombres.values())
+
+    @classmethod
+    def replace_for(cls, maestro, value):
+        """Reemplaza las materias del maestro por las de `value`"""
+        cls.objects.filter(maestro=maestro).delete()
+        cls.objects.bulk_create([cls(maestro=maestro, nombre=nombre) for nombre in cls.parse(value)])
+
+
 class Materia(models.Model):
     id = models.BigAutoField(primary_key=True)
     nrc = models.CharField(max_length=6, unique=True, null=False, blank=False)
@@ -68,5 +144,56 @@ class Materia(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Un índice (campo, id) por cada opción de sort_by de lista-materias;
+        # (programa_educativo, hora_inicio) para los horarios por programa
+        indexes = [
+            models.Index(fields=['nombre_materia', 'id'], name='materia_nombre_id_idx'),
+            models.Index(fields=['seccion', 'id'], name='materia_seccion_id_idx'),
+            models.Index(fields=['salon', 'id'], name='materia_salon_id_idx'),
+            models.Index(fields=['programa_educativo', 'hora_inicio'], name='materia_programa_hora_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre_materia} - {self.nrc}"
+
+# Horario semanal materializado de un maestro o de un programa educativo
+# (web_movil_escolar_api/timetables.py); se reconstruye al cambiar materias
+class Horario(models.Model):
+    TIPOS = (
+        ('maestro', 'Maestro'),
+        ('programa', 'Programa educativo'),
+    )
+    id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    clave = models.CharField(max_length=100)
+    dias = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('tipo', 'clave')
+
+    def __str__(self):
+        return f"Horario {self.tipo}: {self.clave}"
+
+# Versión de cada listado (lista-materias, lista-alumnos, ...): avanza con
+# cada escritura y da el ETag de las respuestas
+# (web_movil_escolar_api/versions.py)
+class VersionListado(models.Model):
+    recurso = models.CharField(max_length=20, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.recurso} v{self.valor}"
+
+# Total de usuarios activos por rol para /api/total-usuarios/
+# (web_movil_escolar_api/counters.py); las señales lo ajustan en la misma
+# transacción y `reconciliar_contadores` lo recalcula
+class TotalUsuarios(models.Model):
+    rol = models.CharField(max_length=20, primary_key=True)
+    total = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"{self.nombre_materia} - {self.nrc}"
\ No newline at end of file
+        return f"{self.rol}: {self.total}"
@@ -0,0 +1,203 @@
+import base64
+import datetime
+import json
+from collections import OrderedDict
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre el par (campo de ordenamiento, id).
+
+    En lugar de COUNT(*) + OFFSET n, cada página busca directamente a partir
+    del último registro visto con WHERE (campo, id) > (valor, id), por lo que
+    el costo no crece con la profundidad de la página. El conteo total solo
+    se calcula si el cliente lo pide con ?include_count=true.
+
+    La vista asigna sort_field y descending antes de paginar, igual que
+    hace con page_size en PageNumberPagination. El valor del campo va en el
+    cursor como JSON: fechas, horas y Decimal se guardan como texto ISO y el
+    ORM los vuelve a convertir al filtrar. Un cursor inválido o alterado
+    responde 400.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    invalid_cursor_message = 'Cursor inválido'
+
+    sort_field = 'id'
+    descending = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = None
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor['r'] if cursor else False
+
+        if self.include_count(request):
+            self.count = queryset.order_by().count()
+
+        queryset = queryset.order_by(*self.get_ordering(reverse))
+        if cursor:
+            try:
+                queryset = queryset.filter(self.get_seek_filter(cursor['v'], cursor['i'], reverse))
+            except (ValidationError, ValueError, TypeError):
+                # El valor no corresponde al tipo del campo (p. ej. una fecha inválida)
+                raise ParseError(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    def iterate(self, queryset, chunk_size=2000):
+        """
+        Recorre todo el queryset en el orden de sort_field/descending,
+        consultando bloques de chunk_size con el mismo filtro de búsqueda
+        por cursor. Cada bloque es una consulta corta con LIMIT, así que la
+        memoria no depende del tamaño de la tabla aunque el driver (MySQL)
+        cargue en memoria el resultado completo de cada consulta.
+        """
+        ordered = queryset.order_by(*self.get_ordering())
+        last = None
+        while True:
+            page = ordered
+            if last is not None:
+                page = page.filter(self.get_seek_filter(
+                    None if self.sort_field == 'id' else self.get_row_value(last, self.sort_field),
+                    self.get_row_value(last, 'id'),
+                ))
+            rows = list(page[:chunk_size])
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1]
+
+    def get_paginated_response(self, data):
+        content = OrderedDict()
+        if self.count is not None:
+            content['count'] = self.count
+        content['next'] = self.get_next_link()
+        content['previous'] = self.get_previous_link()
+        content['results'] = data
+        return Response(content)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_ordering(self, reverse=False):
+        # Ascendente: NULL primero; descendente: NULL al final. Así el orden
+        # invertido de una dirección es exactamente la otra dirección.
+        descending = self.descending != reverse
+        if self.sort_field == 'id':
+            return ['-id' if descending else 'id']
+        if descending:
+            return [F(self.sort_field).desc(nulls_last=True), '-id']
+        return [F(self.sort_field).asc(nulls_first=True), 'id']
+
+    def get_seek_filter(self, value, pk, reverse=False):
+        descending = self.descending != reverse
+        field = self.sort_field
+        if field == 'id':
+            return Q(id__lt=pk) if descending else Q(id__gt=pk)
+
+        if descending:
+            if value is None:
+                return Q(**{f'{field}__isnull': True, 'id__lt': pk})
+            return (Q(**{f'{field}__lt': value}) |
+                    Q(**{field: value, 'id__lt': pk}) |
+                    Q(**{f'{field}__isnull': True}))
+
+        if value is None:
+            return Q(**{f'{field}__isnull': True, 'id__gt': pk}) | Q(**{f'{field}__isnull': False})
+        return Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})
+
+    def get_row_value(self, row, field):
+        # Acepta instancias de modelo o diccionarios de .values()
+        if isinstance(row, dict):
+            return row[field]
+        value = row
+        for part in field.split('__'):
+            value = getattr(value, part)
+        return value
+
+    def cursor_value(self, value):
+        # Tipos que json no representa: como texto, que el filtro del ORM acepta
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        if value is None or isinstance(value, (str, int)) and not isinstance(value, bool):
+            return value
+        raise TypeError(f'KeysetPagination no puede ordenar por {self.sort_field} ({type(value).__name__})')
+
+    def encode_cursor(self, row, reverse):
+        payload = {
+            's': self.sort_field,
+            'd': self.descending,
+            'v': None if self.sort_field == 'id' else self.cursor_value(self.get_row_value(row, self.sort_field)),
+            'i': self.get_row_value(row, 'id'),
+            'r': reverse,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token.decode('ascii'))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            cursor = {'v': payload['v'], 'i': int(payload['i']), 'r': bool(payload['r'])}
+            if payload['s'] != self.sort_field or bool(payload['d']) != self.descending:
+                raise ValueError('El cursor pertenece a otro ordenamiento')
+            if isinstance(cursor['v'], (bool, dict, list, float)):
+                raise ValueError('Valor de cursor inválido')
+        except (TypeError, ValueError, KeyError, UnicodeError, AttributeError):
+            raise ParseError(self.invalid_cursor_message)
+        return cursor
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return self.encode_cursor(self.last_row, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_row is None:
+            # Página vacía: regresar al inicio del listado
+            return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, '')
+        return self.encode_cursor(self.first_row, reverse=True)
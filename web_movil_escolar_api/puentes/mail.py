@@ -3,33 +3,249 @@ from django.http import HttpResponse, Http404
 from django.core.mail import EmailMessage
 from rest_framework import status
 from rest_framework.response import Response
-from django.core.mail import EmailMessage
+from django.core.mail import get_connection
+import atexit
 import datetime
+import heapq
+import itertools
+import logging
 import os
+import queue
 import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marca para que un worker termine (se encola una por worker al apagar)
+_STOP = object()
+
+
+class MailQueue:
+    """
+    Cola acotada de correos con un número fijo de workers.
+
+    Cada worker toma hasta MAIL_BATCH_SIZE mensajes pendientes y los envía
+    por una sola conexión de get_connection() (una sesión SMTP por lote).
+    Un mensaje que falla se vuelve a intentar hasta MAIL_MAX_RETRIES veces:
+    se guarda en `delayed` con la hora del siguiente intento (espera
+    exponencial: MAIL_RETRY_BACKOFF, 2x, 4x...) y los workers lo toman
+    cuando se cumple, sin detener el envío de los demás correos mientras
+    tanto. Si la cola está llena el correo se envía en el hilo que lo pidió,
+    así la memoria y los hilos no crecen con una ráfaga de registros.
+
+    Al terminar el proceso drain() espera hasta MAIL_DRAIN_TIMEOUT segundos
+    los pendientes (también los reintentos) y cierra la cola: después put()
+    envía en el hilo que llama, un solo intento, sin volver a arrancar los
+    workers.
+
+    Funciona con cualquier EMAIL_BACKEND (smtp, console, locmem).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = None
+        self.workers = []
+        self.closed = False
+        # Reintentos pendientes: heap de (hora, secuencia, mensaje, intento)
+        self.delayed = []
+        self.sequence = itertools.count()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+        self.sent_inline = 0
+
+    def _setting(self, name, default):
+        return getattr(settings, name, default)
+
+    def start(self):
+        with self.lock:
+            if self.queue is not None or self.closed:
+                return
+            self.queue = queue.Queue(maxsize=self._setting('MAIL_QUEUE_SIZE', 1000))
+            for i in range(self._setting('MAIL_WORKERS', 2)):
+                worker = threading.Thread(target=self._work, args=(self.queue,), name=f'mail-worker-{i}', daemon=True)
+                worker.start()
+                self.workers.append(worker)
+            atexit.register(self.drain)
+
+    def put(self, message):
+        """Encola un EmailMessage; con la cola llena o ya cerrada lo envía en este hilo"""
+        self.start()
+        with self.lock:
+            if self.closed:
+                # drain() ya detuvo la cola (el proceso está terminando)
+                retry = False
+            else:
+                try:
+                    self.queue.put_nowait((message, 0))
+                    return
+                except queue.Full:
+                    self.sent_inline += 1
+                    retry = True
+        self.send_batch([(message, 0)], retry=retry)
+
+    def _due(self, limit):
+        # Reintentos cuya hora ya llegó (a lo más `limit`)
+        now = time.monotonic()
+        due = []
+        with self.lock:
+            while self.delayed and self.delayed[0][0] <= now and len(due) < limit:
+                due.append(heapq.heappop(self.delayed)[2:])
+        return due
+
+    def _next_retry_in(self):
+        # Segundos hasta el siguiente reintento, o None si no hay
+        with self.lock:
+            if not self.delayed:
+                return None
+            return max(self.delayed[0][0] - time.monotonic(), 0)
+
+    def _work(self, pending):
+        batch_size = self._setting('MAIL_BATCH_SIZE', 50)
+        stop = False
+        while True:
+            batch = self._due(batch_size)
+            taken = 0
+            while not stop and len(batch) < batch_size:
+                try:
+                    # Sin nada que enviar se espera un correo nuevo o el siguiente reintento
+                    item = pending.get(timeout=self._next_retry_in()) if not batch else pending.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                if batch:
+                    self.send_batch(batch)
+            finally:
+                for _ in range(taken):
+                    pending.task_done()
+            if stop and not batch:
+                # Antes de terminar se envían los reintentos pendientes
+                wait = self._next_retry_in()
+                if wait is None:
+                    return
+                time.sleep(wait)
+
+    def send_batch(self, items, retry=True):
+        """Envía (mensaje, intento) por una conexión; con retry los que fallan se reintentan después"""
+        connection = get_connection(fail_silently=False)
+        with self.lock:
+            self.batches += 1
+        try:
+            for message, attempt in items:
+                if not self._send(connection, message):
+                    self._failed(message, attempt, retry)
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _send(self, connection, message):
+        try:
+            # Con la conexión abierta antes, send_messages no la cierra
+            connection.open()
+            connection.send_messages([message])
+        except Exception:
+            logger.warning("Falló el envío del correo '%s' a %s", message.subject, message.to, exc_info=True)
+            # Se reabre para el siguiente mensaje del lote
+            try:
+                connection.close()
+            except Exception:
+                pass
+            return False
+        with self.lock:
+            self.sent += 1
+        return True
+
+    def _failed(self, message, attempt, retry):
+        if retry and attempt < self._setting('MAIL_MAX_RETRIES', 3):
+            due = time.monotonic() + self._setting('MAIL_RETRY_BACKOFF', 1) * 2 ** attempt
+            with self.lock:
+                self.retried += 1
+                heapq.heappush(self.delayed, (due, next(self.sequence), message, attempt + 1))
+            return
+        with self.lock:
+            self.failed += 1
+        logger.error("No se pudo enviar el correo '%s' a %s", message.subject, message.to)
+
+    def drain(self, timeout=None):
+        """
+        Envía lo pendiente (también los reintentos), detiene los workers y
+        cierra la cola (se llama al terminar el proceso)
+        """
+        if timeout is None:
+            timeout = self._setting('MAIL_DRAIN_TIMEOUT', 30)
+        with self.lock:
+            self.closed = True
+            workers, self.workers = self.workers, []
+            pending = self.queue
+            self.queue = None
+        if pending is None:
+            return True
+        deadline = time.monotonic() + timeout
+        for _ in workers:
+            try:
+                pending.put(_STOP, timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                break
+        for worker in workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+        return not any(worker.is_alive() for worker in workers)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': len(self.workers),
+                'closed': self.closed,
+                'pending': self.queue.qsize() if self.queue is not None else 0,
+                'delayed': len(self.delayed),
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'batches': self.batches,
+                'sent_inline': self.sent_inline,
+            }
+
+
+mail_queue = MailQueue()
+
 
 class MailsBridge:
 
+    @staticmethod
+    def escape_html(html_message):
+        """
+        Convierte a referencias numéricas (á -> &#225;) todos los caracteres
+        no ASCII en una sola pasada del codificador. Sin cache: cuesta menos
+        que armar el mensaje MIME (ver `python manage.py medir_correo`).
+        """
+        if html_message.isascii():
+            return html_message
+        return html_message.encode('ascii', 'xmlcharrefreplace').decode('ascii')
+
     @staticmethod 
     def send_mail_async(subject=None,reply_email=None, from_email=None,to_email=None,cc=None,bcc=None,html_message=None):
 
         if html_message:
-            html_message = html_message.replace("á","&aacute;")
-            html_message = html_message.replace("é","&eacute;")
-            html_message = html_message.replace("í","&iacute;")
-            html_message = html_message.replace("ó","&oacute;")
-            html_message = html_message.replace("ú","&uacute;")
-            html_message = html_message.replace("Á","&Aacute;")
-            html_message = html_message.replace("É","&Eacute;")
-            html_message = html_message.replace("Í","&Iacute;")
-            html_message = html_message.replace("Ó","&Oacute;")
-            html_message = html_message.replace("Ú","&Uacute;")
-
-        send_thread = threading.Thread(target=MailsBridge.send_mail_sync, args=(subject, reply_email, from_email, to_email, cc, bcc, html_message))
-        send_thread.start() 
+            html_message = MailsBridge.escape_html(html_message)
+
+        # Los workers de mail_queue lo envían (sin un hilo nuevo por correo)
+        mail_queue.put(MailsBridge.build_message(subject, reply_email, from_email, to_email, cc, bcc, html_message))
 
     @staticmethod
     def send_mail_sync(subject=None,reply_email=None, from_email=None,to_email=None,cc=None,bcc=None,html_message_custom=None):
+        msg = MailsBridge.build_message(subject, reply_email, from_email, to_email, cc, bcc, html_message_custom)
+        res = msg.send()
+        return res
+
+    @staticmethod
+    def build_message(subject=None,reply_email=None, from_email=None,to_email=None,cc=None,bcc=None,html_message_custom=None):
 
         headers = {}
         if reply_email!="":
@@ -40,4 +256,4 @@ class MailsBridge:
         else:
             msg = EmailMessage(subject, html_message_custom, from_email, [to_email], bcc=[bcc], headers=headers)
         msg.content_subtype = "html"
-        res = msg.send()
\ No newline at end of file
+        return msg
\ No newline at end of file
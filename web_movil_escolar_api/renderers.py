@@ -0,0 +1,58 @@
+import codecs
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el json de DRF
+    orjson = None
+
+# Opciones para igualar la salida de JSONRenderer: fechas, horas y
+# Decimal pasan por el mismo JSONEncoder de DRF
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson. Produce los mismos bytes que JSONRenderer con la
+    configuración del proyecto (UNICODE_JSON, COMPACT_JSON, sin indentación);
+    para todo lo demás (indent=, otra configuración, llaves que no son
+    texto, enteros de más de 64 bits) usa el renderer de DRF.
+
+    Las únicas diferencias conocidas son los float en notación exponencial
+    (1e+16 contra 1e16) y NaN/Infinity (null); la API no tiene campos float.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None or self.ensure_ascii or not self.compact or
+            self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, ValueError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que JSONRenderer: U+2028 y U+2029 se escapan (subconjunto de JavaScript)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser con orjson para cuerpos UTF-8; otras codificaciones usan el de DRF"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
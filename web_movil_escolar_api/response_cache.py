@@ -0,0 +1,94 @@
+import functools
+import hashlib
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from web_movil_escolar_api.cache_utils import LRUCache
+from web_movil_escolar_api.versions import request_version
+
+
+class ListCache:
+    """
+    Cache de respuestas de las vistas lista-* (datos ya serializados).
+
+    La llave lleva la versión del recurso (versions.py), que avanza con
+    cada escritura, y la URL completa con sus parámetros (search, sort_by,
+    sort_order, page, page_size, cursor...). Al guardar o borrar un registro
+    las llaves anteriores dejan de consultarse y salen por LRU o TTL.
+
+    Primero se consulta un LRU local; si se define LIST_CACHE_ALIAS, también
+    un backend de Django (FileBasedCache, Redis, memcached) compartido entre
+    procesos.
+    """
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'LIST_CACHE_TTL', 300)
+        self.local = LRUCache('list_responses', maxsize=getattr(settings, 'LIST_CACHE_MAXSIZE', 256), ttl=self.ttl)
+        self.alias = getattr(settings, 'LIST_CACHE_ALIAS', None)
+        self.lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def key(self, request, recurso):
+        valor, _ = request_version(request, recurso)
+        url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+        return f'lista:{recurso}:{valor}:{url}'
+
+    def get(self, key):
+        data = self.local.get(key)
+        if data is not None or self.shared is None:
+            return data
+        data = self.shared.get(key)
+        with self.lock:
+            if data is None:
+                self.shared_misses += 1
+            else:
+                self.shared_hits += 1
+        if data is not None:
+            self.local.set(key, data)
+        return data
+
+    def set(self, key, data):
+        self.local.set(key, data)
+        if self.shared is not None:
+            self.shared.set(key, data, self.ttl)
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        stats = {'local': self.local.stats(), 'alias': self.alias}
+        if self.shared is not None:
+            with self.lock:
+                requests = self.shared_hits + self.shared_misses
+                stats['shared'] = {
+                    'hits': self.shared_hits,
+                    'misses': self.shared_misses,
+                    'hit_rate': round(self.shared_hits / requests, 4) if requests else None,
+                }
+        return stats
+
+
+list_cache = ListCache()
+
+
+def cached_list(recurso):
+    """Decorador para el get() de las vistas lista-*: responde desde list_cache"""
+    def decorator(get):
+        @functools.wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            key = list_cache.key(request, recurso)
+            data = list_cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = get(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                list_cache.set(key, response.data)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+from django.conf import settings
+from web_movil_escolar_api.cache_utils import Generation, LRUCache
+
+role_cache = LRUCache(
+    'user_roles',
+    maxsize=getattr(settings, 'ROLE_CACHE_MAXSIZE', 1024),
+    ttl=getattr(settings, 'ROLE_CACHE_TTL', 300),
+)
+# Generaciones compartidas: una global (cambios de grupos) y una por
+# usuario (cambios de membresía), para invalidar también en otros procesos
+roles_generation = Generation('roles')
+
+
+def user_generation(user_id):
+    return Generation(f'roles:{user_id}')
+
+
+def _generations(user_id):
+    # Una sola lectura del cache (con DatabaseCache, un solo SELECT)
+    return Generation.current_many((roles_generation, user_generation(user_id)))
+
+
+def get_user_roles(user):
+    """
+    Nombres de los grupos (roles) del usuario, ordenados por id de grupo
+    como lo hacía `user.groups.first()`. Se consultan una vez y se
+    conservan en cache entre peticiones hasta que cambie la membresía.
+
+    Además se guardan en la instancia (como el _perm_cache de ModelBackend):
+    request.user es una instancia por petición, así que varias revisiones
+    en la misma petición no vuelven a leer las generaciones.
+    """
+    if user is None or not user.is_authenticated:
+        return ()
+    roles = user.__dict__.get('_roles_cache')
+    if roles is not None:
+        return roles
+    generations = _generations(user.pk)
+    cached = role_cache.get(user.pk)
+    if cached is not None and cached[0] == generations:
+        roles = cached[1]
+    else:
+        roles = tuple(user.groups.order_by('id').values_list('name', flat=True))
+        role_cache.set(user.pk, (generations, roles))
+    user._roles_cache = roles
+    return roles
+
+
+def get_user_role(user):
+    """Rol principal del usuario (el primer grupo) o None"""
+    roles = get_user_roles(user)
+    return roles[0] if roles else None
+
+
+def is_admin_user(user):
+    return 'administrador' in get_user_roles(user)
+
+
+def invalidate_user(user_id):
+    role_cache.delete(user_id)
+    user_generation(user_id).bump()
+
+
+def invalidate_all():
+    role_cache.clear()
+    roles_generation.bump()
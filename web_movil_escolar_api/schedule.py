@@ -0,0 +1,349 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_time
+from web_movil_escolar_api.cache_utils import ChangeLog
+from web_movil_escolar_api.models import *
+from web_movil_escolar_api.search_index import normalize
+
+DIAS = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes')
+# Resolución de la rejilla de ocupación: 288 bits por día
+SLOT_MINUTES = 5
+
+
+def to_minutes(value):
+    """Minutos desde medianoche de un datetime.time o de un texto 'HH:MM[:SS]'"""
+    if isinstance(value, str):
+        # Materia.objects.create(hora_inicio='08:00') deja el texto en la
+        # instancia que reciben las señales; la base guarda un time
+        parsed = parse_time(value)
+        if parsed is None:
+            raise ValueError(f'Hora inválida: {value}')
+        value = parsed
+    return value.hour * 60 + value.minute
+
+
+def slot_mask(start, end):
+    """Bits de los bloques de SLOT_MINUTES que toca el intervalo [start, end) en minutos"""
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def free_ranges(bits, min_minutes=SLOT_MINUTES):
+    """Rangos (inicio, fin) en minutos de los bits encendidos contiguos"""
+    ranges = []
+    while bits:
+        low = (bits & -bits).bit_length() - 1
+        run = bits >> low
+        length = (~run & (run + 1)).bit_length() - 1
+        if length * SLOT_MINUTES >= min_minutes:
+            ranges.append((low * SLOT_MINUTES, (low + length) * SLOT_MINUTES))
+        bits &= ~(((1 << length) - 1) << low)
+    return ranges
+
+
+def room_key(salon):
+    """Los salones se comparan sin importar mayúsculas, acentos ni espacios"""
+    return normalize(salon).strip()
+
+
+def profesor_key(profesor_id):
+    # En PUT el id puede llegar como texto desde request.data
+    return int(profesor_id) if profesor_id not in (None, '') else None
+
+
+def dias_key(dias):
+    # Días válidos sin repetir, en el orden recibido
+    return tuple(dict.fromkeys(dia for dia in dias or () if dia in DIAS))
+
+
+class Slots:
+    """
+    Intervalos [inicio, fin) de un salón o profesor en un día, ordenados por
+    inicio. Una consulta de traslape busca con bisect solo los intervalos que
+    empiezan entre (inicio - duración máxima) y fin, así que cuesta
+    O(log n + k) aunque ya existan traslapes entre los registros guardados.
+    """
+    __slots__ = ('starts', 'items', 'max_length')
+
+    def __init__(self):
+        self.starts = []
+        self.items = []
+        self.max_length = 0
+
+    def add(self, start, end, materia_id):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.items.insert(position, (start, end, materia_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def remove(self, start, end, materia_id):
+        position = bisect_left(self.starts, start)
+        while position < len(self.items) and self.starts[position] == start:
+            if self.items[position][2] == materia_id:
+                del self.starts[position]
+                del self.items[position]
+                return
+            position += 1
+
+    def overlapping(self, start, end, exclude=()):
+        low = bisect_right(self.starts, start - self.max_length)
+        high = bisect_left(self.starts, end)
+        return [item for item in self.items[low:high] if item[1] > start and item[2] not in exclude]
+
+    def __len__(self):
+        return len(self.items)
+
+
+class Schedule:
+    """
+    Horario ocupado por salón y por profesor para cada día.
+
+    `rooms` y `profesores` van de (salón o id del profesor, día) a Slots;
+    `materias` guarda lo indexado de cada materia para poder quitarla.
+    `grid` es la rejilla de ocupación semanal de cada salón: un entero por
+    día donde cada bit es un bloque de SLOT_MINUTES, de modo que "¿está libre
+    este salón?" es un AND de bits. Al quitar una materia el día se vuelve a
+    calcular con los intervalos que quedan en Slots.
+    Sirve tanto para el índice global (ScheduleIndex) como para validar los
+    elementos de un lote entre sí.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+        self.profesores = {}
+        self.room_names = {}
+        self.materias = {}
+        self.grid = {}
+
+    def add(self, materia_id, nrc, salon, profesor_id, dias, hora_inicio, hora_fin):
+        self.remove(materia_id)
+        room = room_key(salon)
+        profesor_id = profesor_key(profesor_id)
+        start, end = to_minutes(hora_inicio), to_minutes(hora_fin)
+        dias = dias_key(dias)
+        self.materias[materia_id] = (nrc, room, profesor_id, dias, start, end)
+        self.room_names.setdefault(room, str(salon).strip())
+        days = self.grid.setdefault(room, [0] * len(DIAS))
+        mask = slot_mask(start, end)
+        for dia in dias:
+            self.rooms.setdefault((room, dia), Slots()).add(start, end, materia_id)
+            days[DIAS.index(dia)] |= mask
+            if profesor_id is not None:
+                self.profesores.setdefault((profesor_id, dia), Slots()).add(start, end, materia_id)
+
+    def add_materia(self, materia):
+        self.add(materia.id, materia.nrc, materia.salon, materia.profesor_asignado_id,
+                 materia.dias, materia.hora_inicio, materia.hora_fin)
+
+    def remove(self, materia_id):
+        entry = self.materias.pop(materia_id, None)
+        if entry is None:
+            return
+        nrc, room, profesor_id, dias, start, end = entry
+        for dia in dias:
+            slots = self.rooms.get((room, dia))
+            if slots is not None:
+                slots.remove(start, end, materia_id)
+                mask = 0
+                for item in slots.items:
+                    mask |= slot_mask(item[0], item[1])
+                self.grid[room][DIAS.index(dia)] = mask
+            if profesor_id is not None:
+                slots = self.profesores.get((profesor_id, dia))
+                if slots is not None:
+                    slots.remove(start, end, materia_id)
+
+    def _overlapping(self, table, key, dias, start, end, exclude):
+        found = {}
+        for dia in dias:
+            slots = table.get((key, dia))
+            if slots:
+                for item in slots.overlapping(start, end, exclude):
+                    found.setdefault(item[2], dia)
+        return [(materia_id, self.materias[materia_id][0], dia) for materia_id, dia in found.items()]
+
+    def conflicts(self, dias, hora_inicio, hora_fin, salon=None, profesor_id=None, exclude=()):
+        """
+        Materias que se traslapan con el horario dado en el mismo salón o con
+        el mismo profesor. Regresa {'salon': [...], 'profesor': [...]} con
+        tuplas (id, nrc, día); un horario que termina cuando otro empieza no
+        es traslape.
+        """
+        start, end = to_minutes(hora_inicio), to_minutes(hora_fin)
+        dias = dias_key(dias)
+        profesor_id = profesor_key(profesor_id)
+        return {
+            'salon': self._overlapping(self.rooms, room_key(salon), dias, start, end, exclude) if salon else [],
+            'profesor': self._overlapping(self.profesores, profesor_id, dias, start, end, exclude) if profesor_id is not None else [],
+        }
+
+    def free_rooms(self, dia, hora_inicio, hora_fin, salones=None):
+        """Salones (de los conocidos, o de `salones`) sin clases en ese horario"""
+        mask = slot_mask(to_minutes(hora_inicio), to_minutes(hora_fin))
+        day = DIAS.index(dia)
+        if salones is None:
+            candidates = self.room_names.items()
+        else:
+            candidates = [(room_key(salon), salon) for salon in salones]
+        free = []
+        for room, name in candidates:
+            days = self.grid.get(room)
+            if days is None or not days[day] & mask:
+                free.append(name)
+        return sorted(free)
+
+    def free_slots(self, salon, desde, hasta, min_minutes=SLOT_MINUTES):
+        """Rangos libres (inicio, fin) en minutos de un salón por día, entre desde y hasta"""
+        days = self.grid.get(room_key(salon)) or [0] * len(DIAS)
+        window = slot_mask(to_minutes(desde), to_minutes(hasta))
+        return {dia: free_ranges(~days[i] & window, min_minutes) for i, dia in enumerate(DIAS)}
+
+
+class ScheduleIndex(Schedule):
+    """
+    Schedule global de todas las materias, en memoria de cada proceso.
+
+    Igual que el índice de búsqueda: se construye al primer uso, se
+    actualiza con señales después del commit, relee las materias que
+    registraron otros procesos en el ChangeLog y se reconstruye si faltan
+    entradas del registro o si supera SCHEDULE_INDEX_MAX_AGE.
+    """
+
+    fields = ('id', 'nrc', 'salon', 'profesor_asignado_id', 'dias', 'hora_inicio', 'hora_fin')
+
+    def __init__(self):
+        super().__init__()
+        self.changes = ChangeLog('schedule')
+        self.generation = self.changes.generation
+        self.lock = threading.RLock()
+        self.built_generation = None
+        self.built_at = 0
+
+    def build(self):
+        fresh = Schedule()
+        generation = self.generation.current()
+        for row in Materia.objects.values_list(*self.fields).iterator(chunk_size=5000):
+            fresh.add(*row)
+        with self.lock:
+            self.rooms = fresh.rooms
+            self.profesores = fresh.profesores
+            self.room_names = fresh.room_names
+            self.materias = fresh.materias
+            self.grid = fresh.grid
+            self.built_generation = generation
+            self.built_at = time.monotonic()
+
+    def needs_rebuild(self):
+        max_age = getattr(settings, 'SCHEDULE_INDEX_MAX_AGE', 300)
+        return (
+            self.built_generation is None or
+            (max_age is not None and time.monotonic() - self.built_at > max_age)
+        )
+
+    def is_stale(self):
+        return self.needs_rebuild() or self.built_generation != self.generation.current()
+
+    def ensure_built(self):
+        # Se vuelve a revisar con el candado (ver TrigramIndex.ensure_built)
+        if self.is_stale():
+            with self.lock:
+                if self.is_stale():
+                    self.update()
+
+    def update(self):
+        """Alcanza la generación compartida releyendo solo las materias registradas, o reconstruye"""
+        current = self.generation.current()
+        ids = None if self.needs_rebuild() else self.changes.since(self.built_generation, current)
+        if ids is None:
+            self.build()
+            return
+        self._reload(ids)
+        self.built_generation = current
+
+    def conflicts(self, *args, **kwargs):
+        self.ensure_built()
+        with self.lock:
+            return super().conflicts(*args, **kwargs)
+
+    def candidates(self, *args, **kwargs):
+        """Ids de las materias con traslape según el índice (mismos argumentos que conflicts)"""
+        conflicts = self.conflicts(*args, **kwargs)
+        return {item[0] for kind in conflicts.values() for item in kind}
+
+    def free_rooms(self, *args, **kwargs):
+        self.ensure_built()
+        with self.lock:
+            return super().free_rooms(*args, **kwargs)
+
+    def free_slots(self, *args, **kwargs):
+        self.ensure_built()
+        with self.lock:
+            return super().free_slots(*args, **kwargs)
+
+    # Mantenimiento incremental (mismo esquema que TrigramIndex)
+
+    def _apply(self, ids, change):
+        # Ver TrigramIndex._apply
+        with self.lock:
+            generation = self.changes.record(ids)
+            if self.built_generation is not None and self.built_generation == generation - 1:
+                change()
+                self.built_generation = generation
+
+    def _reload(self, ids):
+        seen = set()
+        for row in Materia.objects.filter(id__in=list(ids)).values_list(*self.fields):
+            self.add(*row)
+            seen.add(row[0])
+        for pk in ids:
+            if pk not in seen:
+                self.remove(pk)
+
+    def materia_saved(self, materia):
+        row = tuple(getattr(materia, field) for field in self.fields)
+        transaction.on_commit(lambda: self._apply([row[0]], lambda: self.add(*row)))
+
+    def materia_deleted(self, materia):
+        pk = materia.pk
+        transaction.on_commit(lambda: self._apply([pk], lambda: self.remove(pk)))
+
+    def refresh(self, ids):
+        """Vuelve a leer las materias indicadas (escrituras masivas sin señales)"""
+        ids = list(ids)
+        transaction.on_commit(lambda: self._apply(ids, lambda: self._reload(ids)))
+
+    def invalidate(self):
+        """Fuerza la reconstrucción (p. ej. SET_NULL al borrar un maestro)"""
+        transaction.on_commit(self.changes.bump)
+
+
+def load_schedule(salones=(), profesor_ids=(), ids=(), hora_inicio=None, hora_fin=None):
+    """
+    Schedule con las materias guardadas en la base que están en alguno de
+    `salones`, son de alguno de `profesor_ids` o están en `ids`; con
+    hora_inicio/hora_fin solo las que se traslapan con ese horario.
+
+    Es la revisión definitiva de traslapes: el índice en memoria de otro
+    proceso puede no tener todavía las escrituras recientes, así que solo
+    aporta `ids` candidatos (p. ej. salones escritos con otros acentos).
+    """
+    query = Q(id__in=list(ids)) | Q(profesor_asignado_id__in=[p for p in map(profesor_key, profesor_ids) if p is not None])
+    for salon in set(str(salon).strip() for salon in salones if salon):
+        query |= Q(salon__iexact=salon)
+    materias = Materia.objects.filter(query)
+    if hora_inicio is not None and hora_fin is not None:
+        materias = materias.filter(hora_inicio__lt=hora_fin, hora_fin__gt=hora_inicio)
+    saved = Schedule()
+    for row in materias.values_list(*ScheduleIndex.fields):
+        saved.add(*row)
+    return saved
+
+
+schedule_index = ScheduleIndex()
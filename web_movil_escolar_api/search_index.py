@@ -0,0 +1,277 @@
+import threading
+import time
+import unicodedata
+from array import array
+from django.conf import settings
+from django.db import transaction
+from web_movil_escolar_api.cache_utils import ChangeLog
+from web_movil_escolar_api.models import *
+
+# Separador entre campos del texto indexado; no aparece en búsquedas
+FIELD_SEPARATOR = '\x1f'
+
+
+def normalize(text):
+    """Minúsculas y sin acentos, igual que la collation *_ci/ai de MySQL"""
+    if text is None:
+        return ''
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice invertido de trigramas en memoria para el parámetro `search`.
+
+    Reemplaza los filtros OR de `__icontains` (LIKE '%x%', que recorren toda
+    la tabla y hacen join con auth_user) por una búsqueda de ids:
+
+    * Cada registro guarda su texto normalizado (campos separados).
+    * Cada trigrama apunta a un arreglo compacto de ids.
+    * Una búsqueda toma la lista del trigrama menos frecuente del término y
+      verifica la subcadena solo en esos candidatos, así que el costo depende
+      del número de candidatos y no del tamaño de la tabla.
+
+    El resultado es el conjunto de ids que coincidirían con los `__icontains`
+    originales; la vista sigue filtrando y ordenando en la base de datos con
+    `id__in`, por lo que el orden de los resultados no cambia.
+
+    El índice se construye la primera vez que se usa y se mantiene con
+    señales de los modelos. Cada escritura registra sus ids en un ChangeLog
+    compartido; los demás procesos, al ver la generación nueva, vuelven a
+    leer solo esos ids. Se reconstruye completo si faltan entradas del
+    registro o si supera SEARCH_INDEX_MAX_AGE. El registro vive en el cache
+    `default`, que fuera de DEBUG debe ser compartido entre procesos
+    (settings.CACHES); con uno local cada worker solo vería sus propias
+    escrituras hasta SEARCH_INDEX_MAX_AGE.
+    """
+
+    def __init__(self, name, model, fields):
+        self.name = name
+        self.model = model
+        self.fields = tuple(fields)
+        self.user_fields = tuple(i for i, f in enumerate(self.fields) if f.startswith('user__'))
+        self.changes = ChangeLog(f'search:{name}')
+        self.generation = self.changes.generation
+        self.lock = threading.RLock()
+        self.built_generation = None
+        self.built_at = 0
+        self.values = {}
+        self.postings = {}
+        self.users = {}
+        self.garbage = 0
+
+    # Construcción
+
+    def build(self):
+        values = {}
+        postings = {}
+        users = {}
+        generation = self.generation.current()
+        rows = self.model.objects.values_list('id', *self._user_id_field(), *self.fields)
+        for row in rows.iterator(chunk_size=5000):
+            pk = row[0]
+            offset = 1
+            if self.user_fields:
+                users[row[1]] = users.get(row[1], ()) + (pk,)
+                offset = 2
+            entry = tuple(normalize(v) for v in row[offset:])
+            values[pk] = entry
+            for gram in trigrams(FIELD_SEPARATOR.join(entry)):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array('q')
+                posting.append(pk)
+        with self.lock:
+            self.values = values
+            self.postings = postings
+            self.users = users
+            self.garbage = 0
+            self.built_generation = generation
+            self.built_at = time.monotonic()
+
+    def _user_id_field(self):
+        return ('user_id',) if self.user_fields else ()
+
+    def needs_rebuild(self):
+        max_age = getattr(settings, 'SEARCH_INDEX_MAX_AGE', 300)
+        return (
+            self.built_generation is None or
+            (max_age is not None and time.monotonic() - self.built_at > max_age) or
+            self.garbage > max(len(self.values), 1000)
+        )
+
+    def is_stale(self):
+        return self.needs_rebuild() or self.built_generation != self.generation.current()
+
+    def ensure_built(self):
+        # Se vuelve a revisar con el candado: las peticiones que esperaban
+        # mientras otra actualizaba usan ese índice en lugar de repetirlo
+        if self.is_stale():
+            with self.lock:
+                if self.is_stale():
+                    self.update()
+
+    def update(self):
+        """Alcanza la generación compartida releyendo solo los ids registrados, o reconstruye"""
+        current = self.generation.current()
+        ids = None if self.needs_rebuild() else self.changes.since(self.built_generation, current)
+        if ids is None:
+            self.build()
+            return
+        self._reload(ids)
+        self.built_generation = current
+
+    # Consulta
+
+    def search(self, term):
+        """
+        Regresa la lista de ids que contienen `term` en alguno de los campos,
+        o None si el término es demasiado corto o poco selectivo y conviene
+        usar el filtro `__icontains` de siempre.
+        """
+        needle = normalize(term).strip()
+        if len(needle) < 3:
+            return None
+        self.ensure_built()
+        with self.lock:
+            smallest = None
+            for gram in trigrams(needle):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return []
+                if smallest is None or len(posting) < len(smallest):
+                    smallest = posting
+            max_results = getattr(settings, 'SEARCH_INDEX_MAX_RESULTS', 5000)
+            found = []
+            for pk in set(smallest):
+                entry = self.values.get(pk)
+                if entry is not None and any(needle in value for value in entry):
+                    found.append(pk)
+                    if len(found) > max_results:
+                        return None
+            return found
+
+    # Mantenimiento incremental
+
+    def _put(self, pk, entry):
+        self.values[pk] = entry
+        for gram in trigrams(FIELD_SEPARATOR.join(entry)):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array('q')
+            posting.append(pk)
+        self.garbage += 1
+
+    def _link_user(self, user_id, pk):
+        # Casi siempre hay un perfil por usuario; se guarda una tupla de ids
+        pks = self.users.get(user_id, ())
+        if pk not in pks:
+            self.users[user_id] = pks + (pk,)
+
+    def _apply(self, ids, change):
+        # Registra los ids para los demás procesos. Este aplica el cambio sin
+        # consultar la base solo si estaba justo en la generación anterior;
+        # si no, update() los relee junto con los demás pendientes.
+        with self.lock:
+            generation = self.changes.record(ids)
+            if self.built_generation is not None and self.built_generation == generation - 1:
+                change()
+                self.built_generation = generation
+
+    def _reload(self, ids):
+        rows = self.model.objects.filter(id__in=list(ids)).values_list('id', *self._user_id_field(), *self.fields)
+        seen = set()
+        for row in rows:
+            offset = 2 if self.user_fields else 1
+            if self.user_fields:
+                self._link_user(row[1], row[0])
+            self._put(row[0], tuple(normalize(v) for v in row[offset:]))
+            seen.add(row[0])
+        for pk in ids:
+            if pk not in seen:
+                self.values.pop(pk, None)
+
+    def _entry_from_instance(self, instance):
+        entry = []
+        for field in self.fields:
+            value = instance
+            for part in field.split('__'):
+                value = getattr(value, part) if value is not None else None
+            entry.append(normalize(value))
+        return tuple(entry)
+
+    def instance_saved(self, instance):
+        pk = instance.pk
+        entry = self._entry_from_instance(instance)
+        user_id = getattr(instance, 'user_id', None)
+        if self.built_generation is not None and self.values.get(pk) == entry:
+            return
+
+        def change():
+            if self.user_fields:
+                self._link_user(user_id, pk)
+            self._put(pk, entry)
+        transaction.on_commit(lambda: self._apply([pk], change))
+
+    def instance_deleted(self, instance):
+        # Después de delete() Django pone pk en None, se captura antes
+        pk = instance.pk
+        user_id = getattr(instance, 'user_id', None)
+
+        def change():
+            self.values.pop(pk, None)
+            if self.user_fields:
+                self.users[user_id] = tuple(i for i in self.users.get(user_id, ()) if i != pk)
+        transaction.on_commit(lambda: self._apply([pk], change))
+
+    def user_saved(self, user):
+        if not self.user_fields:
+            return
+        user_id = user.pk
+        user_values = {}
+        for i in self.user_fields:
+            user_values[i] = normalize(getattr(user, self.fields[i][len('user__'):]))
+
+        if self.built_generation is not None:
+            # Nada que hacer si el usuario no tiene perfil de este tipo o si
+            # los campos indexados no cambiaron (p. ej. solo cambió password)
+            entries = [self.values.get(pk) for pk in self.users.get(user_id, ())]
+            if all(entry is None or all(entry[i] == v for i, v in user_values.items()) for entry in entries):
+                return
+
+        def change():
+            for pk in list(self.users.get(user_id, ())):
+                entry = self.values.get(pk)
+                if entry is None:
+                    continue
+                entry = list(entry)
+                for i, value in user_values.items():
+                    entry[i] = value
+                self._put(pk, tuple(entry))
+
+        def apply():
+            # Los perfiles del usuario se leen de la base: el índice local
+            # puede no conocer todavía un perfil creado en otro proceso
+            ids = self.model.objects.filter(user_id=user_id).values_list('id', flat=True)
+            self._apply(list(ids), change)
+        transaction.on_commit(apply)
+
+    def refresh(self, ids):
+        """Reindexa los ids indicados (para escrituras masivas sin señales)"""
+        ids = list(ids)
+        transaction.on_commit(lambda: self._apply(ids, lambda: self._reload(ids)))
+
+materias_index = TrigramIndex('materias', Materia, ('nrc', 'nombre_materia', 'salon'))
+alumnos_index = TrigramIndex('alumnos', Alumnos, ('user__first_name', 'user__last_name', 'matricula', 'user__email'))
+maestros_index = TrigramIndex('maestros', Maestros, ('user__first_name', 'user__last_name', 'id_trabajador', 'user__email'))
+admins_index = TrigramIndex('admins', Administradores, ('user__first_name', 'user__last_name', 'clave_admin', 'user__email'))
+
+people_indexes = (alumnos_index, maestros_index, admins_index)
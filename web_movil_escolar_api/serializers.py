@@ -2,6 +2,8 @@ from django.contrib.auth.models import User
 from rest_framework import serializers
 from .models import *
 
+# Los índices ciegos (*_idx) de los campos cifrados no salen en la API
+
 class UserSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
     first_name = serializers.CharField(required=True)
@@ -15,9 +17,12 @@ class UserSerializer(serializers.ModelSerializer):
 # Serializer para GET (read_only)
 class AdminSerializer(serializers.ModelSerializer):
     user=UserSerializer(read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.CharField(source='user.email', read_only=True)
     class Meta:
         model = Administradores
-        fields = '__all__'
+        exclude = ('telefono_idx', 'rfc_idx')
 
 # Serializer para PUT/POST (permite escritura)
 class AdminUpdateSerializer(serializers.ModelSerializer):
@@ -27,13 +32,16 @@ class AdminUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Administradores
-        fields = '__all__'
+        exclude = ('telefono_idx', 'rfc_idx')
         
 class AlumnoSerializer(serializers.ModelSerializer):
     user=UserSerializer(read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.CharField(source='user.email', read_only=True)
     class Meta:
         model = Alumnos
-        fields = "__all__"
+        exclude = ('curp_idx', 'rfc_idx', 'telefono_idx')
 
 class AlumnoUpdateSerializer(serializers.ModelSerializer):
     first_name = serializers.CharField(required=False)
@@ -42,13 +50,18 @@ class AlumnoUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Alumnos
-        fields = '__all__'
+        exclude = ('curp_idx', 'rfc_idx', 'telefono_idx')
 
 class MaestroSerializer(serializers.ModelSerializer):
     user=UserSerializer(read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.CharField(source='user.email', read_only=True)
+    # Se conserva el nombre materias_json: la lista de materias que imparte
+    materias_json = serializers.SlugRelatedField(source='materias_impartibles', slug_field='nombre', many=True, read_only=True)
     class Meta:
         model = Maestros
-        fields = '__all__'
+        exclude = ('telefono_idx', 'rfc_idx')
 
 class MaestroUpdateSerializer(serializers.ModelSerializer):
     first_name = serializers.CharField(required=False)
@@ -57,7 +70,7 @@ class MaestroUpdateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Maestros
-        fields = '__all__'
+        exclude = ('telefono_idx', 'rfc_idx')
 
 class MateriaSerializer(serializers.ModelSerializer):
     class Meta:
@@ -77,10 +77,36 @@ DATABASES = {
         'OPTIONS': {
             'read_default_file': os.path.join(BASE_DIR, "my.cnf"),
             'charset': 'utf8mb4',
-        }
+        },
+        # Conexiones persistentes: segundos que cada hilo reutiliza su conexión
+        # (0 = una conexión por petición); se verifican antes de reutilizarlas
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pool de conexiones compartido por los hilos del proceso (DB_POOL=1), ver
+# web_movil_escolar_api/db/pool.py. Cada petición regresa su conexión al pool
+# al terminar, por eso CONN_MAX_AGE pasa a 0
+if os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+    DATABASES['default'].update({
+        'ENGINE': 'web_movil_escolar_api.db.mysql',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            # Segundos que una petición espera conexión antes del error
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            # Segundos de vida de una conexión (menor que wait_timeout de MySQL)
+            'MAX_AGE': int(os.environ.get('DB_POOL_MAX_AGE', 3600)),
+        },
+    })
+
+# Login verifica la contraseña en el pool de web_movil_escolar_api/hashing.py
+AUTHENTICATION_BACKENDS = [
+    'web_movil_escolar_api.hashing.HashingModelBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -107,4 +133,125 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
-}
\ No newline at end of file
+    # JSON con orjson si está instalado (web_movil_escolar_api/renderers.py);
+    # sin orjson se comportan igual que JSONRenderer/JSONParser
+    'DEFAULT_RENDERER_CLASSES': (
+        'web_movil_escolar_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'web_movil_escolar_api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Cache compartido por todos los procesos. Las generaciones de
+# cache_utils.Generation avisan a los índices en memoria (búsqueda, horarios,
+# roles) de cada worker que otro proceso escribió; con LocMemCache cada worker
+# tendría su propia generación y sus índices quedarían desactualizados.
+# Fuera de DEBUG se usa la tabla de `python manage.py createcachetable`
+# (o CACHE_BACKEND/CACHE_LOCATION, p. ej. Redis) y no se acepta un cache local
+if DEBUG:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+else:
+    CACHES = {'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'django_cache'),
+    }}
+    if CACHES['default']['BACKEND'].rsplit('.', 1)[-1] in ('LocMemCache', 'DummyCache'):
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured("CACHE_BACKEND debe ser un cache compartido entre procesos (DatabaseCache, Redis, Memcached)")
+
+# Índice de búsqueda en memoria (web_movil_escolar_api/search_index.py)
+# Segundos antes de reconstruir el índice aunque no haya cambios registrados
+SEARCH_INDEX_MAX_AGE = 300
+# Si una búsqueda coincide con más registros se usa el filtro LIKE normal
+SEARCH_INDEX_MAX_RESULTS = 5000
+
+# Cache de autenticación por token (web_movil_escolar_api/token_cache.py)
+TOKEN_CACHE_MAXSIZE = 1024
+TOKEN_CACHE_TTL = 300
+# Alias de CACHES para compartir las entradas entre procesos (None = solo
+# local); la invalidación siempre pasa por el cache `default`
+TOKEN_CACHE_ALIAS = None
+
+# Cache de roles por usuario (web_movil_escolar_api/roles.py)
+ROLE_CACHE_MAXSIZE = 1024
+ROLE_CACHE_TTL = 300
+
+# Pool de cifrado de contraseñas (web_movil_escolar_api/hashing.py)
+# Hilos (o procesos) que calculan PBKDF2 a la vez; None = núcleos del CPU
+PASSWORD_HASHING_WORKERS = None
+# Trabajos que pueden esperar turno además de los que están en curso
+PASSWORD_HASHING_MAX_PENDING = 32
+# Segundos que una petición espera turno antes de responder 503
+PASSWORD_HASHING_TIMEOUT = 10
+# 'thread' o 'process'
+PASSWORD_HASHING_EXECUTOR = 'thread'
+
+# Filas como máximo en /api/importar-usuarios/ (la importación corre dentro de
+# la petición y cada contraseña es un PBKDF2 de ~0.3 s); los archivos más
+# grandes se importan con el comando `importar_usuarios`
+IMPORT_MAX_ROWS = 100
+# Hilos que cifran contraseñas de /api/importar-usuarios/, aparte del pool de
+# los logins (PASSWORD_HASHING_WORKERS)
+IMPORT_HASHING_WORKERS = 2
+
+# Materias como máximo por petición en /api/materias-bulk/ (alta, edición o borrado)
+MATERIAS_BULK_MAX = 500
+
+# Índice de horarios ocupados por salón y profesor (web_movil_escolar_api/schedule.py)
+# Segundos antes de reconstruirlo aunque no haya cambios registrados
+SCHEDULE_INDEX_MAX_AGE = 300
+
+# Cache de respuestas de lista-* (web_movil_escolar_api/response_cache.py)
+LIST_CACHE_MAXSIZE = 256
+LIST_CACHE_TTL = 300
+# Alias de CACHES (p. ej. un FileBasedCache o Redis) para compartir las
+# respuestas entre procesos (None = solo el LRU local)
+LIST_CACHE_ALIAS = None
+
+# Cola de correos de MailsBridge (web_movil_escolar_api/puentes/mail.py)
+# Correos pendientes como máximo; con la cola llena se envían en el hilo de la petición
+MAIL_QUEUE_SIZE = 1000
+# Hilos que envían correos (cada uno reutiliza una conexión SMTP por lote)
+MAIL_WORKERS = 2
+MAIL_BATCH_SIZE = 50
+# Reintentos por correo: se vuelven a intentar después de MAIL_RETRY_BACKOFF
+# segundos (el doble en cada intento) sin detener al worker mientras tanto
+MAIL_MAX_RETRIES = 3
+MAIL_RETRY_BACKOFF = 1
+# Segundos que se esperan los correos pendientes al terminar el proceso
+MAIL_DRAIN_TIMEOUT = 30
+
+# Cifrado de campos (web_movil_escolar_api/cypher_utils.py). Para rotar la
+# llave se pone la nueva en CRYPTO_PASSWORD y la anterior en CRYPTO_OLD_PASSWORDS
+CRYPTO_PASSWORD = os.environ.get('CRYPTO_PASSWORD')
+CRYPTO_OLD_PASSWORDS = [p for p in os.environ.get('CRYPTO_OLD_PASSWORDS', '').split(',') if p]
+CRYPTO_SALT = 'hdjk'
+CRYPTO_ITERATIONS = 1000
+# Llave de los índices ciegos de los campos cifrados (curp_idx, rfc_idx, ...);
+# si cambia hay que recalcularlos, a diferencia de CRYPTO_PASSWORD
+CRYPTO_INDEX_KEY = os.environ.get('CRYPTO_INDEX_KEY')
+# Las llaves no pueden venir del repositorio: fuera de DEBUG son obligatorias
+if not (CRYPTO_PASSWORD and CRYPTO_INDEX_KEY):
+    if not DEBUG:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured("Faltan las variables de entorno CRYPTO_PASSWORD y/o CRYPTO_INDEX_KEY")
+    # Solo en desarrollo: datos de prueba cifrados con la SECRET_KEY del repositorio
+    CRYPTO_PASSWORD = CRYPTO_PASSWORD or SECRET_KEY
+    CRYPTO_INDEX_KEY = CRYPTO_INDEX_KEY or SECRET_KEY
+
+# Validación de URLs de imagen (web_movil_escolar_api/image_urls.py)
+# Segundos para conectar y para recibir la respuesta del HEAD
+IMAGE_URL_CONNECT_TIMEOUT = 2
+IMAGE_URL_READ_TIMEOUT = 3
+IMAGE_URL_MAX_REDIRECTS = 3
+# Conexiones por host en la sesión compartida e hilos de validate_many()
+IMAGE_URL_POOL_SIZE = 10
+IMAGE_URL_WORKERS = 8
+# Segundos que se recuerda el Content-Type de una URL (o que falló)
+IMAGE_URL_CACHE_MAXSIZE = 1024
+IMAGE_URL_CACHE_TTL = 3600
+IMAGE_URL_ERROR_TTL = 60
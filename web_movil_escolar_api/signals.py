@@ -0,0 +1,239 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from rest_framework.authtoken.models import Token
+from web_movil_escolar_api import counters, roles, timetables, versions
+from web_movil_escolar_api.models import *
+from web_movil_escolar_api.schedule import schedule_index
+from web_movil_escolar_api.search_index import (
+    admins_index, alumnos_index, maestros_index, materias_index, people_indexes,
+)
+from web_movil_escolar_api.token_cache import token_cache
+
+# Se envía después de bulk_create/bulk_update de materias (que no disparan
+# post_save) con los ids escritos y, opcionalmente, las instancias:
+# `materias_bulk_saved.send(Materia, ids=[...], instances=[...])`
+materias_bulk_saved = Signal()
+
+# Índice de búsqueda por modelo
+SEARCH_INDEXES = {
+    Materia: materias_index,
+    Alumnos: alumnos_index,
+    Maestros: maestros_index,
+    Administradores: admins_index,
+}
+
+
+@receiver(post_save, sender=Materia)
+@receiver(post_save, sender=Alumnos)
+@receiver(post_save, sender=Maestros)
+@receiver(post_save, sender=Administradores)
+def index_saved(sender, instance, **kwargs):
+    SEARCH_INDEXES[sender].instance_saved(instance)
+
+
+@receiver(post_delete, sender=Materia)
+@receiver(post_delete, sender=Alumnos)
+@receiver(post_delete, sender=Maestros)
+@receiver(post_delete, sender=Administradores)
+def index_deleted(sender, instance, **kwargs):
+    SEARCH_INDEXES[sender].instance_deleted(instance)
+
+
+@receiver(materias_bulk_saved)
+def index_materias_bulk_saved(sender, ids, **kwargs):
+    materias_index.refresh(ids)
+
+
+@receiver(post_save, sender=User)
+def index_user_saved(sender, instance, **kwargs):
+    for index in people_indexes:
+        index.user_saved(instance)
+
+
+# Horarios ocupados por salón y profesor (detección de traslapes)
+
+@receiver(post_save, sender=Materia)
+def schedule_materia_saved(sender, instance, **kwargs):
+    schedule_index.materia_saved(instance)
+
+
+@receiver(post_delete, sender=Materia)
+def schedule_materia_deleted(sender, instance, **kwargs):
+    schedule_index.materia_deleted(instance)
+
+
+@receiver(materias_bulk_saved)
+def schedule_materias_bulk_saved(sender, ids, **kwargs):
+    schedule_index.refresh(ids)
+
+
+@receiver(post_delete, sender=Maestros)
+def schedule_maestro_deleted(sender, instance, **kwargs):
+    # on_delete=SET_NULL actualiza las materias sin enviar post_save
+    schedule_index.invalidate()
+
+
+# Horarios materializados por maestro y programa educativo
+
+@receiver(post_init, sender=Materia)
+def remember_timetable_keys(sender, instance, **kwargs):
+    # Maestro y programa con los que se cargó, para actualizar también el
+    # horario del que sale la materia al cambiarlos
+    instance._timetable_keys = timetables.materia_keys(instance)
+
+
+def _timetable_keys_changed(instance):
+    keys = getattr(instance, '_timetable_keys', set()) | timetables.materia_keys(instance)
+    instance._timetable_keys = timetables.materia_keys(instance)
+    return keys
+
+
+@receiver(post_save, sender=Materia)
+@receiver(post_delete, sender=Materia)
+def timetable_materia_changed(sender, instance, **kwargs):
+    timetables.rebuild_after_commit(_timetable_keys_changed(instance))
+
+
+@receiver(materias_bulk_saved)
+def timetable_materias_bulk_saved(sender, ids, instances=None, **kwargs):
+    keys = set()
+    if instances is not None:
+        for instance in instances:
+            keys |= _timetable_keys_changed(instance)
+    else:
+        for profesor_id, programa in Materia.objects.filter(id__in=ids).values_list('profesor_asignado_id', 'programa_educativo'):
+            keys |= timetables.keys_for(profesor_id, programa)
+    timetables.rebuild_after_commit(keys)
+
+
+@receiver(pre_delete, sender=Maestros)
+def timetable_maestro_deleting(sender, instance, **kwargs):
+    # SET_NULL no envía señales: se recuerdan los programas afectados
+    instance._timetable_programas = set(instance.materias.values_list('programa_educativo', flat=True))
+
+
+@receiver(post_delete, sender=Maestros)
+def timetable_maestro_deleted(sender, instance, **kwargs):
+    keys = {('programa', programa) for programa in getattr(instance, '_timetable_programas', ())}
+    keys.add(('maestro', str(instance.pk)))
+    timetables.rebuild_after_commit(keys)
+
+
+# Contadores de /api/total-usuarios/
+
+def _user_is_active(instance):
+    try:
+        return instance.user.is_active
+    except User.DoesNotExist:
+        return None
+
+
+@receiver(post_save, sender=Alumnos)
+@receiver(post_save, sender=Maestros)
+@receiver(post_save, sender=Administradores)
+def count_profile_created(sender, instance, created, **kwargs):
+    if created and _user_is_active(instance):
+        counters.adjust(counters.role_for_model(sender), 1)
+
+
+@receiver(post_delete, sender=Alumnos)
+@receiver(post_delete, sender=Maestros)
+@receiver(post_delete, sender=Administradores)
+def count_profile_deleted(sender, instance, **kwargs):
+    is_active = _user_is_active(instance)
+    if is_active is None:
+        # Perfil sin usuario: no se sabe si contaba
+        counters.invalidate_after_commit()
+    elif is_active:
+        counters.adjust(counters.role_for_model(sender), -1)
+
+
+@receiver(post_init, sender=User)
+def remember_is_active(sender, instance, **kwargs):
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_save, sender=User)
+def count_user_activation(sender, instance, created, **kwargs):
+    if not created and instance.is_active != getattr(instance, '_loaded_is_active', instance.is_active):
+        counters.adjust_user(instance.pk, 1 if instance.is_active else -1)
+    instance._loaded_is_active = instance.is_active
+
+
+# Versiones de los listados (ETag)
+
+VERSION_RECURSOS = {
+    Materia: ('materias',),
+    Alumnos: ('alumnos',),
+    # on_delete=SET_NULL cambia el profesor de sus materias sin señales
+    Maestros: ('maestros', 'materias'),
+    MaestroMateria: ('maestros',),
+    Administradores: ('admins',),
+    User: versions.PEOPLE,
+}
+
+
+@receiver(post_save, sender=Materia)
+@receiver(post_save, sender=Alumnos)
+@receiver(post_save, sender=Maestros)
+@receiver(post_save, sender=MaestroMateria)
+@receiver(post_save, sender=Administradores)
+@receiver(post_save, sender=User)
+def version_saved(sender, instance, **kwargs):
+    versions.bump_after_commit(*VERSION_RECURSOS[sender])
+
+
+@receiver(post_delete, sender=Materia)
+@receiver(post_delete, sender=Alumnos)
+@receiver(post_delete, sender=Maestros)
+@receiver(post_delete, sender=MaestroMateria)
+@receiver(post_delete, sender=Administradores)
+@receiver(post_delete, sender=User)
+def version_deleted(sender, instance, **kwargs):
+    versions.bump_after_commit(*VERSION_RECURSOS[sender])
+
+
+@receiver(materias_bulk_saved)
+def version_materias_bulk_saved(sender, ids, **kwargs):
+    versions.bump_after_commit('materias')
+
+
+# Cache de tokens de BearerTokenAuthentication
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def token_user_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user_on_commit(instance.pk)
+
+
+# Cache de roles (grupos) por usuario
+
+@receiver(m2m_changed, sender=User.groups.through)
+def roles_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.__dict__.pop('_roles_cache', None)
+        roles.invalidate_user(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            roles.invalidate_user(user_id)
+    else:
+        roles.invalidate_all()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def roles_group_changed(sender, instance, **kwargs):
+    roles.invalidate_all()
+
+
+@receiver(post_delete, sender=User)
+def roles_user_deleted(sender, instance, **kwargs):
+    roles.role_cache.delete(instance.pk)
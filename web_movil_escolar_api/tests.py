@@ -0,0 +1,1499 @@
+import base64
+import csv
+import io
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, time as time_, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib import import_module
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlparse
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.models import Group, User
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F, Q
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from web_movil_escolar_api import counters, roles, versions
+from web_movil_escolar_api.db.pool import ConnectionPool
+from web_movil_escolar_api.cache_utils import registry as cache_registry
+from web_movil_escolar_api.cypher_utils import CypherUtils
+from web_movil_escolar_api.encrypted_fields import Cifrado, busqueda_exacta, existentes
+from web_movil_escolar_api.fast_serializers import (
+    fast_admin_serializer, fast_alumno_serializer, fast_maestro_serializer, fast_materia_serializer,
+)
+from web_movil_escolar_api.hashing import PasswordHashingService, hashing_service, import_hashing_service
+from web_movil_escolar_api.image_urls import ImageUrlValidator, image_url_validator
+from web_movil_escolar_api.management.commands.medir_serializacion import LISTS, Command as MedirSerializacion
+from web_movil_escolar_api.models import *
+from web_movil_escolar_api.pagination import KeysetPagination
+from web_movil_escolar_api.serializers import AdminSerializer, AlumnoSerializer, MaestroSerializer, MateriaSerializer
+from web_movil_escolar_api.puentes.mail import MailQueue, MailsBridge
+from web_movil_escolar_api.renderers import FastJSONRenderer
+from web_movil_escolar_api.response_cache import list_cache
+from web_movil_escolar_api.schedule import ScheduleIndex, schedule_index
+from web_movil_escolar_api.search_index import TrigramIndex, materias_index
+from web_movil_escolar_api.token_cache import token_cache
+from web_movil_escolar_api.views.exportar import ExportarView
+
+
+def crear_usuario(email, grupo):
+    user = User.objects.create(username=email, email=email, first_name='Nombre', last_name='Apellido')
+    Group.objects.get_or_create(name=grupo)[0].user_set.add(user)
+    return user
+
+
+def crear_registros(inicio, total):
+    """Alumnos, maestros (con materias impartibles), materias y administradores de prueba"""
+    for i in range(inicio, inicio + total):
+        Alumnos.objects.create(user=crear_usuario(f'alumno{i}@test.com', 'alumno'), matricula=f'{i:09d}',
+                               curp=f'CURP{i}', rfc=f'RFC{i}', telefono='2221234567', edad=20)
+        maestro = Maestros.objects.create(user=crear_usuario(f'maestro{i}@test.com', 'maestro'),
+                                          id_trabajador=f'{i:07d}', rfc=f'RFC{i}', telefono='2221234567')
+        MaestroMateria.replace_for(maestro, ['Cálculo', f'Materia {i}'])
+        Materia.objects.create(nrc=f'{i:06d}', nombre_materia=f'Materia {i}', seccion='001', dias=['Lunes'],
+                               hora_inicio='08:00', hora_fin='09:00', salon=f'S-{i}', creditos='6',
+                               programa_educativo='Ingeniería en Ciencias de la Computación',
+                               profesor_asignado=maestro)
+        Administradores.objects.create(user=crear_usuario(f'admin{i}@test.com', 'administrador'),
+                                       clave_admin=f'A{i}', rfc=f'RFC{i}', telefono='2221234567')
+
+
+class ListasNumQueriesTests(TestCase):
+    """
+    Consultas de cada lista-*: el número no debe cambiar con los registros de
+    la página (sin consultas N+1 por alumno, maestro, materia o admin).
+    """
+
+    # Versión de la lista + COUNT de la paginación + página con su usuario o
+    # profesor (select_related) + materias impartibles de los maestros
+    LISTAS = {
+        '/api/lista-alumnos/': 3,
+        '/api/lista-maestros/': 4,
+        '/api/lista-materias/': 3,
+        '/api/lista-admins/': 3,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 2)
+        # Las versiones se crean al primer uso; aquí para no contar ese INSERT
+        for recurso in versions.RECURSOS:
+            versions.current(recurso)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url):
+        # Sin el cache de respuestas, que contestaría sin consultar la base
+        list_cache.clear()
+        response = self.client.get(url, {'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_consultas_por_lista(self):
+        for url, consultas in self.LISTAS.items():
+            with self.subTest(url=url), self.assertNumQueries(consultas):
+                self.get(url)
+
+    def test_consultas_no_crecen_con_la_pagina(self):
+        crear_registros(100, 20)
+        for url, consultas in self.LISTAS.items():
+            with self.subTest(url=url), self.assertNumQueries(consultas):
+                response = self.get(url)
+            self.assertGreaterEqual(len(response.data['results']), 20)
+
+    def test_cache_de_respuestas_sin_consultas_de_la_pagina(self):
+        for url in self.LISTAS:
+            self.get(url)
+            # La segunda vez solo se lee la versión de la lista
+            with self.subTest(url=url), self.assertNumQueries(1):
+                self.client.get(url, {'page_size': 50})
+
+
+
+@skipUnless(connection.vendor == 'mysql', 'Los planes de consulta se auditan con el motor de producción (MySQL)')
+class AuditarConsultasTests(TestCase):
+    """auditar_consultas: sin type=ALL ni filesort en las listas, por página y por cursor"""
+
+    def test_listas_usan_indices(self):
+        stderr = io.StringIO()
+        try:
+            call_command('auditar_consultas', '--seed', '2000', stdout=io.StringIO(), stderr=stderr)
+        except CommandError as e:
+            self.fail(f'{e}\n{stderr.getvalue()}')
+
+class ConditionalGetTests(TestCase):
+    """ETag de las listas (versions.conditional_get)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        list_cache.clear()
+
+    def test_etag_sin_last_modified(self):
+        response = self.client.get('/api/lista-materias/')
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get('/api/lista-materias/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_cambio_en_el_mismo_segundo_no_da_304(self):
+        etag = self.client.get('/api/lista-materias/')['ETag']
+        versions.bump('materias')
+        response = self.client.get('/api/lista-materias/', HTTP_IF_NONE_MATCH=etag,
+                                   HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+
+class KeysetPaginationTests(TestCase):
+    """Paginación por cursor: recorridos, NULL, empates por id y cursores inválidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 3)
+        # Salones repetidos: el orden entre ellos lo decide el id
+        for i in range(4, 12):
+            Materia.objects.create(nrc=f'{i:06d}', nombre_materia=f'Materia {i}', seccion='001', dias=['Martes'],
+                                   hora_inicio='10:00', hora_fin='11:00', salon=f'R-{i % 3}', creditos='6',
+                                   programa_educativo='Ingeniería en Ciencias de la Computación')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        list_cache.clear()
+
+    def esperado(self, *ordering):
+        return list(Materia.objects.order_by(*ordering).values_list('id', flat=True))
+
+    def recorrer(self, url, link):
+        """Sigue los enlaces `link` desde url; regresa los ids de cada página y la última respuesta"""
+        paginas = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            paginas.append([materia['id'] for materia in response.data['results']])
+            url = response.data[link]
+        return paginas, response
+
+    def paginar(self, paginator, params):
+        request = Request(APIRequestFactory().get('/api/lista-materias/', params))
+        rows = paginator.paginate_queryset(Materia.objects.all(), request)
+        return [row.id for row in rows], paginator.get_paginated_response([]).data
+
+    def test_recorrido_hacia_adelante_y_hacia_atras(self):
+        for sort_order, ordering in (('asc', ['salon', 'id']), ('desc', ['-salon', '-id'])):
+            with self.subTest(sort_order=sort_order):
+                list_cache.clear()
+                adelante, ultima = self.recorrer(
+                    f'/api/lista-materias/?cursor=&sort_by=salon&sort_order={sort_order}&page_size=3', 'next')
+                self.assertEqual(sum(adelante, []), self.esperado(*ordering))
+                self.assertTrue(all(len(pagina) == 3 for pagina in adelante[:-1]))
+                atras, primera = self.recorrer(ultima.data['previous'], 'previous')
+                self.assertEqual(atras, adelante[-2::-1])
+                self.assertIsNone(primera.data['previous'])
+
+    def test_valores_nulos(self):
+        Materia.objects.filter(nrc__in=['000001', '000005', '000009']).update(profesor_asignado=None)
+        for descending, ordering in ((False, [F('profesor_asignado_id').asc(nulls_first=True), 'id']),
+                                     (True, [F('profesor_asignado_id').desc(nulls_last=True), '-id'])):
+            with self.subTest(descending=descending):
+                ids, params = [], {'page_size': 2}
+                while True:
+                    paginator = KeysetPagination()
+                    paginator.sort_field = 'profesor_asignado_id'
+                    paginator.descending = descending
+                    page, data = self.paginar(paginator, params)
+                    ids += page
+                    if not data['next']:
+                        break
+                    params['cursor'] = parse_qs(urlparse(data['next']).query)['cursor'][0]
+                self.assertEqual(ids, self.esperado(*ordering))
+
+    def test_fechas_en_el_cursor(self):
+        inicio = timezone.now()
+        for i, materia in enumerate(Materia.objects.order_by('-id')):
+            # Dos materias por instante: el empate se resuelve por id
+            Materia.objects.filter(id=materia.id).update(created_at=inicio + timedelta(seconds=i // 2))
+        paginator = KeysetPagination()
+        paginator.sort_field = 'created_at'
+        page, data = self.paginar(paginator, {'page_size': 5})
+        cursor = parse_qs(urlparse(data['next']).query)['cursor'][0]
+        paginator = KeysetPagination()
+        paginator.sort_field = 'created_at'
+        siguiente, _ = self.paginar(paginator, {'page_size': 5, 'cursor': cursor})
+        self.assertEqual(page + siguiente, self.esperado('created_at', 'id')[:10])
+
+    def test_valores_del_cursor(self):
+        paginator = KeysetPagination()
+        self.assertEqual(paginator.cursor_value(date(2026, 1, 2)), '2026-01-02')
+        self.assertEqual(paginator.cursor_value(time_(8, 30)), '08:30:00')
+        self.assertEqual(paginator.cursor_value(Decimal('6.50')), '6.50')
+        self.assertIsNone(paginator.cursor_value(None))
+        with self.assertRaises(TypeError):
+            paginator.cursor_value(1.5)
+
+    def cursor(self, **payload):
+        datos = {'s': 'salon', 'd': False, 'v': 'R-1', 'i': 1, 'r': False}
+        datos.update(payload)
+        return base64.urlsafe_b64encode(json.dumps(datos).encode('utf-8')).decode('ascii')
+
+    def test_cursor_invalido_da_400(self):
+        cursores = {
+            'basura': 'no-es-un-cursor',
+            'base64 sin JSON': base64.urlsafe_b64encode(b'\xff\xfe').decode('ascii'),
+            'JSON incompleto': base64.urlsafe_b64encode(b'{"s": "salon"}').decode('ascii'),
+            'JSON que no es objeto': base64.urlsafe_b64encode(b'[1, 2]').decode('ascii'),
+            'otro ordenamiento': self.cursor(s='nrc'),
+            'otra dirección': self.cursor(d=True),
+            'valor alterado': self.cursor(v={'a': 1}),
+            'id alterado': self.cursor(i='x'),
+        }
+        for caso, cursor in cursores.items():
+            with self.subTest(caso=caso):
+                response = self.client.get('/api/lista-materias/', {'cursor': cursor, 'sort_by': 'salon'})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['detail'], KeysetPagination.invalid_cursor_message)
+
+    def test_fecha_alterada_da_400(self):
+        paginator = KeysetPagination()
+        paginator.sort_field = 'created_at'
+        cursor = self.cursor(s='created_at', v='no-es-fecha')
+        with self.assertRaises(ParseError):
+            self.paginar(paginator, {'cursor': cursor})
+
+
+class FastSerializerTests(TestCase):
+    """fast_*_serializer.many() da los mismos bytes que los serializers de DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_registros(1, 3)
+        # Valores nulos y fechas: materia sin profesor, alumno con fecha de nacimiento
+        Materia.objects.filter(nrc='000002').update(profesor_asignado=None)
+        Alumnos.objects.filter(matricula='000000001').update(fecha_nacimiento=date(2004, 2, 29), ocupacion='Estudiante ñandú')
+        Maestros.objects.filter(id_trabajador='0000003').update(cubiculo=None, edad=None)
+
+    def test_mismos_bytes_en_las_cuatro_listas(self):
+        renderer = JSONRenderer()
+        fast = {
+            MateriaSerializer: fast_materia_serializer,
+            AlumnoSerializer: fast_alumno_serializer,
+            MaestroSerializer: fast_maestro_serializer,
+            AdminSerializer: fast_admin_serializer,
+        }
+        for zona in ('UTC', 'America/Mexico_City'):
+            for name, (view_class, serializer_class, prefetch) in LISTS.items():
+                with self.subTest(lista=name, zona=zona), timezone.override(zona):
+                    rows = MedirSerializacion().page(name, 50)
+                    self.assertEqual(len(rows), 3)
+                    self.assertEqual(renderer.render(fast[serializer_class].many(rows)),
+                                     renderer.render(serializer_class(rows, many=True).data))
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer da los mismos bytes que JSONRenderer"""
+
+    DATOS = [
+        {'creado': datetime(2026, 10, 18, 6, 43, 1, 123456, tzinfo=dt_timezone.utc),
+         'local': datetime(2026, 10, 18, 6, 43, 1, tzinfo=dt_timezone(timedelta(hours=-6))),
+         'sin_zona': datetime(2026, 10, 18, 6, 43, 1, 999999),
+         'fecha': date(2004, 2, 29), 'hora': time_(8, 5, 30, 250000), 'duracion': timedelta(hours=1, minutes=30)},
+        {'creditos': Decimal('6.50'), 'entero': Decimal('10'), 'id': uuid.UUID('12345678-1234-5678-1234-567812345678')},
+        {'nombre': 'Cálculo — Ñandú ✓ 😀', 'separadores': 'a\u2028b\u2029c', 'control': '\x00\t"\\'},
+        {'results': [{'id': 1, 'dias': ['Lunes', 'Miércoles'], 'profesor': None, 'activo': True,
+                      'materias': [{'nombre': 'Redes', 'hora': time_(10, 0)}]}],
+         'count': 2 ** 53, 'vacio': {}, 'lista': []},
+        [1, -2, 3.5, 'texto', None, False],
+    ]
+
+    def test_mismos_bytes(self):
+        for datos in self.DATOS:
+            with self.subTest(datos=datos):
+                self.assertEqual(FastJSONRenderer().render(datos), JSONRenderer().render(datos))
+
+    def test_indentacion_usa_el_renderer_de_drf(self):
+        contexto = {'indent': 2}
+        datos = self.DATOS[3]
+        self.assertEqual(FastJSONRenderer().render(datos, renderer_context=contexto),
+                         JSONRenderer().render(datos, renderer_context=contexto))
+
+class TokenCacheTests(TestCase):
+    """BearerTokenAuthentication con token_cache: revocación entre procesos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        cls.token = Token.objects.create(user=cls.admin)
+
+    def setUp(self):
+        token_cache.local.clear()
+        list_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.key}')
+
+    def get(self):
+        return self.client.get('/api/lista-materias/').status_code
+
+    def assertRechazado(self):
+        # 403 y no 401: SessionAuthentication es la primera clase de autenticación
+        response = self.client.get('/api/lista-materias/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['detail'].code, 'authentication_failed')
+
+    def test_usa_el_cache_y_regresa_copias(self):
+        self.assertEqual(self.get(), 200)
+        with self.assertNumQueries(0):
+            user, token = token_cache.authenticate(self.token.key, None)
+        self.assertEqual(user.pk, self.admin.pk)
+        self.assertIs(token.user, user)
+        self.assertIsNot(token_cache.authenticate(self.token.key, None)[0], user)
+
+    def test_rechazado_despues_del_logout(self):
+        self.assertEqual(self.get(), 200)
+        # Sin print() de depuración: solo el logger del módulo
+        with self.captureOnCommitCallbacks(execute=True), mock.patch('sys.stdout', new_callable=io.StringIO) as stdout, \
+                self.assertLogs('web_movil_escolar_api.views.auth', 'DEBUG'):
+            self.assertEqual(self.client.get('/api/logout/').data, {'logout': True})
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertRechazado()
+
+    def test_rechazado_despues_de_desactivar(self):
+        self.assertEqual(self.get(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_active = False
+            self.admin.save()
+        self.assertRechazado()
+
+    def test_rechazado_al_avanzar_la_generacion(self):
+        self.assertEqual(self.get(), 200)
+        # Borrado sin señales, como lo vería otro proceso con su propio cache
+        Token.objects.filter(pk=self.token.pk)._raw_delete(connection.alias)
+        self.assertEqual(self.get(), 200)
+        token_cache.user_generation(self.admin.pk).bump()
+        self.assertRechazado()
+
+
+
+
+
+
+class MaestroMateriaTests(TestCase):
+    """Materias impartibles sin repetidos según la collation *_ci/ai de MySQL"""
+
+    def test_parse_sin_mayusculas_ni_acentos_repetidos(self):
+        self.assertEqual(MaestroMateria.parse('["Cálculo", "calculo", " CÁLCULO ", "Álgebra", ""]'), ['Cálculo', 'Álgebra'])
+        self.assertEqual(MaestroMateria.parse('Física, fisica,Química'), ['Física', 'Química'])
+
+    def test_guardar_calculo_y_calculo(self):
+        crear_registros(1, 1)
+        maestro = Maestros.objects.get()
+        MaestroMateria.replace_for(maestro, ['Cálculo', 'calculo', 'Redes'])
+        self.assertEqual(list(maestro.materias_impartibles.values_list('nombre', flat=True)), ['Cálculo', 'Redes'])
+
+class ContadoresTests(TestCase):
+    """Totales de /api/total-usuarios/ ajustados con ±1 en cada escritura"""
+
+    PERFILES = {
+        'alumnos': lambda user: Alumnos.objects.create(user=user, matricula='000000001'),
+        'maestros': lambda user: Maestros.objects.create(user=user, id_trabajador='0000001'),
+        'admins': lambda user: Administradores.objects.create(user=user, clave_admin='A1'),
+    }
+
+    def setUp(self):
+        crear_registros(1, 1)
+        counters.get_totals()
+
+    def totales(self):
+        return dict(TotalUsuarios.objects.values_list('rol', 'total'))
+
+    def guardar(self, user, is_active):
+        user = User.objects.get(pk=user.pk)
+        user.is_active = is_active
+        user.save()
+
+    def test_alta_baja_desactivar_y_reactivar(self):
+        for rol, crear_perfil in self.PERFILES.items():
+            with self.subTest(rol=rol), \
+                    mock.patch.object(counters, 'reconcile', side_effect=AssertionError('recuento completo')), \
+                    self.captureOnCommitCallbacks(execute=True):
+                inicial = self.totales()
+                user = User.objects.create(username=f'{rol}@test.com')
+                perfil = crear_perfil(user)
+                self.assertEqual(self.totales(), {**inicial, rol: inicial[rol] + 1})
+                self.guardar(user, False)
+                self.assertEqual(self.totales(), inicial)
+                # Guardar otra vez sin cambiar is_active no mueve el total
+                self.guardar(user, False)
+                self.assertEqual(self.totales(), inicial)
+                self.guardar(user, True)
+                self.assertEqual(self.totales()[rol], inicial[rol] + 1)
+                perfil.delete()
+                self.assertEqual(self.totales(), inicial)
+
+    def test_usuario_inactivo_no_cuenta(self):
+        inicial = self.totales()
+        user = User.objects.create(username='inactivo@test.com', is_active=False)
+        perfil = Alumnos.objects.create(user=user, matricula='000000002')
+        self.assertEqual(self.totales(), inicial)
+        perfil.delete()
+        self.assertEqual(self.totales(), inicial)
+
+    def test_coincide_con_el_recuento(self):
+        crear_registros(2, 3)
+        self.guardar(User.objects.get(username='alumno2@test.com'), False)
+        User.objects.get(username='maestro3@test.com').delete()
+        self.assertEqual(self.totales(), {rol: counters.count_role(rol) for rol in counters.ROLE_MODELS})
+
+class RolesTests(TestCase):
+    """Cache de roles (roles.py): lecturas por petición e invalidación"""
+
+    def setUp(self):
+        roles.role_cache.clear()
+        self.user = crear_usuario('maestro@test.com', 'maestro')
+        self.admins = Group.objects.get_or_create(name='administrador')[0]
+
+    def nueva_instancia(self):
+        # Como request.user: una instancia nueva en cada petición
+        return User.objects.get(pk=self.user.pk)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                           'LOCATION': 'cache_pruebas'}})
+    def test_una_consulta_de_cache_por_peticion(self):
+        call_command('createcachetable', verbosity=0)
+        roles.get_user_roles(self.nueva_instancia())
+        user = self.nueva_instancia()
+        # Las dos generaciones con un solo SELECT a la tabla del cache
+        with self.assertNumQueries(1):
+            self.assertFalse(roles.is_admin_user(user))
+            self.assertEqual(roles.get_user_role(user), 'maestro')
+            self.assertEqual(roles.get_user_roles(user), ('maestro',))
+
+    def test_cambio_de_grupos(self):
+        user = self.nueva_instancia()
+        self.assertFalse(roles.is_admin_user(user))
+        self.admins.user_set.add(self.user)
+        self.assertTrue(roles.is_admin_user(self.nueva_instancia()))
+        user.groups.remove(self.admins)
+        self.assertEqual(roles.get_user_roles(user), ('maestro',))
+        self.assertEqual(roles.get_user_roles(self.nueva_instancia()), ('maestro',))
+
+    def test_cambio_en_otro_proceso(self):
+        self.assertEqual(roles.get_user_roles(self.nueva_instancia()), ('maestro',))
+        # Sin m2m_changed: este proceso solo se entera por la generación
+        User.groups.through.objects.create(user=self.user, group=self.admins)
+        self.assertFalse(roles.is_admin_user(self.nueva_instancia()))
+        roles.user_generation(self.user.pk).bump()
+        self.assertTrue(roles.is_admin_user(self.nueva_instancia()))
+
+class CamposCifradosTests(TestCase):
+    """EncryptedCharField, índices ciegos y la migración 0012"""
+
+    CURP = 'GOMA010101HPLXXX01'
+
+    def setUp(self):
+        self.alumno = Alumnos.objects.create(user=crear_usuario('alumno@test.com', 'alumno'), matricula='000000001',
+                                             curp=self.CURP, rfc='GOMA010101ABC', telefono='Ñandú 2221234567')
+
+    def guardado(self, campo):
+        return Alumnos.objects.values_list(campo, flat=True).get(id=self.alumno.id)
+
+    def test_ida_y_vuelta(self):
+        self.assertNotEqual(self.guardado('curp'), self.CURP)
+        self.assertEqual(CypherUtils.desencripta(self.guardado('curp')), self.CURP)
+        alumno = Alumnos.objects.get(id=self.alumno.id)
+        self.assertEqual((alumno.curp, alumno.telefono), (self.CURP, 'Ñandú 2221234567'))
+        alumno.curp = None
+        alumno.save()
+        self.assertIsNone(Alumnos.objects.get(id=self.alumno.id).curp)
+
+    def test_descifrado_perezoso(self):
+        with mock.patch.object(CypherUtils, 'desencripta', wraps=CypherUtils.desencripta) as desencripta:
+            alumno = Alumnos.objects.get(id=self.alumno.id)
+            desencripta.assert_not_called()
+            self.assertEqual(alumno.curp, self.CURP)
+            self.assertEqual(alumno.curp, self.CURP)
+            self.assertEqual(desencripta.call_count, 1)
+
+            # Guardar sin leer el campo conserva el mismo texto cifrado
+            antes = self.guardado('rfc')
+            alumno.edad = 21
+            alumno.save()
+            self.assertEqual(desencripta.call_count, 1)
+        self.assertEqual(self.guardado('rfc'), antes)
+        self.assertEqual(Alumnos.objects.filter(**busqueda_exacta(Alumnos, 'rfc', 'GOMA010101ABC')).count(), 1)
+
+    def test_busqueda_por_indice_ciego(self):
+        self.assertFalse(Alumnos.objects.filter(curp=self.CURP).exists())
+        # El índice normaliza espacios y mayúsculas
+        encontrados = Alumnos.objects.filter(**busqueda_exacta(Alumnos, 'curp', f' {self.CURP.lower()} '))
+        self.assertEqual(list(encontrados.values_list('id', flat=True)), [self.alumno.id])
+        self.assertEqual(existentes(Alumnos, 'curp', [self.CURP, 'OTRA010101HPLXXX02']), {self.CURP})
+        alumno = Alumnos.objects.get(id=self.alumno.id)
+        alumno.curp = 'OTRA010101HPLXXX02'
+        alumno.save()
+        self.assertFalse(Alumnos.objects.filter(**busqueda_exacta(Alumnos, 'curp', self.CURP)).exists())
+
+    def test_curp_repetida(self):
+        datos = {'rol': 'alumno', 'first_name': 'Otro', 'last_name': 'Alumno', 'email': 'otro@test.com',
+                 'password': 'contraseña', 'matricula': '000000002', 'curp': self.CURP.lower(), 'rfc': 'OTRO010101ABC',
+                 'fecha_nacimiento': '2001-01-01', 'edad': 20, 'telefono': '2221234567', 'ocupacion': 'Estudiante'}
+        response = APIClient().post('/api/alumnos/', datos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], f'La CURP {self.CURP} ya está registrada')
+        self.assertFalse(User.objects.filter(email='otro@test.com').exists())
+        datos['curp'] = 'OTRA010101HPLXXX02'
+        self.assertEqual(APIClient().post('/api/alumnos/', datos, format='json').status_code, 201)
+
+    def test_lista_descifra_por_lote(self):
+        crear_registros(1, 5)
+        client = APIClient()
+        client.force_authenticate(crear_usuario('root@test.com', 'administrador'))
+        list_cache.clear()
+        with mock.patch.object(CypherUtils, 'desencripta', wraps=CypherUtils.desencripta) as desencripta, \
+                mock.patch.object(CypherUtils, 'desencripta_many', wraps=CypherUtils.desencripta_many) as desencripta_many:
+            response = client.get('/api/lista-alumnos/', {'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(alumno['curp'] for alumno in response.data['results']),
+                         ['CURP1', 'CURP2', 'CURP3', 'CURP4', 'CURP5', self.CURP])
+        desencripta.assert_not_called()
+        # Una llamada por campo cifrado (curp, rfc, telefono) para toda la página
+        self.assertEqual(desencripta_many.call_count, 3)
+
+    def test_migracion_con_funciones_propias(self):
+        migracion = import_module('web_movil_escolar_api.migrations.0012_campos_cifrados')
+        cifrado = migracion.Cifrado()
+        self.assertEqual(cifrado.desencripta(self.guardado('curp')), self.CURP)
+        self.assertEqual(CypherUtils.desencripta(cifrado.encripta(self.CURP)), self.CURP)
+        self.assertEqual(cifrado.indice_ciego(self.CURP), self.guardado('curp_idx'))
+
+        # Filas en claro, como antes de la migración
+        Alumnos.objects.filter(id=self.alumno.id).update(curp=Cifrado(self.CURP), curp_idx=None)
+        schema_editor = mock.Mock(connection=connection, quote_name=connection.ops.quote_name)
+        migracion.cifrar_campos(django_apps, schema_editor)
+        self.assertEqual(CypherUtils.desencripta(self.guardado('curp')), self.CURP)
+        self.assertEqual(Alumnos.objects.get(**busqueda_exacta(Alumnos, 'curp', self.CURP)).telefono, 'Ñandú 2221234567')
+
+        migracion.descifrar_campos(django_apps, schema_editor)
+        self.assertEqual(self.guardado('curp'), self.CURP)
+        self.assertEqual(self.guardado('telefono'), 'Ñandú 2221234567')
+
+
+class HashingLoginTests(TestCase):
+    """Login con HashingModelBackend: 503 con el pool lleno y actualización del hash"""
+
+    def setUp(self):
+        self.user = crear_usuario('root@test.com', 'administrador')
+
+    def login(self, password='contraseña'):
+        return APIClient().post('/api/login/', {'username': 'root@test.com', 'password': password}, format='json')
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher',
+                                         'django.contrib.auth.hashers.SHA1PasswordHasher'])
+    def test_actualiza_el_hash_al_cambiar_de_hasher(self):
+        self.user.password = hashers.make_password('contraseña', hasher='sha1')
+        self.user.save()
+        self.assertEqual(self.login('otra').status_code, 400)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('sha1$'))
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('md5$'))
+        self.assertTrue(self.user.check_password('contraseña'))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_503_con_el_pool_lleno(self):
+        self.user.set_password('contraseña')
+        self.user.save()
+        servicio = PasswordHashingService(max_workers=1, max_pending=0, timeout=0.05)
+        liberar = threading.Event()
+        self.addCleanup(servicio.get_executor().shutdown)
+        self.addCleanup(liberar.set)
+        # Un cifrado en curso ocupa el único turno
+        servicio.submit(liberar.wait)
+        with mock.patch('web_movil_escolar_api.hashing.hashing_service', servicio):
+            response = self.login()
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.data['detail'].code, 'hashing_busy')
+            self.assertEqual(servicio.stats()['rejected'], 1)
+            liberar.set()
+            deadline = time.monotonic() + 5
+            while servicio.stats()['in_flight'] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(self.login().status_code, 200)
+
+
+class ImportarUsuariosTests(TestCase):
+    """/api/importar-usuarios/ con un CSV"""
+
+    COLUMNAS = 'first_name,last_name,email,password,matricula,curp,rfc,edad,telefono\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def importar(self, filas):
+        archivo = io.BytesIO((self.COLUMNAS + ''.join(filas)).encode('utf-8'))
+        archivo.name = 'alumnos.csv'
+        return self.client.post('/api/importar-usuarios/', {'archivo': archivo, 'rol': 'alumno'}, format='multipart')
+
+    def fila(self, i, curp):
+        return f'Nombre,Apellido,nuevo{i}@test.com,secreta{i},{i:09d},{curp},RFC{i},20,2221234567\n'
+
+    def test_importa_con_el_pool_de_importaciones(self):
+        completed = import_hashing_service.stats()['completed']
+        with mock.patch.object(hashing_service, 'submit', side_effect=AssertionError('pool de logins')):
+            response = self.importar([self.fila(i, f'NUEVA{i}') for i in range(100, 103)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['creadas'], 3)
+        self.assertEqual(import_hashing_service.stats()['completed'], completed + 3)
+        self.assertTrue(User.objects.get(username='nuevo101@test.com').check_password('secreta101'))
+        self.assertTrue(Alumnos.objects.filter(**busqueda_exacta(Alumnos, 'curp', 'NUEVA102')).exists())
+
+    def test_rechaza_curp_registrada_o_repetida(self):
+        response = self.importar([
+            self.fila(100, 'curp1'),  # ya registrada por crear_registros (en mayúsculas)
+            self.fila(101, 'NUEVA'),
+            self.fila(102, 'nueva'),
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['creadas'], 1)
+        self.assertEqual(sorted(response.data['errores'], key=lambda error: error['fila']), [
+            {'fila': 2, 'error': 'La CURP CURP1 ya está registrada'},
+            {'fila': 4, 'error': 'La CURP NUEVA está repetida en el archivo'},
+        ])
+        self.assertFalse(User.objects.filter(username='nuevo100@test.com').exists())
+
+    @override_settings(IMPORT_MAX_ROWS=2)
+    def test_limite_de_filas(self):
+        response = self.importar([self.fila(i, f'NUEVA{i}') for i in range(100, 103)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('importar_usuarios', response.data['error'])
+        self.assertFalse(User.objects.filter(username__startswith='nuevo').exists())
+
+
+class TraslapesTests(TestCase):
+    """Traslapes de salón y profesor al crear o editar materias (schedule.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 2)
+        cls.maestro = Maestros.objects.get(id_trabajador='0000001')
+        cls.otro_maestro = Maestros.objects.get(id_trabajador='0000002')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        # Horas como texto: así llegan a las señales después del commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.materia = Materia.objects.create(
+                nrc='500000', nombre_materia='Álgebra', seccion='001', dias=['Martes', 'Jueves'],
+                hora_inicio='10:00', hora_fin='11:30', salon='Salón Ñ-1', creditos='6',
+                programa_educativo='Ingeniería en Ciencias de la Computación', profesor_asignado=self.maestro)
+
+    def datos(self, **cambios):
+        return {'nrc': '500001', 'nombre_materia': 'Física', 'seccion': '001', 'dias': ['Jueves'],
+                'hora_inicio': '11:00', 'hora_fin': '12:00', 'salon': 'S-9', 'creditos': '6',
+                'programa_educativo': 'Ingeniería en Ciencias de la Computación',
+                'profesor_asignado': self.otro_maestro.id, **cambios}
+
+    def post(self, **cambios):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/materias/', self.datos(**cambios), format='json')
+
+    def test_indice_con_horas_en_texto(self):
+        conflicts = schedule_index.conflicts(['Martes'], '10:30', '11:00', salon='salon ñ-1')
+        self.assertEqual(conflicts['salon'], [(self.materia.id, '500000', 'Martes')])
+
+    def test_mismo_salon_sin_importar_mayusculas_ni_acentos(self):
+        response = self.post(salon='  SALON ñ-1 ')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('NRC 500000', response.data['error']['salon'])
+        self.assertNotIn('profesor_asignado', response.data['error'])
+
+    def test_mismo_profesor_en_otro_salon(self):
+        response = self.post(profesor_asignado=self.maestro.id, hora_inicio='08:00', hora_fin='10:05')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['error']), ['profesor_asignado'])
+
+    def test_horarios_que_se_tocan_no_se_traslapan(self):
+        self.assertEqual(self.post(salon='Salón Ñ-1', hora_inicio='11:30', hora_fin='12:30').status_code, 201)
+        self.assertEqual(self.post(nrc='500002', salon='Salón Ñ-1', profesor_asignado=self.maestro.id,
+                                   hora_inicio='09:00', hora_fin='10:00').status_code, 201)
+        # La materia recién creada ya está en el índice
+        response = self.post(nrc='500003', salon='salón ñ-1', hora_inicio='12:00', hora_fin='13:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('NRC 500001', response.data['error']['salon'])
+
+    def test_put_no_choca_consigo_misma(self):
+        datos = self.datos(id=self.materia.id, nrc='500000', salon='Salón Ñ-1', profesor_asignado=self.maestro.id,
+                           dias=['Martes', 'Jueves'], hora_inicio='10:30', hora_fin='12:00')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/materias/', datos, format='json')
+        self.assertEqual(response.status_code, 200)
+        # El horario anterior (10:00-10:30) quedó libre
+        self.assertEqual(self.post(salon='Salón Ñ-1', dias=['Martes'], hora_inicio='10:00', hora_fin='10:30').status_code, 201)
+
+
+class MateriasBulkTests(TestCase):
+    """/api/materias-bulk/: límite del lote, repetidos, traslapes y borrado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 2)
+        cls.maestro = Maestros.objects.get(id_trabajador='0000001')
+        cls.otro_maestro = Maestros.objects.get(id_trabajador='0000002')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def datos(self, nrc, **cambios):
+        return {'nrc': nrc, 'nombre_materia': f'Materia {nrc}', 'seccion': '001', 'dias': ['Viernes'],
+                'hora_inicio': '10:00', 'hora_fin': '11:00', 'salon': f'L-{nrc}', 'creditos': '6',
+                'programa_educativo': 'Ingeniería en Ciencias de la Computación', **cambios}
+
+    def enviar(self, metodo, materias):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, metodo)('/api/materias-bulk/', {'materias': materias}, format='json')
+
+    def errores(self, response):
+        self.assertEqual(response.status_code, 400)
+        return {error['index']: error['error'] for error in response.data['error']}
+
+    @override_settings(MATERIAS_BULK_MAX=2)
+    def test_limite_del_lote(self):
+        total = Materia.objects.count()
+        lote = [self.datos(f'60000{i}') for i in range(3)]
+        response = self.enviar('post', lote)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'El lote no puede tener más de 2 materias')
+        ids = list(Materia.objects.values_list('id', flat=True))
+        self.assertEqual(self.enviar('put', [dict(datos, id=i) for datos, i in zip(lote, ids)] * 2).status_code, 400)
+        self.assertEqual(self.client.delete('/api/materias-bulk/', {'ids': ids + [0]}, format='json').status_code, 400)
+        self.assertEqual(Materia.objects.count(), total)
+        self.assertEqual(self.enviar('post', lote[:2]).data['created'], 2)
+
+    def test_alta_del_lote(self):
+        response = self.enviar('post', [self.datos('600001', profesor_asignado=self.maestro.id),
+                                        self.datos('600002')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([m['nrc'] for m in response.data['materias']], ['600001', '600002'])
+        self.assertEqual(Materia.objects.get(nrc='600001').profesor_asignado_id, self.maestro.id)
+
+    def test_nrc_repetido_o_existente(self):
+        total = Materia.objects.count()
+        errores = self.errores(self.enviar('post', [self.datos('600001'), self.datos('600002'),
+                                                    self.datos('600001'), self.datos('000001')]))
+        self.assertEqual(errores, {2: {'nrc': 'NRC repetido en el lote (elemento 0)'},
+                                   3: {'nrc': 'NRC ya existe en la base de datos'}})
+        # Con un error no se escribe nada del lote
+        self.assertEqual(Materia.objects.count(), total)
+
+    def test_id_repetido_o_inexistente(self):
+        materia = Materia.objects.get(nrc='000001')
+        errores = self.errores(self.enviar('put', [
+            self.datos('000001', id=materia.id),
+            self.datos('000001', id=materia.id),
+            self.datos('600001', id=0),
+            self.datos('600002', id='x'),
+        ]))
+        self.assertEqual(errores, {1: {'id': 'ID repetido en el lote (elemento 0)'},
+                                   2: {'id': 'Materia no encontrada'},
+                                   3: {'id': 'ID de materia inválido'}})
+        self.assertEqual(Materia.objects.get(id=materia.id).salon, 'S-1')
+
+    def test_traslapes_dentro_del_lote(self):
+        errores = self.errores(self.enviar('post', [
+            self.datos('600001', salon='Lab 1', profesor_asignado=self.maestro.id),
+            self.datos('600002', salon='LAB 1', hora_inicio='10:30', hora_fin='11:00'),
+            self.datos('600003', profesor_asignado=self.maestro.id, hora_inicio='09:00', hora_fin='10:05'),
+            # Empieza cuando termina la primera: no es traslape
+            self.datos('600004', salon='Lab 1', profesor_asignado=self.maestro.id, hora_inicio='11:00', hora_fin='12:00'),
+        ]))
+        self.assertEqual(errores, {
+            1: {'salon': 'El salón ya está ocupado el Viernes en ese horario (elemento 0 del lote)'},
+            2: {'profesor_asignado': 'El profesor ya tiene otra materia el Viernes en ese horario (elemento 0 del lote)'},
+        })
+
+    def test_traslapes_con_la_base(self):
+        errores = self.errores(self.enviar('post', [
+            self.datos('600001', dias=['Lunes'], salon='s-1', hora_inicio='08:30', hora_fin='09:30'),
+            self.datos('600002', dias=['Lunes'], profesor_asignado=self.otro_maestro.id, hora_inicio='07:00', hora_fin='08:01'),
+            self.datos('600003', dias=['Lunes'], salon='S-1', hora_inicio='09:00', hora_fin='10:00'),
+        ]))
+        self.assertEqual(list(errores), [0, 1])
+        self.assertIn('NRC 000001', errores[0]['salon'])
+        self.assertIn('NRC 000002', errores[1]['profesor_asignado'])
+
+    def test_put_intercambia_horarios(self):
+        # Cada materia ocupa el horario que deja la otra: no cuentan sus horarios anteriores
+        uno, dos = Materia.objects.get(nrc='000001'), Materia.objects.get(nrc='000002')
+        comun = {'dias': ['Lunes'], 'hora_inicio': '08:00', 'hora_fin': '09:00'}
+        response = self.enviar('put', [
+            self.datos('000001', id=uno.id, salon='S-2', profesor_asignado=self.otro_maestro.id, **comun),
+            self.datos('000002', id=dos.id, salon='S-1', profesor_asignado=self.maestro.id, **comun),
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(Materia.objects.get(id=uno.id).salon, 'S-2')
+
+    def test_borrado(self):
+        ids = list(Materia.objects.order_by('id').values_list('id', flat=True))
+        errores = self.errores(self.client.delete('/api/materias-bulk/', {'ids': [ids[0], 0, 'x']}, format='json'))
+        self.assertEqual(errores, {1: {'id': 'Materia no encontrada'}, 2: {'id': 'ID de materia inválido'}})
+        self.assertEqual(Materia.objects.count(), len(ids))
+
+        # Un id repetido se borra una vez y cuenta una vez
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/materias-bulk/', {'ids': [ids[0], ids[0], ids[1]]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['deleted'], 2)
+        self.assertFalse(Materia.objects.filter(id__in=ids).exists())
+        self.assertEqual(self.client.delete(f'/api/materias-bulk/?ids={ids[0]}').status_code, 400)
+
+
+class TrigramIndexTests(TestCase):
+    """Índice de búsqueda de materias contra los filtros __icontains"""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_registros(1, 12)
+        cls.calculo = Materia.objects.create(
+            nrc='600000', nombre_materia='Cálculo Diferencial', seccion='001', dias=['Lunes'],
+            hora_inicio='12:00', hora_fin='13:00', salon='Salón Ñ-1', creditos='6',
+            programa_educativo='Ingeniería en Ciencias de la Computación')
+
+    def setUp(self):
+        # El índice es del proceso: se reconstruye con los datos de esta prueba
+        materias_index.built_generation = None
+
+    def icontains(self, term):
+        query = Q(nrc__icontains=term) | Q(nombre_materia__icontains=term) | Q(salon__icontains=term)
+        return sorted(Materia.objects.filter(query).values_list('id', flat=True))
+
+    def save(self, materia):
+        with self.captureOnCommitCallbacks(execute=True):
+            materia.save()
+
+    def test_mismos_ids_que_icontains(self):
+        for term in ('Materia 1', 'materia 1', 's-1', '00001', 'ria', 'Diferencial', 'xyz'):
+            with self.subTest(term=term):
+                self.assertEqual(sorted(materias_index.search(term)), self.icontains(term))
+
+    def test_sin_acentos_como_la_collation_de_mysql(self):
+        self.assertEqual(materias_index.search('calculo'), [self.calculo.id])
+        self.assertEqual(materias_index.search('SALON ñ'), [self.calculo.id])
+
+    def test_terminos_cortos_o_poco_selectivos(self):
+        self.assertIsNone(materias_index.search('ma'))
+        self.assertIsNone(materias_index.search(' S '))
+        with override_settings(SEARCH_INDEX_MAX_RESULTS=5):
+            self.assertIsNone(materias_index.search('materia'))
+            self.assertEqual(len(materias_index.search('materia 1')), 4)
+
+    def test_se_actualiza_al_guardar_y_borrar(self):
+        materias_index.ensure_built()
+        self.calculo.nombre_materia = 'Cálculo Integral'
+        self.save(self.calculo)
+        with self.assertNumQueries(0):
+            self.assertEqual(materias_index.search('integral'), [self.calculo.id])
+            self.assertEqual(materias_index.search('diferencial'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.calculo.delete()
+        self.assertEqual(materias_index.search('integral'), [])
+
+    def test_otro_proceso_relee_solo_los_ids_registrados(self):
+        otro = TrigramIndex('materias', Materia, materias_index.fields)
+        otro.ensure_built()
+        materias_index.ensure_built()
+        self.calculo.nombre_materia = 'Cálculo Integral'
+        self.save(self.calculo)
+        materia = Materia.objects.get(nrc='000003')
+        with self.captureOnCommitCallbacks(execute=True):
+            materia.delete()
+        with mock.patch.object(otro, 'build', side_effect=AssertionError('reconstrucción completa')):
+            # Una consulta con los ids cambiados en lugar de leer la tabla
+            with self.assertNumQueries(1):
+                self.assertEqual(otro.search('integral'), [self.calculo.id])
+            self.assertEqual(otro.search('materia 3'), [])
+            self.assertEqual(sorted(otro.search('materia')), self.icontains('materia'))
+
+    def test_reconstruye_si_falta_el_registro(self):
+        otro = TrigramIndex('materias', Materia, materias_index.fields)
+        otro.ensure_built()
+        materias_index.changes.bump()
+        with mock.patch.object(otro, 'build', wraps=otro.build) as build:
+            otro.search('materia 1')
+        build.assert_called_once()
+
+
+class SalonesLibresTests(TestCase):
+    """/api/salones-libres/ y /api/horarios-libres/ con la rejilla de ScheduleIndex"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 2)
+        # 10:07 no cae en la rejilla: ocupa el bloque 10:05-10:10 completo
+        cls.materia = Materia.objects.create(
+            nrc='700000', nombre_materia='Redes', seccion='001', dias=['Lunes', 'Miércoles'],
+            hora_inicio='10:07', hora_fin='11:00', salon='Salón Ñ-1', creditos='6',
+            programa_educativo='Ingeniería en Ciencias de la Computación')
+
+    def setUp(self):
+        schedule_index.built_generation = None
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def libres(self, dia, hora_inicio, hora_fin):
+        response = self.client.get('/api/salones-libres/', {'dia': dia, 'hora_inicio': hora_inicio, 'hora_fin': hora_fin})
+        self.assertEqual(response.status_code, 200)
+        return response.data['salones']
+
+    def test_salones_libres(self):
+        self.assertEqual(self.libres('Lunes', '08:30', '10:00'), ['Salón Ñ-1'])
+        self.assertEqual(self.libres('Lunes', '09:00', '10:05'), ['S-1', 'S-2', 'Salón Ñ-1'])
+        self.assertEqual(self.libres('Lunes', '10:00', '10:06'), ['S-1', 'S-2'])
+        self.assertEqual(self.libres('Lunes', '08:55', '09:00'), ['Salón Ñ-1'])
+        self.assertEqual(self.libres('Martes', '08:00', '12:00'), ['S-1', 'S-2', 'Salón Ñ-1'])
+
+    def test_parametros_invalidos(self):
+        for params in ({'dia': 'Sábado', 'hora_inicio': '08:00', 'hora_fin': '09:00'},
+                       {'dia': 'Lunes', 'hora_inicio': '09:00', 'hora_fin': '08:00'},
+                       {'dia': 'Lunes', 'hora_inicio': 'x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/salones-libres/', params).status_code, 400)
+
+    def test_horarios_libres_sin_importar_acentos(self):
+        response = self.client.get('/api/horarios-libres/', {'salon': 'SALON ñ-1', 'desde': '09:00', 'hasta': '12:00'})
+        self.assertEqual(response.status_code, 200)
+        rangos = lambda *pares: [{'hora_inicio': a, 'hora_fin': b} for a, b in pares]
+        self.assertEqual(response.data['dias']['Lunes'], rangos(('09:00', '10:05'), ('11:00', '12:00')))
+        self.assertEqual(response.data['dias']['Miércoles'], rangos(('09:00', '10:05'), ('11:00', '12:00')))
+        self.assertEqual(response.data['dias']['Martes'], rangos(('09:00', '12:00')))
+        # 11:00-12:00 dura 60 minutos: no alcanza una duración mínima de 65
+        response = self.client.get('/api/horarios-libres/', {'salon': 'Salón Ñ-1', 'desde': '09:00',
+                                                             'hasta': '12:00', 'duracion': 65})
+        self.assertEqual(response.data['dias']['Lunes'], rangos(('09:00', '10:05')))
+
+    def test_se_actualiza_al_editar_y_en_otro_proceso(self):
+        otro = ScheduleIndex()
+        otro.ensure_built()
+        schedule_index.ensure_built()
+        self.materia.hora_inicio = time_(9, 0)
+        self.materia.salon = 'salon ñ-1'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.materia.save()
+        self.assertEqual(self.libres('Lunes', '09:00', '09:05'), ['S-1', 'S-2'])
+        with mock.patch.object(otro, 'build', side_effect=AssertionError('reconstrucción completa')):
+            self.assertEqual(otro.free_rooms('Lunes', time_(9, 0), time_(9, 5)), ['S-1', 'S-2'])
+            self.assertEqual(otro.free_rooms('Lunes', time_(11, 0), time_(12, 0)), ['S-1', 'S-2', 'Salón Ñ-1'])
+
+class HorarioTests(TestCase):
+    """/api/horario/ y los horarios materializados de timetables.py"""
+
+    PROGRAMA = 'Ingeniería en Ciencias de la Computación'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 2)
+        cls.maestro = Maestros.objects.get(id_trabajador='0000001')
+        cls.otro_maestro = Maestros.objects.get(id_trabajador='0000002')
+        cls.redes = Materia.objects.create(
+            nrc='800000', nombre_materia='Redes', seccion='002', dias=['Lunes', 'Miércoles'],
+            hora_inicio='07:00', hora_fin='08:00', salon='S-3', creditos='6',
+            programa_educativo=cls.PROGRAMA, profesor_asignado=cls.maestro)
+        Materia.objects.create(
+            nrc='800001', nombre_materia='Bases de datos', seccion='001', dias=['Martes'],
+            hora_inicio='09:00', hora_fin='10:00', salon='S-4', creditos='6',
+            programa_educativo='Ingeniería en Tecnologías de la Información', profesor_asignado=cls.otro_maestro)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def horario(self, **params):
+        response = self.client.get('/api/horario/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def nrcs(self, datos):
+        return {dia: [materia['nrc'] for materia in materias] for dia, materias in datos['dias'].items() if materias}
+
+    def test_horario_de_maestro(self):
+        datos = self.horario(maestro=self.maestro.id)
+        self.assertEqual((datos['tipo'], datos['clave']), ('maestro', str(self.maestro.id)))
+        # Ordenado por hora dentro de cada día
+        self.assertEqual(self.nrcs(datos), {'Lunes': ['800000', '000001'], 'Miércoles': ['800000']})
+        redes = datos['dias']['Lunes'][0]
+        self.assertEqual((redes['hora_inicio'], redes['hora_fin'], redes['salon']), ('07:00:00', '08:00:00', 'S-3'))
+        self.assertIsNotNone(datos['actualizado'])
+
+    def test_horario_de_programa(self):
+        datos = self.horario(programa=self.PROGRAMA)
+        self.assertEqual(self.nrcs(datos), {'Lunes': ['800000', '000001', '000002'], 'Miércoles': ['800000']})
+        self.assertEqual(self.nrcs(self.horario(programa='Ingeniería en Tecnologías de la Información')),
+                         {'Martes': ['800001']})
+
+    def test_sin_materias(self):
+        maestro = Maestros.objects.create(user=crear_usuario('maestro9@test.com', 'maestro'), id_trabajador='0000009')
+        datos = self.horario(maestro=maestro.id)
+        self.assertEqual(self.nrcs(datos), {})
+        # Un programa sin materias no se guarda
+        datos = self.horario(programa='Licenciatura en Ciencias de la Computación')
+        self.assertEqual((self.nrcs(datos), datos['actualizado']), ({}, None))
+        self.assertFalse(Horario.objects.filter(tipo='programa', clave='Licenciatura en Ciencias de la Computación').exists())
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/horario/').status_code, 400)
+        self.assertEqual(self.client.get('/api/horario/', {'maestro': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/horario/', {'maestro': 999999}).status_code, 404)
+
+    def test_se_actualiza_al_editar_materia(self):
+        self.horario(maestro=self.maestro.id)
+        self.horario(maestro=self.otro_maestro.id)
+        self.horario(programa=self.PROGRAMA)
+        datos = {'id': self.redes.id, 'nrc': '800000', 'nombre_materia': 'Redes', 'seccion': '002', 'dias': ['Viernes'],
+                 'hora_inicio': '12:00', 'hora_fin': '13:00', 'salon': 'S-3', 'creditos': '6',
+                 'programa_educativo': self.PROGRAMA, 'profesor_asignado': self.otro_maestro.id}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.put('/api/materias/', datos, format='json').status_code, 200)
+        # Sale del horario del maestro anterior y entra al del nuevo
+        self.assertEqual(self.nrcs(self.horario(maestro=self.maestro.id)), {'Lunes': ['000001']})
+        self.assertEqual(self.nrcs(self.horario(maestro=self.otro_maestro.id)),
+                         {'Lunes': ['000002'], 'Martes': ['800001'], 'Viernes': ['800000']})
+        programa = self.horario(programa=self.PROGRAMA)
+        self.assertEqual(self.nrcs(programa), {'Lunes': ['000001', '000002'], 'Viernes': ['800000']})
+        self.assertEqual(programa['dias']['Viernes'][0]['hora_inicio'], '12:00:00')
+
+    def test_se_actualiza_al_borrar(self):
+        self.horario(maestro=self.maestro.id)
+        self.horario(programa=self.PROGRAMA)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/api/materias-bulk/', {'ids': [self.redes.id]}, format='json')
+        self.assertEqual(self.nrcs(self.horario(maestro=self.maestro.id)), {'Lunes': ['000001']})
+        maestro_id = self.maestro.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.maestro.delete()
+        self.assertEqual(self.client.get('/api/horario/', {'maestro': maestro_id}).status_code, 404)
+        lunes = self.horario(programa=self.PROGRAMA)['dias']['Lunes']
+        self.assertEqual([(m['nrc'], m['profesor_asignado']) for m in lunes], [('000001', None), ('000002', self.otro_maestro.id)])
+
+
+class ExportarTests(TestCase):
+    """Exportación por bloques con KeysetPagination.iterate y campos cifrados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        crear_registros(1, 12)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def exportar(self, url, **params):
+        # Bloques de 5 filas: 12 alumnos son tres consultas (5 + 5 + 2)
+        with mock.patch.object(ExportarView, 'chunk_size', 5), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'formato': 'csv', **params})
+            self.assertEqual(response.status_code, 200)
+            content = b''.join(response.streaming_content).decode('utf-8')
+        table = f'FROM {connection.ops.quote_name(Alumnos._meta.db_table)}'
+        pages = [q['sql'] for q in queries.captured_queries if table in q['sql']]
+        return list(csv.DictReader(io.StringIO(content))), pages
+
+    def test_exporta_por_bloques_y_descifra(self):
+        rows, pages = self.exportar('/api/exportar-alumnos/')
+        self.assertEqual(len(pages), 3)
+        self.assertTrue(all('LIMIT 5' in sql for sql in pages))
+        self.assertEqual([int(row['id']) for row in rows], list(Alumnos.objects.order_by('id').values_list('id', flat=True)))
+        # En la base están cifrados; en el archivo, en claro
+        alumno = Alumnos.objects.values('curp').get(matricula='000000007')
+        self.assertNotEqual(alumno['curp'], 'CURP7')
+        for row in rows:
+            i = int(row['matricula'])
+            self.assertEqual((row['curp'], row['rfc'], row['telefono']), (f'CURP{i}', f'RFC{i}', '2221234567'))
+
+    def test_exporta_por_bloques_en_orden_descendente(self):
+        rows, pages = self.exportar('/api/exportar-alumnos/', sort_by='matricula', sort_order='desc')
+        self.assertEqual(len(pages), 3)
+        self.assertEqual([row['matricula'] for row in rows], [f'{i:09d}' for i in range(12, 0, -1)])
+
+
+@tag('slow')
+class ExportarMemoriaTests(TestCase):
+    """Memoria de la exportación: no debe crecer con el número de filas"""
+
+    FILAS = 20000
+    LIMITE = 1536 * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('root@test.com', 'administrador')
+        Materia.objects.bulk_create([
+            Materia(nrc=f'{i:06d}', nombre_materia=f'Materia de prueba número {i}', seccion='001',
+                    dias=['Lunes', 'Miércoles'], hora_inicio=time_(8, 0), hora_fin=time_(9, 0), salon=f'S-{i}',
+                    creditos='6', programa_educativo='Ingeniería en Ciencias de la Computación')
+            for i in range(cls.FILAS)
+        ], batch_size=1000)
+
+    def test_pico_de_memoria_acotado(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        total = 0
+        with mock.patch.object(ExportarView, 'chunk_size', 200):
+            # Sin contar lo que se carga una sola vez (imports, URLs, etc.)
+            next(iter(client.get('/api/exportar-materias/', {'formato': 'csv'}).streaming_content))
+            tracemalloc.start()
+            try:
+                response = client.get('/api/exportar-materias/', {'formato': 'csv'})
+                for chunk in response.streaming_content:
+                    total += len(chunk)
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.assertEqual(response.status_code, 200)
+        # El archivo completo no cabe en el límite: se generó por bloques
+        self.assertGreater(total, 2 * self.LIMITE)
+        self.assertLess(peak, self.LIMITE)
+
+
+class ConexionFalsa:
+    def __init__(self, numero):
+        self.numero = numero
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """ConnectionPool con conexiones falsas (sin base de datos)"""
+
+    def crear_pool(self, **options):
+        self.conexiones = []
+        self.falla = False
+
+        def connect():
+            if self.falla:
+                raise ConnectionError('sin servidor')
+            self.conexiones.append(ConexionFalsa(len(self.conexiones)))
+            return self.conexiones[-1]
+
+        return ConnectionPool('test', connect, lambda connection: True, options)
+
+    def intenta(self, func):
+        try:
+            return func()
+        except Exception as e:
+            return e
+
+    def test_reutiliza_conexiones(self):
+        pool = self.crear_pool(MAX_SIZE=2)
+        conexion = pool.acquire()
+        pool.release(conexion)
+        self.assertIs(pool.acquire(), conexion)
+        self.assertEqual((pool.stats()['created'], pool.stats()['reused']), (1, 1))
+
+    def test_timeout_con_el_pool_lleno(self):
+        pool = self.crear_pool(MAX_SIZE=1, TIMEOUT=0.05)
+        pool.acquire()
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            pool.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['waits'], stats['timeouts']), (1, 1, 1))
+
+    def test_espera_a_que_se_libere_una_conexion(self):
+        pool = self.crear_pool(MAX_SIZE=1, TIMEOUT=5)
+        conexion = pool.acquire()
+        threading.Timer(0.05, pool.release, args=(conexion,)).start()
+        self.assertIs(pool.acquire(), conexion)
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_max_age_reemplaza_la_conexion(self):
+        pool = self.crear_pool(MAX_SIZE=1, MAX_AGE=60)
+        vieja = pool.acquire()
+        pool.release(vieja)
+        pool.idle[0].created -= 61
+        nueva = pool.acquire()
+        self.assertIsNot(nueva, vieja)
+        self.assertTrue(vieja.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['size'], stats['created'], stats['closed']), (1, 2, 1))
+
+    def test_conexion_fallida_libera_su_lugar(self):
+        pool = self.crear_pool(MAX_SIZE=1, TIMEOUT=0.05)
+        self.falla = True
+        with self.assertRaises(ConnectionError):
+            pool.acquire()
+        self.assertEqual(pool.stats()['size'], 0)
+        # El lugar quedó libre: la siguiente conexión no espera el timeout
+        self.falla = False
+        self.assertIsNotNone(pool.acquire())
+        self.assertEqual(pool.stats()['timeouts'], 0)
+
+    def test_conexion_fallida_despierta_a_quien_espera(self):
+        pool = self.crear_pool(MAX_SIZE=1, TIMEOUT=5)
+        resultado = []
+        bloqueo = threading.Event()
+        original = pool.connect
+
+        def connect_lento():
+            bloqueo.wait(5)
+            raise ConnectionError('sin servidor')
+
+        pool.connect = connect_lento
+        primero = threading.Thread(target=lambda: resultado.append(self.intenta(pool.acquire)))
+        primero.start()
+        while pool.stats()['size'] == 0:
+            time.sleep(0.001)
+        # El segundo hilo espera el único lugar, que se libera cuando el
+        # primero no puede conectar
+        pool.connect = original
+        segundo = threading.Thread(target=lambda: resultado.append(self.intenta(pool.acquire)))
+        segundo.start()
+        while pool.stats()['waits'] == 0:
+            time.sleep(0.001)
+        bloqueo.set()
+        primero.join(5)
+        segundo.join(5)
+        self.assertEqual(sorted(type(r).__name__ for r in resultado), ['ConexionFalsa', 'ConnectionError'])
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_descarta_conexiones_y_libera_el_lugar(self):
+        pool = self.crear_pool(MAX_SIZE=1)
+        conexion = pool.acquire()
+        pool.release(conexion, discard=True)
+        self.assertTrue(conexion.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class FallaPrimeroBackend(LocmemBackend):
+    """Backend locmem que falla los primeros `fallas[asunto]` envíos de cada asunto"""
+    fallas = {}
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.fallas.get(message.subject, 0) > 0:
+                self.fallas[message.subject] -= 1
+                raise ConnectionError('SMTP no disponible')
+        return super().send_messages(messages)
+
+
+def correo(asunto):
+    return EmailMessage(asunto, 'Hola', 'no-reply@test.com', ['alumno@test.com'])
+
+
+@override_settings(EMAIL_BACKEND='web_movil_escolar_api.tests.FallaPrimeroBackend',
+                   MAIL_WORKERS=1, MAIL_RETRY_BACKOFF=0.1, MAIL_MAX_RETRIES=2)
+class MailQueueTests(SimpleTestCase):
+    """MailQueue contra el backend locmem (mail.outbox)"""
+
+    def setUp(self):
+        FallaPrimeroBackend.fallas = {}
+        self.cola = MailQueue()
+        self.addCleanup(self.cola.drain, 5)
+
+    def asuntos(self):
+        return [message.subject for message in mail.outbox]
+
+    def test_envia_los_encolados_al_cerrar(self):
+        for i in range(20):
+            self.cola.put(correo(f'Aviso {i}'))
+        self.assertTrue(self.cola.drain(5))
+        self.assertEqual(sorted(self.asuntos()), sorted(f'Aviso {i}' for i in range(20)))
+        self.assertEqual(self.cola.stats()['sent'], 20)
+
+    def test_despues_de_cerrar_envia_en_el_hilo(self):
+        self.cola.put(correo('Antes'))
+        self.cola.drain(5)
+        self.cola.put(correo('Después'))
+        self.assertEqual(self.asuntos(), ['Antes', 'Después'])
+        stats = self.cola.stats()
+        self.assertTrue(stats['closed'])
+        # Sin volver a arrancar los workers
+        self.assertEqual(stats['workers'], 0)
+        self.assertIsNone(self.cola.queue)
+
+    def test_reintento_no_detiene_los_demas_correos(self):
+        FallaPrimeroBackend.fallas = {'Falla': 1}
+        with self.assertLogs('web_movil_escolar_api.puentes.mail', 'WARNING'):
+            self.cola.put(correo('Falla'))
+            self.cola.put(correo('Siguiente'))
+            # El worker envía 'Siguiente' mientras 'Falla' espera su reintento
+            deadline = time.monotonic() + 5
+            while len(mail.outbox) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(self.asuntos(), ['Siguiente', 'Falla'])
+        stats = self.cola.stats()
+        self.assertEqual((stats['sent'], stats['retried'], stats['failed'], stats['delayed']), (2, 1, 0, 0))
+
+    def test_drain_espera_los_reintentos(self):
+        FallaPrimeroBackend.fallas = {'Falla': 2}
+        with self.assertLogs('web_movil_escolar_api.puentes.mail', 'WARNING'):
+            self.cola.put(correo('Falla'))
+            self.assertTrue(self.cola.drain(5))
+        self.assertEqual(self.asuntos(), ['Falla'])
+        self.assertEqual(self.cola.stats()['retried'], 2)
+
+    def test_agota_los_reintentos(self):
+        FallaPrimeroBackend.fallas = {'Falla': 10}
+        # put() dentro de assertLogs: el primer intento puede registrar su aviso de inmediato
+        with self.assertLogs('web_movil_escolar_api.puentes.mail', 'WARNING') as logs:
+            self.cola.put(correo('Falla'))
+            self.assertTrue(self.cola.drain(5))
+        self.assertEqual([r.levelname for r in logs.records], ['WARNING'] * 3 + ['ERROR'])
+        self.assertEqual(self.asuntos(), [])
+        stats = self.cola.stats()
+        self.assertEqual((stats['retried'], stats['failed']), (2, 1))
+
+
+class EscapeHtmlTests(SimpleTestCase):
+    def test_referencias_numericas(self):
+        self.assertEqual(MailsBridge.escape_html('<p>Año — Ñandú ✓</p>'), '<p>A&#241;o &#8212; &#209;and&#250; &#10003;</p>')
+        html = '<p>sin acentos</p>'
+        self.assertIs(MailsBridge.escape_html(html), html)
+
+
+class ServidorDeImagenes(BaseHTTPRequestHandler):
+    """Servidor HTTP local para ImageUrlValidator: responde HEAD según la ruta"""
+
+    RUTAS = {
+        '/imagen.png': (200, 'image/PNG; charset=binary'),
+        '/foto.jpg': (200, 'image/jpeg'),
+        '/pagina': (200, 'text/html; charset=utf-8'),
+        '/falta.png': (404, 'text/html'),
+        '/error.png': (500, 'text/html'),
+    }
+    visitas = []
+
+    def do_HEAD(self):
+        type(self).visitas.append(self.path)
+        if self.path == '/lenta.png':
+            time.sleep(1)
+        if self.path == '/redirige':
+            self.send_response(302)
+            self.send_header('Location', '/foto.jpg')
+        else:
+            status, content_type = self.RUTAS.get(self.path, (200, 'image/png'))
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageUrlValidatorTests(SimpleTestCase):
+    """image_urls.ImageUrlValidator contra un servidor HTTP local"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), ServidorDeImagenes)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.servidor.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        ServidorDeImagenes.visitas = []
+        self.validador = ImageUrlValidator()
+        # Cada instancia registra su cache con el mismo nombre que la global
+        self.addCleanup(cache_registry.__setitem__, 'image_urls', image_url_validator.cache)
+
+    def url(self, ruta):
+        return self.base + ruta
+
+    def test_tipo_de_contenido_y_cache(self):
+        self.assertTrue(self.validador.is_image(self.url('/imagen.png')))
+        self.assertTrue(self.validador.is_image(self.url('/imagen.png')))
+        self.assertEqual(self.validador.content_type(self.url('/imagen.png')), 'image/png')
+        self.assertFalse(self.validador.is_image(self.url('/pagina')))
+        self.assertTrue(self.validador.is_image(self.url('/redirige')))
+        self.assertEqual(ServidorDeImagenes.visitas, ['/imagen.png', '/pagina', '/redirige', '/foto.jpg'])
+        self.assertEqual(self.validador.stats()['requests'], 3)
+
+    def test_respuesta_que_no_es_200(self):
+        for ruta in ('/falta.png', '/error.png'):
+            with self.subTest(ruta=ruta):
+                self.assertIsNone(self.validador.content_type(self.url(ruta)))
+                self.assertFalse(self.validador.is_image(self.url(ruta)))
+        # El error también se guarda: no se vuelve a pedir
+        self.assertEqual(ServidorDeImagenes.visitas, ['/falta.png', '/error.png'])
+        self.assertEqual(self.validador.stats()['errors'], 2)
+
+    def test_url_que_no_es_http(self):
+        self.assertFalse(self.validador.is_image('ftp://127.0.0.1/imagen.png'))
+        self.assertFalse(self.validador.is_image('/media/imagen.png'))
+        self.assertEqual(self.validador.stats()['requests'], 0)
+
+    def test_expiracion(self):
+        reloj = mock.Mock()
+        reloj.monotonic.return_value = 1000
+        with mock.patch('web_movil_escolar_api.cache_utils.time', reloj):
+            self.validador.is_image(self.url('/imagen.png'))
+            self.validador.is_image(self.url('/falta.png'))
+            # IMAGE_URL_ERROR_TTL para los errores, IMAGE_URL_CACHE_TTL para el resto
+            reloj.monotonic.return_value = 1000 + settings.IMAGE_URL_ERROR_TTL + 1
+            self.validador.is_image(self.url('/imagen.png'))
+            self.validador.is_image(self.url('/falta.png'))
+            reloj.monotonic.return_value = 1000 + settings.IMAGE_URL_CACHE_TTL + 1
+            self.validador.is_image(self.url('/imagen.png'))
+        self.assertEqual(ServidorDeImagenes.visitas, ['/imagen.png', '/falta.png', '/falta.png', '/imagen.png'])
+
+    @override_settings(IMAGE_URL_READ_TIMEOUT=0.2)
+    def test_timeout(self):
+        inicio = time.monotonic()
+        self.assertFalse(self.validador.is_image(self.url('/lenta.png')))
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertEqual(self.validador.stats()['errors'], 1)
+
+    def test_validate_many(self):
+        urls = [self.url(f'/foto{i}.png') for i in range(4)] + [self.url('/pagina'), self.url('/foto0.png')]
+        resultado = self.validador.validate_many(urls)
+        self.assertEqual(resultado, {**{self.url(f'/foto{i}.png'): True for i in range(4)}, self.url('/pagina'): False})
+        self.assertEqual(sorted(ServidorDeImagenes.visitas), ['/foto0.png', '/foto1.png', '/foto2.png', '/foto3.png', '/pagina'])
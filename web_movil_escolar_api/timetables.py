@@ -0,0 +1,94 @@
+from django.db import transaction
+from web_movil_escolar_api.models import *
+from web_movil_escolar_api.schedule import DIAS
+
+# Campos de cada materia dentro del horario
+FIELDS = ('id', 'nrc', 'nombre_materia', 'seccion', 'dias', 'hora_inicio', 'hora_fin',
+          'salon', 'programa_educativo', 'profesor_asignado_id')
+
+
+def keys_for(profesor_id, programa_educativo):
+    """Horarios (tipo, clave) en los que aparece una materia"""
+    keys = set()
+    if profesor_id not in (None, ''):
+        keys.add(('maestro', str(profesor_id)))
+    if programa_educativo:
+        keys.add(('programa', programa_educativo))
+    return keys
+
+
+def materia_keys(materia):
+    return keys_for(materia.profesor_asignado_id, materia.programa_educativo)
+
+
+def _filter(tipo, clave):
+    if tipo == 'maestro':
+        return {'profesor_asignado_id': int(clave)}
+    return {'programa_educativo': clave}
+
+
+def build_grid(tipo, clave):
+    """Materias del maestro o programa agrupadas por día y ordenadas por hora"""
+    grid = {dia: [] for dia in DIAS}
+    rows = Materia.objects.filter(**_filter(tipo, clave)).order_by('hora_inicio', 'nrc').values(*FIELDS)
+    for row in rows:
+        entry = {
+            'id': row['id'],
+            'nrc': row['nrc'],
+            'nombre_materia': row['nombre_materia'],
+            'seccion': row['seccion'],
+            'hora_inicio': row['hora_inicio'].isoformat(),
+            'hora_fin': row['hora_fin'].isoformat(),
+            'salon': row['salon'],
+            'programa_educativo': row['programa_educativo'],
+            'profesor_asignado': row['profesor_asignado_id'],
+        }
+        for dia in dict.fromkeys(row['dias'] or ()):
+            if dia in grid:
+                grid[dia].append(entry)
+    return grid
+
+
+def rebuild(keys):
+    """
+    Recalcula y guarda los horarios indicados. Un horario sin materias se
+    borra, salvo el de un maestro que sigue existiendo (horario vacío).
+    """
+    for tipo, clave in keys:
+        grid = build_grid(tipo, clave)
+        keep = any(grid.values()) or (tipo == 'maestro' and Maestros.objects.filter(id=int(clave)).exists())
+        if keep:
+            Horario.objects.update_or_create(tipo=tipo, clave=clave, defaults={'dias': grid})
+        else:
+            Horario.objects.filter(tipo=tipo, clave=clave).delete()
+
+
+def rebuild_after_commit(keys):
+    keys = set(keys)
+    if keys:
+        transaction.on_commit(lambda: rebuild(keys))
+
+
+def rebuild_all():
+    """Reconstruye todos los horarios; regresa cuántos quedaron guardados"""
+    keys = {('maestro', str(pk)) for pk in Maestros.objects.values_list('id', flat=True)}
+    keys.update(('programa', programa) for programa in Materia.objects.values_list('programa_educativo', flat=True).distinct())
+    stale = [pk for pk, tipo, clave in Horario.objects.values_list('id', 'tipo', 'clave') if (tipo, clave) not in keys]
+    Horario.objects.filter(id__in=stale).delete()
+    rebuild(keys)
+    return Horario.objects.count()
+
+
+def get_timetable(tipo, clave):
+    """
+    Lee el horario materializado con una sola consulta por (tipo, clave).
+    Si todavía no existe se construye; un programa sin materias no se
+    guarda para no crear filas por cada búsqueda.
+    """
+    row = Horario.objects.filter(tipo=tipo, clave=clave).values('dias', 'updated_at').first()
+    if row is None:
+        rebuild([(tipo, clave)])
+        row = Horario.objects.filter(tipo=tipo, clave=clave).values('dias', 'updated_at').first()
+    if row is None:
+        return {dia: [] for dia in DIAS}, None
+    return row['dias'], row['updated_at']
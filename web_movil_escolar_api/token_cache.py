@@ -0,0 +1,94 @@
+import copy
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from web_movil_escolar_api.cache_utils import Generation, LRUCache
+
+
+class TokenCache:
+    """
+    Cache de (user, token) por llave de token para BearerTokenAuthentication.
+
+    Primero se consulta un LRU local con TTL; opcionalmente, si se define
+    TOKEN_CACHE_ALIAS, un backend compartido de Django (p. ej. Redis o
+    memcached) para que los procesos del servidor compartan las entradas.
+
+    Cada entrada guarda las generaciones con las que se leyó: una global
+    (invalidate_all) y una por usuario, que avanza al borrar el token
+    (logout) y al guardar o borrar el usuario (p. ej. al desactivarlo), ver
+    signals.py. Las generaciones viven en el cache `default`, compartido
+    entre procesos fuera de DEBUG: un token revocado en un worker deja de
+    aceptarse en todos desde la siguiente petición. Comprobarlas es una
+    lectura (get_many) por petición en lugar de la consulta Token + User.
+
+    Cada petición recibe su propia copia del usuario y del token.
+    """
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'TOKEN_CACHE_TTL', 300)
+        self.local = LRUCache('auth_tokens', maxsize=getattr(settings, 'TOKEN_CACHE_MAXSIZE', 1024), ttl=self.ttl)
+        self.alias = getattr(settings, 'TOKEN_CACHE_ALIAS', None)
+        self.generation = Generation('auth_tokens')
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def user_generation(self, user_id):
+        return Generation(f'auth_tokens:{user_id}')
+
+    def _generations(self, user_id):
+        return Generation.current_many((self.generation, self.user_generation(user_id)))
+
+    def authenticate(self, key, loader):
+        """Regresa (user, token) del cache o, si no está, de loader(key)"""
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(f'auth_token:{key}')
+        if entry is not None:
+            generations, user, token = entry
+            if generations == self._generations(user.pk):
+                self.local.set(key, entry)
+                return self._copy(user, token)
+            self.local.delete(key)
+        user, token = loader(key)
+        # Las invalidaciones avanzan la generación también al confirmar la
+        # transacción, así que una lectura anterior al commit queda vencida
+        entry = (self._generations(user.pk), user, token)
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(f'auth_token:{key}', entry, self.ttl)
+        return self._copy(user, token)
+
+    def _copy(self, user, token):
+        # El usuario del cache no se comparte entre peticiones ni hilos
+        user = copy.copy(user)
+        token = copy.copy(token)
+        token.user = user
+        return user, token
+
+    def invalidate(self, token):
+        """El token se borró (logout): deja de aceptarse en todos los procesos"""
+        self.local.delete(token.key)
+        if self.shared is not None:
+            self.shared.delete(f'auth_token:{token.key}')
+        self.invalidate_user_on_commit(token.user_id)
+
+    def invalidate_user(self, user_id):
+        self.user_generation(user_id).bump()
+
+    def invalidate_user_on_commit(self, user_id):
+        # Se invalida ya y otra vez al confirmar la transacción, para que una
+        # petición concurrente no vuelva a guardar el usuario o token anterior
+        self.invalidate_user(user_id)
+        transaction.on_commit(lambda: self.invalidate_user(user_id))
+
+    def invalidate_all(self):
+        self.local.clear()
+        self.generation.bump()
+
+    def stats(self):
+        return self.local.stats()
+
+
+token_cache = TokenCache()
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import users, alumnos, maestros, materias, auth
+from .views import users, alumnos, maestros, materias, auth, stats, importar, exportar, horarios
 
 # Agrupamos todo bajo 'api/' para coincidir con el environment de Angular
 urlpatterns = [
@@ -11,18 +11,36 @@ urlpatterns = [
         path('admin/', users.AdminView.as_view()),
         # Admin Data
         path('lista-admins/', users.AdminAll.as_view()),
+        # Export Admins (CSV/JSON)
+        path('exportar-admins/', exportar.ExportarView.as_view(recurso='admins')),
         # Create Alumno
         path('alumnos/', alumnos.AlumnosView.as_view()),
         # Alumno Data
         path('lista-alumnos/', alumnos.AlumnosAll.as_view()),
+        # Export Alumnos (CSV/JSON)
+        path('exportar-alumnos/', exportar.ExportarView.as_view(recurso='alumnos')),
+        # Import Alumnos/Maestros (CSV/XLSX)
+        path('importar-usuarios/', importar.ImportarUsuariosView.as_view()),
         # Create Maestro
         path('maestros/', maestros.MaestrosView.as_view()),
         # Maestro Data
         path('lista-maestros/', maestros.MaestrosAll.as_view()),
+        # Export Maestros (CSV/JSON)
+        path('exportar-maestros/', exportar.ExportarView.as_view(recurso='maestros')),
         # Create/Update/Delete Materia
         path('materias/', materias.MateriasView.as_view()),
+        # Bulk Create/Update/Delete Materias
+        path('materias-bulk/', materias.MateriasBulkView.as_view()),
         # Materia Data
         path('lista-materias/', materias.MateriasAll.as_view()),
+        # Export Materias (CSV/JSON)
+        path('exportar-materias/', exportar.ExportarView.as_view(recurso='materias')),
+        # Salones libres en un horario
+        path('salones-libres/', horarios.SalonesLibresView.as_view()),
+        # Horarios libres de un salón
+        path('horarios-libres/', horarios.HorariosLibresView.as_view()),
+        # Horario semanal de un maestro o programa educativo
+        path('horario/', horarios.HorarioView.as_view()),
         # Verificar NRC
         path('verificar-nrc/', materias.VerificarNRCView.as_view()),
         # Total Users
@@ -30,7 +48,9 @@ urlpatterns = [
         # Login
         path('login/', auth.CustomAuthToken.as_view()),
         # Logout
-        path('logout/', auth.Logout.as_view())
+        path('logout/', auth.Logout.as_view()),
+        # Cache Stats
+        path('cache-stats/', stats.CacheStatsView.as_view())
     ]))
 ]
 
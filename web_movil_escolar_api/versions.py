@@ -0,0 +1,63 @@
+import hashlib
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from web_movil_escolar_api.models import VersionListado
+
+# Listados con versión; los de personas también muestran datos de auth_user
+RECURSOS = ('materias', 'alumnos', 'maestros', 'admins')
+PEOPLE = ('alumnos', 'maestros', 'admins')
+
+
+def current(recurso):
+    """(valor, updated_at) de la versión del recurso; una lectura por llave primaria"""
+    row = VersionListado.objects.filter(recurso=recurso).values_list('valor', 'updated_at').first()
+    if row is None:
+        version, _ = VersionListado.objects.get_or_create(recurso=recurso)
+        row = (version.valor, version.updated_at)
+    return row
+
+
+def bump(*recursos):
+    updated = VersionListado.objects.filter(recurso__in=recursos).update(
+        valor=F('valor') + 1, updated_at=timezone.now()
+    )
+    if updated < len(recursos):
+        for recurso in recursos:
+            VersionListado.objects.get_or_create(recurso=recurso)
+
+
+def bump_after_commit(*recursos):
+    transaction.on_commit(lambda: bump(*recursos))
+
+
+def request_version(request, recurso):
+    # condition() pide el ETag y el cache de respuestas también usa la
+    # versión: se lee una vez por petición
+    versions = request.__dict__.setdefault('_list_versions', {})
+    if recurso not in versions:
+        versions[recurso] = current(recurso)
+    return versions[recurso]
+
+
+def etag_for(request, recurso):
+    valor, _ = request_version(request, recurso)
+    payload = f"{recurso}:{valor}:{request.get_full_path()}:{request.META.get('HTTP_ACCEPT', '')}"
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def conditional_get(recurso):
+    """
+    Decorador para el get() de las vistas: agrega el ETag a partir de la
+    versión del recurso y responde 304 sin consultar ni serializar cuando
+    If-None-Match sigue vigente. El ETag incluye la ruta con sus parámetros
+    (página, filtros, orden).
+
+    No se envía Last-Modified: tiene resolución de un segundo, así que dos
+    escrituras en el mismo segundo darían un 304 con datos viejos.
+    """
+    return method_decorator(condition(
+        etag_func=lambda request, *args, **kwargs: etag_for(request, recurso),
+    ))
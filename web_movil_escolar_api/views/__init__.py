@@ -1,6 +1,10 @@
 from .users import AdminView, AdminAll, TotalUsers
 from .alumnos import AlumnosView
 from .maestros import MaestrosView, MaestrosAll
-from .materias import MateriasView, MateriasAll, VerificarNRCView
+from .materias import MateriasView, MateriasAll, MateriasBulkView, VerificarNRCView
 from .auth import CustomAuthToken, Logout
-from .bootstrap import VersionView
\ No newline at end of file
+from .bootstrap import VersionView
+from .stats import CacheStatsView
+from .importar import ImportarUsuariosView
+from .exportar import ExportarView
+from .horarios import SalonesLibresView, HorariosLibresView, HorarioView
\ No newline at end of file
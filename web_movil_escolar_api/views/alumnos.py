@@ -11,6 +11,13 @@ from rest_framework.views import APIView
 from django.contrib.auth.models import Group
 from django.shortcuts import get_object_or_404
 from rest_framework.pagination import PageNumberPagination
+from web_movil_escolar_api.pagination import KeysetPagination
+from web_movil_escolar_api.versions import conditional_get
+from web_movil_escolar_api.response_cache import cached_list
+from web_movil_escolar_api.fast_serializers import fast_alumno_serializer
+from web_movil_escolar_api.hashing import hashing_service
+from web_movil_escolar_api.search_index import alumnos_index
+from web_movil_escolar_api.encrypted_fields import busqueda_exacta
 
 class AlumnoPagination(PageNumberPagination):
     page_size = 10
@@ -20,59 +27,66 @@ class AlumnoPagination(PageNumberPagination):
 class AlumnosAll(APIView):
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = AlumnoPagination
+    cursor_pagination_class = KeysetPagination
     
-    def get(self, request, *args, **kwargs):
+    # Mapear campos de ordenamiento CORREGIDO
+    sort_mapping = {
+        'id': 'id',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'email': 'user__email',
+        'matricula': 'matricula',
+        'nombre': 'user__first_name'
+    }
+    
+    def filter_queryset(self, request):
+        """Aplica search, sort_by y sort_order; regresa (queryset, campo de orden, descendente)"""
         # Obtener parámetros de búsqueda y ordenamiento
         search = request.GET.get('search', '')
         sort_by = request.GET.get('sort_by', 'id')
         sort_order = request.GET.get('sort_order', 'asc')
-        page_size = request.GET.get('page_size', 10)
         
         # Construir queryset base
-        alumnos = Alumnos.objects.filter(user__is_active=1)
+        alumnos = Alumnos.objects.filter(user__is_active=1).select_related('user')
         
-        # Aplicar filtro de búsqueda
+        # Aplicar filtro de búsqueda (índice de trigramas; LIKE si el término es corto)
         if search:
-            alumnos = alumnos.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(matricula__icontains=search) |
-                Q(user__email__icontains=search)
-            )
+            ids = alumnos_index.search(search)
+            if ids is not None:
+                alumnos = alumnos.filter(id__in=ids)
+            else:
+                alumnos = alumnos.filter(
+                    Q(user__first_name__icontains=search) |
+                    Q(user__last_name__icontains=search) |
+                    Q(matricula__icontains=search) |
+                    Q(user__email__icontains=search)
+                )
         
         # Aplicar ordenamiento
-        if sort_order == 'desc':
-            sort_by = f'-{sort_by}'
-        
-        # Mapear campos de ordenamiento CORREGIDO
-        sort_mapping = {
-            'id': 'id',
-            'first_name': 'user__first_name',
-            'last_name': 'user__last_name',
-            'email': 'user__email',
-            'matricula': 'matricula',
-            'nombre': 'user__first_name'
-        }
-        
-        sort_field = sort_mapping.get(sort_by, 'id')
-        alumnos = alumnos.order_by(sort_field)
+        sort_field = self.sort_mapping.get(sort_by, 'id')
+        descending = sort_order == 'desc'
+
+        return alumnos, sort_field, descending
+
+    @conditional_get('alumnos')
+    @cached_list('alumnos')
+    def get(self, request, *args, **kwargs):
+        page_size = request.GET.get('page_size', 10)
+        alumnos, sort_field, descending = self.filter_queryset(request)
         
-        # Paginación
-        paginator = self.pagination_class()
-        paginator.page_size = page_size
+        # Paginación: por cursor si se envía ?cursor=, por número de página en otro caso
+        if KeysetPagination.cursor_query_param in request.GET:
+            paginator = self.cursor_pagination_class()
+            paginator.sort_field = sort_field
+            paginator.descending = descending
+        else:
+            alumnos = alumnos.order_by(f'-{sort_field}' if descending else sort_field)
+            paginator = self.pagination_class()
+            paginator.page_size = page_size
         result_page = paginator.paginate_queryset(alumnos, request, view=self)
         
-        # Serializar datos
-        serializer = AlumnoSerializer(result_page, many=True)
-        
-        # Agregar datos del usuario a cada alumno
-        data = []
-        for alumno_data in serializer.data:
-            alumno_obj = Alumnos.objects.get(id=alumno_data['id'])
-            alumno_data['first_name'] = alumno_obj.user.first_name
-            alumno_data['last_name'] = alumno_obj.user.last_name
-            alumno_data['email'] = alumno_obj.user.email
-            data.append(alumno_data)
+        # Serializar datos (mismo JSON que AlumnoSerializer, con first_name, last_name y email)
+        data = fast_alumno_serializer.many(result_page)
         
         return paginator.get_paginated_response(data)
 
@@ -86,11 +100,8 @@ class AlumnosView(generics.CreateAPIView):
     def get(self, request, *args, **kwargs):
         alumno_id = request.GET.get("id")
         if alumno_id:
-            alumno = get_object_or_404(Alumnos, id=alumno_id)
+            alumno = get_object_or_404(Alumnos.objects.select_related('user'), id=alumno_id)
             alumno_data = AlumnoSerializer(alumno, many=False).data
-            alumno_data['first_name'] = alumno.user.first_name
-            alumno_data['last_name'] = alumno.user.last_name
-            alumno_data['email'] = alumno.user.email
             return Response(alumno_data, 200)
         return Response({"message": "Se requiere el ID del alumno"}, 400)
     
@@ -109,6 +120,11 @@ class AlumnosView(generics.CreateAPIView):
             if existing_user:
                 return Response({"message":"Username "+email+", is already taken"},400)
 
+            # La CURP está cifrada: se busca por su índice ciego
+            curp = request.data["curp"].upper()
+            if curp and Alumnos.objects.filter(**busqueda_exacta(Alumnos, 'curp', curp)).exists():
+                return Response({"message":"La CURP "+curp+" ya está registrada"},400)
+
             user = User.objects.create(
                 username=email,
                 email=email,
@@ -117,7 +133,7 @@ class AlumnosView(generics.CreateAPIView):
                 is_active=1
             )
             user.save()
-            user.set_password(password)
+            hashing_service.set_password(user, password)
             user.save()
 
             group, created = Group.objects.get_or_create(name=role)
@@ -127,7 +143,7 @@ class AlumnosView(generics.CreateAPIView):
             alumno = Alumnos.objects.create(
                 user=user,
                 matricula=request.data["matricula"],
-                curp=request.data["curp"].upper(),
+                curp=curp,
                 rfc=request.data["rfc"].upper(),
                 fecha_nacimiento=request.data["fecha_nacimiento"],
                 edad=request.data["edad"],
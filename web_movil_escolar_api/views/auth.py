@@ -7,6 +7,11 @@ from rest_framework import status
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
+from web_movil_escolar_api.token_cache import token_cache
+from web_movil_escolar_api.roles import get_user_role
+import logging
+
+logger = logging.getLogger(__name__)
 
 class CustomAuthToken(ObtainAuthToken):
 
@@ -17,15 +22,9 @@ class CustomAuthToken(ObtainAuthToken):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
         if user.is_active:
-            # Obtener perfil y roles del usuario
-            roles = user.groups.all()
-            role_names = []
-            # Verifico si el usuario tiene un perfil asociado
-            for role in roles:
-                role_names.append(role.name)
-
+            # Obtener el rol del usuario (cache de roles)
             #Si solo es un rol especifico asignamos el elemento 0
-            role_names = role_names[0]
+            role_names = get_user_role(user)
             
             #Esta función genera la clave dinámica (token) para iniciar sesión
             token, created = Token.objects.get_or_create(user=user)
@@ -62,12 +61,12 @@ class Logout(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
 
-        print("logout")
         user = request.user
-        print(str(user))
+        logger.debug("logout de %s", user)
         if user.is_active:
             token = Token.objects.get(user=user)
             token.delete()
+            token_cache.invalidate(token)
 
             return Response({'logout':True})
 
@@ -0,0 +1,121 @@
+from django.http import StreamingHttpResponse
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from web_movil_escolar_api.encrypted_fields import descifra_filas
+from web_movil_escolar_api.exporters import FORMATS, Column, attach_related, lookups
+from web_movil_escolar_api.models import MaestroMateria
+from web_movil_escolar_api.pagination import KeysetPagination
+from web_movil_escolar_api.roles import is_admin_user
+from .alumnos import AlumnosAll
+from .maestros import MaestrosAll
+from .materias import MateriasAll
+from .users import AdminAll
+
+
+def maestro_materias(ids):
+    return MaestroMateria.objects.filter(maestro_id__in=ids).order_by('id').values_list('maestro_id', 'nombre')
+
+
+# Pasos que agregan columnas `attached` a las filas de cada recurso
+ATTACH = {
+    'maestros': lambda rows: attach_related(rows, 'materias_json', maestro_materias),
+}
+
+# Columnas guardadas con EncryptedCharField: .values() las trae cifradas y
+# se descifran por bloque
+CIFRADOS = {
+    'alumnos': ('curp', 'rfc', 'telefono'),
+    'maestros': ('telefono', 'rfc'),
+    'admins': ('telefono', 'rfc'),
+}
+
+USER_COLUMNS = (
+    Column('id'),
+    Column('first_name', 'user__first_name'),
+    Column('last_name', 'user__last_name'),
+    Column('email', 'user__email'),
+)
+
+EXPORTS = {
+    'materias': (MateriasAll, (
+        Column('id'),
+        Column('nrc'),
+        Column('nombre_materia'),
+        Column('seccion'),
+        Column('dias'),
+        Column('hora_inicio'),
+        Column('hora_fin'),
+        Column('salon'),
+        Column('programa_educativo'),
+        Column('profesor_asignado', 'profesor_asignado_id'),
+        Column('creditos'),
+        Column('created_at'),
+        Column('updated_at'),
+    )),
+    'alumnos': (AlumnosAll, USER_COLUMNS + (
+        Column('matricula'),
+        Column('curp'),
+        Column('rfc'),
+        Column('fecha_nacimiento'),
+        Column('edad'),
+        Column('telefono'),
+        Column('ocupacion'),
+    )),
+    'maestros': (MaestrosAll, USER_COLUMNS + (
+        Column('id_trabajador'),
+        Column('fecha_nacimiento'),
+        Column('telefono'),
+        Column('rfc'),
+        Column('cubiculo'),
+        Column('edad'),
+        Column('area_investigacion'),
+        Column('materias_json', attached=True),
+    )),
+    'admins': (AdminAll, USER_COLUMNS + (
+        Column('clave_admin'),
+        Column('telefono'),
+        Column('rfc'),
+        Column('edad'),
+        Column('ocupacion'),
+    )),
+}
+
+
+class ExportarView(APIView):
+    """
+    Exporta el listado completo en CSV o JSON (?formato=csv|json) con los
+    mismos parámetros search, sort_by y sort_order de las vistas lista-*.
+
+    La respuesta se genera mientras se lee la base: las filas se consultan
+    por bloques con KeysetPagination.iterate() y se escriben por bloques, así
+    que la memoria no crece con el tamaño de la tabla.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    recurso = None
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        if not is_admin_user(request.user):
+            return Response({"error": "No tienes permisos para realizar esta acción"}, 403)
+
+        formato = request.GET.get('formato', 'csv')
+        if formato not in FORMATS:
+            return Response({"error": "El formato debe ser csv o json"}, 400)
+
+        list_view, columns = EXPORTS[self.recurso]
+        queryset, sort_field, descending = list_view().filter_queryset(request)
+
+        paginator = KeysetPagination()
+        paginator.sort_field = sort_field
+        paginator.descending = descending
+        rows = paginator.iterate(queryset.values(*lookups(columns, sort_field)), self.chunk_size)
+        if self.recurso in CIFRADOS:
+            rows = descifra_filas(rows, CIFRADOS[self.recurso])
+        if self.recurso in ATTACH:
+            rows = ATTACH[self.recurso](rows)
+
+        stream, content_type = FORMATS[formato]
+        response = StreamingHttpResponse(stream(rows, columns), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.recurso}.{formato}"'
+        return response
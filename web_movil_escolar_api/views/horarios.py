@@ -0,0 +1,99 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from web_movil_escolar_api.schedule import DIAS, SLOT_MINUTES, schedule_index
+from web_movil_escolar_api.timetables import get_timetable
+from .materias import parse_time_string
+
+
+def format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+class SalonesLibresView(APIView):
+    """Salones sin clases en un día y horario: ?dia=Martes&hora_inicio=10:00&hora_fin=12:00"""
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        dia = request.GET.get('dia')
+        hora_inicio = parse_time_string(request.GET.get('hora_inicio'))
+        hora_fin = parse_time_string(request.GET.get('hora_fin'))
+
+        if dia not in DIAS:
+            return Response({"error": f'Día inválido. Valores válidos: {", ".join(DIAS)}'}, 400)
+        if hora_inicio is None or hora_fin is None:
+            return Response({"error": "Se requieren hora_inicio y hora_fin con formato válido"}, 400)
+        if hora_inicio >= hora_fin:
+            return Response({"error": "La hora de fin debe ser mayor que la hora de inicio"}, 400)
+
+        salones = schedule_index.free_rooms(dia, hora_inicio, hora_fin)
+        return Response({
+            "dia": dia,
+            "hora_inicio": hora_inicio.strftime('%H:%M'),
+            "hora_fin": hora_fin.strftime('%H:%M'),
+            "salones": salones,
+        }, 200)
+
+
+class HorariosLibresView(APIView):
+    """
+    Horarios libres de un salón por día: ?salon=A-101 y opcionalmente
+    desde/hasta (por defecto 07:00 a 21:00) y duracion mínima en minutos.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        salon = request.GET.get('salon', '').strip()
+        desde = parse_time_string(request.GET.get('desde', '07:00'))
+        hasta = parse_time_string(request.GET.get('hasta', '21:00'))
+
+        if not salon:
+            return Response({"error": "Se requiere el parámetro 'salon'"}, 400)
+        if desde is None or hasta is None or desde >= hasta:
+            return Response({"error": "Rango de horas inválido"}, 400)
+        try:
+            duracion = int(request.GET.get('duracion', SLOT_MINUTES))
+        except ValueError:
+            return Response({"error": "La duración debe ser un número de minutos"}, 400)
+
+        libres = schedule_index.free_slots(salon, desde, hasta, max(duracion, SLOT_MINUTES))
+        return Response({
+            "salon": salon,
+            "dias": {
+                dia: [{"hora_inicio": format_minutes(start), "hora_fin": format_minutes(end)} for start, end in rangos]
+                for dia, rangos in libres.items()
+            },
+        }, 200)
+
+
+class HorarioView(APIView):
+    """
+    Horario semanal de un maestro (?maestro=<id>) o de un programa educativo
+    (?programa=<nombre>), leído de la proyección materializada en Horario.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        maestro = request.GET.get('maestro')
+        programa = request.GET.get('programa')
+
+        if maestro:
+            try:
+                clave = str(int(maestro))
+            except ValueError:
+                return Response({"error": "ID de maestro inválido"}, 400)
+            tipo = 'maestro'
+        elif programa:
+            tipo, clave = 'programa', programa
+        else:
+            return Response({"error": "Se requiere el parámetro 'maestro' o 'programa'"}, 400)
+
+        dias, actualizado = get_timetable(tipo, clave)
+        if tipo == 'maestro' and actualizado is None:
+            return Response({"error": "Maestro no encontrado"}, 404)
+        return Response({
+            "tipo": tipo,
+            "clave": clave,
+            "dias": dias,
+            "actualizado": actualizado,
+        }, 200)
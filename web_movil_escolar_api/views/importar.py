@@ -0,0 +1,48 @@
+from django.conf import settings
+from rest_framework import permissions
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from web_movil_escolar_api.hashing import import_hashing_service
+from web_movil_escolar_api.importers import FILE_ERRORS, UserImporter, count_rows, file_error_message, read_rows
+from web_movil_escolar_api.roles import is_admin_user
+
+
+class ImportarUsuariosView(APIView):
+    """
+    Importación masiva de alumnos o maestros desde un CSV o XLSX (campo `archivo`).
+
+    La importación corre dentro de la petición, así que se limita a
+    IMPORT_MAX_ROWS filas y cifra las contraseñas en import_hashing_service,
+    no en el pool de los logins; los archivos más grandes se importan con el
+    comando `python manage.py importar_usuarios`.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request, *args, **kwargs):
+        if not is_admin_user(request.user):
+            return Response({"error": "No tienes permisos para realizar esta acción"}, 403)
+
+        archivo = request.FILES.get('archivo')
+        rol = request.data.get('rol')
+        if not archivo:
+            return Response({"error": "Se requiere el archivo a importar"}, 400)
+        if rol not in UserImporter.profiles:
+            return Response({"error": "El rol debe ser alumno o maestro"}, 400)
+
+        max_rows = getattr(settings, 'IMPORT_MAX_ROWS', 100)
+        try:
+            if count_rows(archivo.file, archivo.name, max_rows) > max_rows:
+                return Response({
+                    "error": f"El archivo tiene más de {max_rows} filas. Para archivos grandes usa "
+                             f"el comando: python manage.py importar_usuarios <archivo> --rol {rol}"
+                }, 400)
+            importer = UserImporter(rol, hashing=import_hashing_service)
+            summary = importer.run(read_rows(archivo.file, archivo.name))
+        except FILE_ERRORS as e:
+            return Response({"error": file_error_message(e)}, 400)
+        except ValueError as e:
+            return Response({"error": str(e)}, 400)
+
+        return Response(summary, 200)
@@ -9,9 +9,15 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth.models import Group
-import json
 from django.shortcuts import get_object_or_404
 from rest_framework.pagination import PageNumberPagination
+from web_movil_escolar_api.pagination import KeysetPagination
+from web_movil_escolar_api.versions import conditional_get
+from web_movil_escolar_api.response_cache import cached_list
+from web_movil_escolar_api.fast_serializers import fast_maestro_serializer
+from web_movil_escolar_api.hashing import hashing_service
+from web_movil_escolar_api.search_index import maestros_index
+from web_movil_escolar_api.roles import get_user_role
 
 class MaestroPagination(PageNumberPagination):
     page_size = 10
@@ -21,66 +27,71 @@ class MaestroPagination(PageNumberPagination):
 class MaestrosAll(APIView):
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = MaestroPagination
+    cursor_pagination_class = KeysetPagination
     
-    def get(self, request, *args, **kwargs):
+    # Mapear campos de ordenamiento CORREGIDO
+    sort_mapping = {
+        'id': 'id',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'email': 'user__email',
+        'id_trabajador': 'id_trabajador'
+    }
+    
+    def filter_queryset(self, request):
+        """Aplica search, sort_by y sort_order; regresa (queryset, campo de orden, descendente)"""
         # Obtener parámetros de búsqueda y ordenamiento
         search = request.GET.get('search', '')
         sort_by = request.GET.get('sort_by', 'id')
         sort_order = request.GET.get('sort_order', 'asc')
-        page_size = request.GET.get('page_size', 10)
         
         # Construir queryset base
-        maestros = Maestros.objects.filter(user__is_active=1)
+        maestros = Maestros.objects.filter(user__is_active=1).select_related('user')
+        
+        # Filtrar por materia que imparte (?materia=, índice en MaestroMateria.nombre)
+        materia = request.GET.get('materia', '').strip()
+        if materia:
+            maestros = maestros.filter(materias_impartibles__nombre=materia)
         
-        # Aplicar filtro de búsqueda
+        # Aplicar filtro de búsqueda (índice de trigramas; LIKE si el término es corto)
         if search:
-            maestros = maestros.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(id_trabajador__icontains=search) |
-                Q(user__email__icontains=search)
-            )
+            ids = maestros_index.search(search)
+            if ids is not None:
+                maestros = maestros.filter(id__in=ids)
+            else:
+                maestros = maestros.filter(
+                    Q(user__first_name__icontains=search) |
+                    Q(user__last_name__icontains=search) |
+                    Q(id_trabajador__icontains=search) |
+                    Q(user__email__icontains=search)
+                )
         
         # Aplicar ordenamiento
-        if sort_order == 'desc':
-            sort_by = f'-{sort_by}'
-        
-        # Mapear campos de ordenamiento CORREGIDO
-        sort_mapping = {
-            'id': 'id',
-            'first_name': 'user__first_name',
-            'last_name': 'user__last_name',
-            'email': 'user__email',
-            'id_trabajador': 'id_trabajador'
-        }
-        
-        sort_field = sort_mapping.get(sort_by, 'id')
-        maestros = maestros.order_by(sort_field)
-        
-        # Paginación
-        paginator = self.pagination_class()
-        paginator.page_size = page_size
+        sort_field = self.sort_mapping.get(sort_by, 'id')
+        descending = sort_order == 'desc'
+
+        return maestros, sort_field, descending
+
+    @conditional_get('maestros')
+    @cached_list('maestros')
+    def get(self, request, *args, **kwargs):
+        page_size = request.GET.get('page_size', 10)
+        maestros, sort_field, descending = self.filter_queryset(request)
+        maestros = maestros.prefetch_related('materias_impartibles')
+        
+        # Paginación: por cursor si se envía ?cursor=, por número de página en otro caso
+        if KeysetPagination.cursor_query_param in request.GET:
+            paginator = self.cursor_pagination_class()
+            paginator.sort_field = sort_field
+            paginator.descending = descending
+        else:
+            maestros = maestros.order_by(f'-{sort_field}' if descending else sort_field)
+            paginator = self.pagination_class()
+            paginator.page_size = page_size
         result_page = paginator.paginate_queryset(maestros, request, view=self)
         
-        # Serializar datos
-        serializer = MaestroSerializer(result_page, many=True)
-        
-        # Agregar datos del usuario y procesar materias_json
-        data = []
-        for maestro_data in serializer.data:
-            maestro_obj = Maestros.objects.get(id=maestro_data['id'])
-            maestro_data['first_name'] = maestro_obj.user.first_name
-            maestro_data['last_name'] = maestro_obj.user.last_name
-            maestro_data['email'] = maestro_obj.user.email
-            
-            # Procesar materias_json
-            if isinstance(maestro_data, dict) and "materias_json" in maestro_data:
-                try:
-                    maestro_data["materias_json"] = json.loads(maestro_data["materias_json"])
-                except Exception:
-                    maestro_data["materias_json"] = []
-            
-            data.append(maestro_data)
+        # Serializar datos (mismo JSON que MaestroSerializer; materias_json sale de la relación precargada)
+        data = fast_maestro_serializer.many(result_page)
         
         return paginator.get_paginated_response(data)
 
@@ -95,18 +106,8 @@ class MaestrosView(generics.CreateAPIView):
     def get(self, request, *args, **kwargs):
         maestro_id = request.GET.get("id")
         if maestro_id:
-            maestro = get_object_or_404(Maestros, id=maestro_id)
+            maestro = get_object_or_404(Maestros.objects.select_related('user').prefetch_related('materias_impartibles'), id=maestro_id)
             maestro_data = MaestroSerializer(maestro, many=False).data
-            maestro_data['first_name'] = maestro.user.first_name
-            maestro_data['last_name'] = maestro.user.last_name
-            maestro_data['email'] = maestro.user.email
-            
-            # Procesar materias_json
-            if isinstance(maestro_data, dict) and "materias_json" in maestro_data:
-                try:
-                    maestro_data["materias_json"] = json.loads(maestro_data["materias_json"])
-                except Exception:
-                    maestro_data["materias_json"] = []
             
             return Response(maestro_data, 200)
         return Response({"message": "Se requiere el ID del maestro"}, 400)
@@ -134,7 +135,7 @@ class MaestrosView(generics.CreateAPIView):
                 is_active=1
             )
             user.save()
-            user.set_password(password)
+            hashing_service.set_password(user, password)
             user.save()
 
             group, created = Group.objects.get_or_create(name=role)
@@ -148,10 +149,10 @@ class MaestrosView(generics.CreateAPIView):
                 telefono=request.data["telefono"],
                 rfc=request.data["rfc"].upper(),
                 cubiculo=request.data["cubiculo"],
-                area_investigacion=request.data["area_investigacion"],
-                materias_json=json.dumps(request.data["materias_json"])
+                area_investigacion=request.data["area_investigacion"]
             )
             maestro.save()
+            MaestroMateria.replace_for(maestro, request.data["materias_json"])
 
             return Response({"maestro_created_id": maestro.id}, 201)
 
@@ -167,7 +168,7 @@ class MaestrosView(generics.CreateAPIView):
         maestro = get_object_or_404(Maestros, id=maestro_id)
         
         # Verificar permisos: maestro solo puede editar su propio perfil
-        user_rol = request.user.groups.first().name if request.user.groups.exists() else None
+        user_rol = get_user_role(request.user)
         
         if user_rol == 'maestro' and request.user.id != maestro.user.id:
             return Response({"message": "No tienes permisos para editar otros maestros"}, 403)
@@ -179,8 +180,9 @@ class MaestrosView(generics.CreateAPIView):
         maestro.rfc = request.data.get("rfc", maestro.rfc).upper()
         maestro.cubiculo = request.data.get("cubiculo", maestro.cubiculo)
         maestro.area_investigacion = request.data.get("area_investigacion", maestro.area_investigacion)
-        maestro.materias_json = json.dumps(request.data.get("materias_json", []))
         maestro.save()
+        if "materias_json" in request.data:
+            MaestroMateria.replace_for(maestro, request.data["materias_json"])
         
         user = maestro.user
         user.first_name = request.data.get("first_name", user.first_name)
@@ -200,7 +202,7 @@ class MaestrosView(generics.CreateAPIView):
         maestro = get_object_or_404(Maestros, id=maestro_id)
         
         # Verificar permisos: maestro solo puede eliminar su propio perfil
-        user_rol = request.user.groups.first().name if request.user.groups.exists() else None
+        user_rol = get_user_role(request.user)
         
         if user_rol == 'maestro' and request.user.id != maestro.user.id:
             return Response({"message": "No tienes permisos para eliminar otros maestros"}, 403)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db.models import Q
 from django.db import transaction
 from web_movil_escolar_api.serializers import *
@@ -10,6 +11,15 @@ from rest_framework.views import APIView
 from django.contrib.auth.models import Group
 from django.shortcuts import get_object_or_404
 from rest_framework.pagination import PageNumberPagination
+from web_movil_escolar_api.pagination import KeysetPagination
+from web_movil_escolar_api.versions import conditional_get
+from web_movil_escolar_api.response_cache import cached_list
+from web_movil_escolar_api.fast_serializers import fast_materia_serializer
+from web_movil_escolar_api.search_index import materias_index
+from web_movil_escolar_api.roles import is_admin_user
+from django.utils import timezone
+from web_movil_escolar_api.signals import materias_bulk_saved
+from web_movil_escolar_api.schedule import Schedule, load_schedule, schedule_index
 from datetime import datetime
 import re
 import json
@@ -24,47 +34,62 @@ class MateriaPagination(PageNumberPagination):
 class MateriasAll(APIView):
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = MateriaPagination
+    cursor_pagination_class = KeysetPagination
     
-    def get(self, request, *args, **kwargs):
+    sort_mapping = {
+        'id': 'id',
+        'nrc': 'nrc',
+        'nombre_materia': 'nombre_materia',
+        'seccion': 'seccion',
+        'salon': 'salon',
+    }
+    
+    def filter_queryset(self, request):
+        """Aplica search, sort_by y sort_order; regresa (queryset, campo de orden, descendente)"""
         search = request.GET.get('search', '')
         sort_by = request.GET.get('sort_by', 'id')
         sort_order = request.GET.get('sort_order', 'asc')
-        page_size = request.GET.get('page_size', 10)
         
         materias = Materia.objects.all().select_related('profesor_asignado')
         
+        # Aplicar filtro de búsqueda (índice de trigramas; LIKE si el término es corto)
         if search:
-            materias = materias.filter(
-                Q(nrc__icontains=search) |
-                Q(nombre_materia__icontains=search) |
-                Q(salon__icontains=search)
-            )
-        
-        sort_mapping = {
-            'id': 'id',
-            'nrc': 'nrc',
-            'nombre_materia': 'nombre_materia',
-            'seccion': 'seccion',
-            'salon': 'salon',
-        }
-        
-        sort_field = sort_mapping.get(sort_by, 'id')
-        if sort_order == 'desc':
-            sort_field = f'-{sort_field}'
+            ids = materias_index.search(search)
+            if ids is not None:
+                materias = materias.filter(id__in=ids)
+            else:
+                materias = materias.filter(
+                    Q(nrc__icontains=search) |
+                    Q(nombre_materia__icontains=search) |
+                    Q(salon__icontains=search)
+                )
         
-        materias = materias.order_by(sort_field)
+        sort_field = self.sort_mapping.get(sort_by, 'id')
+        descending = sort_order == 'desc'
+
+        return materias, sort_field, descending
+
+    @conditional_get('materias')
+    @cached_list('materias')
+    def get(self, request, *args, **kwargs):
+        page_size = request.GET.get('page_size', 10)
+        materias, sort_field, descending = self.filter_queryset(request)
         
-        paginator = self.pagination_class()
-        paginator.page_size = page_size
+        # Paginación: por cursor si se envía ?cursor=, por número de página en otro caso
+        if KeysetPagination.cursor_query_param in request.GET:
+            paginator = self.cursor_pagination_class()
+            paginator.sort_field = sort_field
+            paginator.descending = descending
+        else:
+            materias = materias.order_by(f'-{sort_field}' if descending else sort_field)
+            paginator = self.pagination_class()
+            paginator.page_size = page_size
         result_page = paginator.paginate_queryset(materias, request)
         
-        serializer = MateriaSerializer(result_page, many=True)
+        # Serializar datos (mismo JSON que MateriaSerializer, ver fast_serializers.py)
+        data = fast_materia_serializer.many(result_page)
         
-        return paginator.get_paginated_response(serializer.data)
-
-
-def is_admin_user(user):
-    return user.groups.filter(name='administrador').exists()
+        return paginator.get_paginated_response(data)
 
 
 def parse_time_string(time_str):
@@ -108,8 +133,22 @@ def parse_time_string(time_str):
             return None
 
 
-def validate_materia_data(data, exclude_id=None):
-    """Valida los datos de materia"""
+def validate_materia_data(data, exclude_id=None, nrc_owners=None, profesor_ids=None, schedule_exclude=None, saved_schedule=None):
+    """
+    Valida los datos de materia.
+
+    Para validar lotes sin una consulta por materia se pueden pasar
+    `nrc_owners` (NRC -> id de la materia que lo tiene) y `profesor_ids`
+    (ids de maestros existentes) ya consultados con un solo `__in`.
+
+    También revisa que el salón y el profesor no estén ocupados en los mismos
+    días y horas. La revisión se hace con una consulta acotada al salón, al
+    profesor y al horario (load_schedule); el índice de horarios en memoria
+    solo agrega candidatos. En lotes se pasa `saved_schedule`, ya leído con
+    una sola consulta para todo el lote. `schedule_exclude` son los ids de
+    materias que no cuentan como traslape (por defecto la propia materia al
+    editar).
+    """
     errors = {}
     
     nrc = data.get('nrc', '')
@@ -117,6 +156,10 @@ def validate_materia_data(data, exclude_id=None):
         errors['nrc'] = 'El NRC es requerido'
     elif not re.match(r'^\d{6}$', str(nrc)):
         errors['nrc'] = 'El NRC debe ser exactamente 6 dígitos numéricos'
+    elif nrc_owners is not None:
+        owner = nrc_owners.get(str(nrc))
+        if owner is not None and owner != exclude_id:
+            errors['nrc'] = 'NRC ya existe en la base de datos'
     else:
         try:
             query = Materia.objects.filter(nrc=nrc)
@@ -193,7 +236,11 @@ def validate_materia_data(data, exclude_id=None):
     if profesor_id is not None and profesor_id != '':
         try:
             profesor_id_int = int(profesor_id)
-            if not Maestros.objects.filter(id=profesor_id_int).exists():
+            if profesor_ids is not None:
+                exists = profesor_id_int in profesor_ids
+            else:
+                exists = Maestros.objects.filter(id=profesor_id_int).exists()
+            if not exists:
                 errors['profesor_asignado'] = 'El profesor asignado no existe'
         except (ValueError, TypeError):
             if profesor_id != '':
@@ -203,12 +250,64 @@ def validate_materia_data(data, exclude_id=None):
     if not creditos:
         errors['creditos'] = 'Los créditos son requeridos'
     
+    # Traslapes de horario, solo si días, horas, salón y profesor son válidos
+    if not errors.keys() & {'dias', 'hora_inicio', 'hora_fin', 'salon', 'profesor_asignado'}:
+        if schedule_exclude is None:
+            schedule_exclude = {exclude_id} if exclude_id else set()
+        if saved_schedule is None:
+            candidates = schedule_index.candidates(dias, hora_inicio, hora_fin, salon=salon,
+                                                   profesor_id=profesor_id, exclude=schedule_exclude)
+            saved_schedule = load_schedule([salon], [profesor_id], candidates, hora_inicio, hora_fin)
+        conflicts = saved_schedule.conflicts(dias, hora_inicio, hora_fin, salon=salon,
+                                             profesor_id=profesor_id, exclude=schedule_exclude)
+        errors.update(schedule_errors(conflicts))
+    
     return errors
 
 
+def schedule_errors(conflicts, describe=None):
+    """Mensajes de error para el resultado de Schedule.conflicts()"""
+    describe = describe or (lambda materia_id, nrc: f'NRC {nrc}')
+    errors = {}
+    if conflicts['salon']:
+        materia_id, nrc, dia = conflicts['salon'][0]
+        errors['salon'] = f'El salón ya está ocupado el {dia} en ese horario ({describe(materia_id, nrc)})'
+    if conflicts['profesor']:
+        materia_id, nrc, dia = conflicts['profesor'][0]
+        errors['profesor_asignado'] = f'El profesor ya tiene otra materia el {dia} en ese horario ({describe(materia_id, nrc)})'
+    return errors
+
+
+def parse_dias(dias):
+    """Acepta la lista de días como lista, JSON o texto separado por comas"""
+    if isinstance(dias, str):
+        try:
+            dias = json.loads(dias)
+        except json.JSONDecodeError:
+            dias = [d.strip() for d in dias.split(',') if d.strip()]
+    return dias
+
+
+def fill_materia(materia, data):
+    """Asigna a `materia` los campos ya validados de `data`"""
+    materia.nrc = data['nrc']
+    materia.nombre_materia = data['nombre_materia']
+    materia.seccion = data['seccion']
+    materia.dias = parse_dias(data['dias'])
+    materia.hora_inicio = parse_time_string(data['hora_inicio'])
+    materia.hora_fin = parse_time_string(data['hora_fin'])
+    materia.salon = data['salon']
+    materia.programa_educativo = data['programa_educativo']
+    profesor_id = data.get('profesor_asignado')
+    materia.profesor_asignado_id = int(profesor_id) if profesor_id not in (None, '') else None
+    materia.creditos = data['creditos']
+    return materia
+
+
 class MateriasView(generics.CreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     
+    @conditional_get('materias')
     def get(self, request, *args, **kwargs):
         materia_id = request.GET.get("id")
         if materia_id:
@@ -359,4 +458,220 @@ class VerificarNRCView(APIView):
             exists = query.exists()
             return Response({"exists": exists}, 200)
         except Exception:
-            return Response({"exists": False}, 200)
\ No newline at end of file
+            return Response({"exists": False}, 200)
+
+
+class MateriasBulkView(APIView):
+    """
+    Alta, edición y borrado de muchas materias en una sola petición (a lo
+    más MATERIAS_BULK_MAX por lote).
+
+    Todo el lote se valida con consultas por conjunto (un `nrc__in` y un
+    `id__in` de profesores) y se escribe con bulk_create/bulk_update en una
+    sola transacción. Si alguna materia tiene errores no se escribe nada y se
+    regresan los errores de cada elemento con su índice en el arreglo.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    fields = ['nrc', 'nombre_materia', 'seccion', 'dias', 'hora_inicio', 'hora_fin',
+              'salon', 'programa_educativo', 'profesor_asignado', 'creditos']
+
+    def get_items(self, request):
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('materias')
+        if not isinstance(items, list) or not items:
+            return None
+        return items
+
+    def too_many(self, items):
+        """Respuesta 400 si el lote supera MATERIAS_BULK_MAX, o None"""
+        max_items = getattr(settings, 'MATERIAS_BULK_MAX', 500)
+        if len(items) > max_items:
+            return Response({"error": f"El lote no puede tener más de {max_items} materias"}, 400)
+        return None
+
+    def validate_items(self, items, updating=False):
+        """Valida el lote; regresa (errores por elemento, materias existentes por id)"""
+        errors = []
+        existing = {}
+
+        if updating:
+            ids = set()
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    ids.add(int(item.get('id')))
+                except (TypeError, ValueError):
+                    errors.append({"index": index, "error": {"id": "ID de materia inválido"}})
+            existing = Materia.objects.in_bulk(ids)
+
+        nrcs = {str(item.get('nrc')) for item in items if isinstance(item, dict) and item.get('nrc')}
+        nrc_owners = dict(Materia.objects.filter(nrc__in=nrcs).values_list('nrc', 'id'))
+
+        profesores = set()
+        for item in items:
+            if isinstance(item, dict):
+                try:
+                    profesores.add(int(item.get('profesor_asignado')))
+                except (TypeError, ValueError):
+                    pass
+        profesor_ids = set(Maestros.objects.filter(id__in=profesores).values_list('id', flat=True))
+
+        # Materias guardadas en los salones y con los profesores del lote, más
+        # los candidatos del índice: una sola consulta para revisar traslapes
+        candidates = set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                dias = parse_dias(item.get('dias'))
+                hora_inicio = parse_time_string(item.get('hora_inicio'))
+                hora_fin = parse_time_string(item.get('hora_fin'))
+                if isinstance(dias, list) and hora_inicio and hora_fin and hora_inicio < hora_fin:
+                    candidates |= schedule_index.candidates(dias, hora_inicio, hora_fin, salon=item.get('salon'),
+                                                            profesor_id=item.get('profesor_asignado'))
+            except (TypeError, ValueError):
+                # Los errores de formato se reportan en validate_materia_data
+                pass
+        saved_schedule = load_schedule(
+            [item.get('salon') for item in items if isinstance(item, dict)], profesor_ids, candidates,
+        )
+
+        seen_nrcs = {}
+        seen_ids = {}
+        # Horarios del propio lote, para detectar traslapes entre sus elementos;
+        # las materias que se editan no cuentan con su horario anterior
+        batch = Schedule()
+        schedule_exclude = set(existing)
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({"index": index, "error": {"general": "Cada materia debe ser un objeto"}})
+                continue
+
+            exclude_id = None
+            if updating:
+                try:
+                    exclude_id = int(item.get('id'))
+                except (TypeError, ValueError):
+                    continue
+                if exclude_id not in existing:
+                    errors.append({"index": index, "error": {"id": "Materia no encontrada"}})
+                    continue
+                if exclude_id in seen_ids:
+                    errors.append({"index": index, "error": {"id": f"ID repetido en el lote (elemento {seen_ids[exclude_id]})"}})
+                    continue
+                seen_ids[exclude_id] = index
+
+            item_errors = validate_materia_data(item, exclude_id=exclude_id, nrc_owners=nrc_owners,
+                                                profesor_ids=profesor_ids, schedule_exclude=schedule_exclude,
+                                                saved_schedule=saved_schedule)
+            nrc = str(item.get('nrc', ''))
+            if 'nrc' not in item_errors and nrc in seen_nrcs:
+                item_errors['nrc'] = f'NRC repetido en el lote (elemento {seen_nrcs[nrc]})'
+            seen_nrcs.setdefault(nrc, index)
+
+            if not item_errors:
+                # En el lote cada elemento se identifica con -(índice + 1)
+                dias = parse_dias(item['dias'])
+                hora_inicio = parse_time_string(item['hora_inicio'])
+                hora_fin = parse_time_string(item['hora_fin'])
+                conflicts = batch.conflicts(dias, hora_inicio, hora_fin, salon=item['salon'],
+                                            profesor_id=item.get('profesor_asignado'))
+                item_errors = schedule_errors(conflicts, lambda materia_id, nrc: f'elemento {-materia_id - 1} del lote')
+                batch.add(-(index + 1), nrc, item['salon'], item.get('profesor_asignado'), dias, hora_inicio, hora_fin)
+
+            if item_errors:
+                errors.append({"index": index, "error": item_errors})
+
+        errors.sort(key=lambda e: e["index"])
+        return errors, existing
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        if not is_admin_user(request.user):
+            return Response({"error": "No tienes permisos para realizar esta acción"}, 403)
+
+        items = self.get_items(request)
+        if items is None:
+            return Response({"error": "Se requiere un arreglo de materias"}, 400)
+        too_many = self.too_many(items)
+        if too_many is not None:
+            return too_many
+
+        errors, _ = self.validate_items(items)
+        if errors:
+            return Response({"error": errors}, 400)
+
+        materias = [fill_materia(Materia(), item) for item in items]
+        Materia.objects.bulk_create(materias, batch_size=500)
+
+        # MySQL no regresa los ids de bulk_create: se leen por NRC
+        created = list(Materia.objects.filter(nrc__in=[m.nrc for m in materias]).order_by('id'))
+        materias_bulk_saved.send(sender=Materia, ids=[m.id for m in created], instances=created)
+        serializer = MateriaSerializer(created, many=True)
+        return Response({"created": len(materias), "materias": serializer.data}, 201)
+
+    @transaction.atomic
+    def put(self, request, *args, **kwargs):
+        if not is_admin_user(request.user):
+            return Response({"error": "No tienes permisos para realizar esta acción"}, 403)
+
+        items = self.get_items(request)
+        if items is None:
+            return Response({"error": "Se requiere un arreglo de materias"}, 400)
+        too_many = self.too_many(items)
+        if too_many is not None:
+            return too_many
+
+        errors, existing = self.validate_items(items, updating=True)
+        if errors:
+            return Response({"error": errors}, 400)
+
+        materias = []
+        for item in items:
+            materia = fill_materia(existing[int(item['id'])], item)
+            materia.updated_at = timezone.now()
+            materias.append(materia)
+        fields = [f if f != 'profesor_asignado' else 'profesor_asignado_id' for f in self.fields]
+        Materia.objects.bulk_update(materias, fields + ['updated_at'], batch_size=500)
+
+        materias_bulk_saved.send(sender=Materia, ids=[m.id for m in materias], instances=materias)
+        serializer = MateriaSerializer(materias, many=True)
+        return Response({"updated": len(materias), "materias": serializer.data}, 200)
+
+    @transaction.atomic
+    def delete(self, request, *args, **kwargs):
+        if not is_admin_user(request.user):
+            return Response({"error": "No tienes permisos para realizar esta acción"}, 403)
+
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if ids is None and request.GET.get('ids'):
+            ids = request.GET.get('ids').split(',')
+        if not ids:
+            return Response({"error": "Se requiere la lista de IDs de materias"}, 400)
+        too_many = self.too_many(ids)
+        if too_many is not None:
+            return too_many
+
+        errors = []
+        valid_ids = []
+        for index, materia_id in enumerate(ids):
+            try:
+                valid_ids.append(int(materia_id))
+            except (TypeError, ValueError):
+                errors.append({"index": index, "error": {"id": "ID de materia inválido"}})
+        found = set(Materia.objects.filter(id__in=valid_ids).values_list('id', flat=True))
+        for index, materia_id in enumerate(ids):
+            try:
+                if int(materia_id) not in found:
+                    errors.append({"index": index, "error": {"id": "Materia no encontrada"}})
+            except (TypeError, ValueError):
+                pass
+        if errors:
+            errors.sort(key=lambda e: e["index"])
+            return Response({"error": errors}, 400)
+
+        # Solo materias: el total de delete() también suma lo borrado en cascada
+        _, deleted = Materia.objects.filter(id__in=valid_ids).delete()
+        return Response({"deleted": deleted.get(Materia._meta.label, 0)}, 200)
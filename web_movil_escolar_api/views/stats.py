@@ -0,0 +1,27 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from web_movil_escolar_api.cache_utils import all_stats
+from web_movil_escolar_api.db import pool as db_pool
+from web_movil_escolar_api.hashing import hashing_service
+from web_movil_escolar_api.puentes.mail import mail_queue
+from web_movil_escolar_api.image_urls import image_url_validator
+from web_movil_escolar_api.response_cache import list_cache
+from web_movil_escolar_api.roles import is_admin_user
+
+
+class CacheStatsView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        # Estadísticas de los caches y pools de este proceso (solo administradores)
+        if not is_admin_user(request.user):
+            return Response({"error": "No tienes permisos para realizar esta acción"}, 403)
+        return Response({
+            "caches": all_stats(),
+            "password_hashing": hashing_service.stats(),
+            "list_cache": list_cache.stats(),
+            "db_pools": db_pool.all_stats(),
+            "mail_queue": mail_queue.stats(),
+            "image_urls": image_url_validator.stats(),
+        }, 200)
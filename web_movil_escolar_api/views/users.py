@@ -12,6 +12,15 @@ from django.contrib.auth.models import Group
 from django.shortcuts import get_object_or_404
 import json
 from rest_framework.pagination import PageNumberPagination
+from web_movil_escolar_api.pagination import KeysetPagination
+from web_movil_escolar_api.versions import conditional_get
+from web_movil_escolar_api.response_cache import cached_list
+from web_movil_escolar_api.fast_serializers import fast_admin_serializer
+from web_movil_escolar_api.hashing import hashing_service
+from web_movil_escolar_api.search_index import admins_index
+from web_movil_escolar_api import counters
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 
 class AdminPagination(PageNumberPagination):
     page_size = 10
@@ -21,58 +30,65 @@ class AdminPagination(PageNumberPagination):
 class AdminAll(APIView):
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = AdminPagination
+    cursor_pagination_class = KeysetPagination
     
-    def get(self, request, *args, **kwargs):
+    # Mapear campos de ordenamiento CORREGIDO
+    sort_mapping = {
+        'id': 'id',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'email': 'user__email',
+        'clave_admin': 'clave_admin'
+    }
+    
+    def filter_queryset(self, request):
+        """Aplica search, sort_by y sort_order; regresa (queryset, campo de orden, descendente)"""
         # Obtener parámetros de búsqueda y ordenamiento
         search = request.GET.get('search', '')
         sort_by = request.GET.get('sort_by', 'id')
         sort_order = request.GET.get('sort_order', 'asc')
-        page_size = request.GET.get('page_size', 10)
         
         # Construir queryset base
-        admins = Administradores.objects.filter(user__is_active=1)
+        admins = Administradores.objects.filter(user__is_active=1).select_related('user')
         
-        # Aplicar filtro de búsqueda
+        # Aplicar filtro de búsqueda (índice de trigramas; LIKE si el término es corto)
         if search:
-            admins = admins.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(clave_admin__icontains=search) |
-                Q(user__email__icontains=search)
-            )
+            ids = admins_index.search(search)
+            if ids is not None:
+                admins = admins.filter(id__in=ids)
+            else:
+                admins = admins.filter(
+                    Q(user__first_name__icontains=search) |
+                    Q(user__last_name__icontains=search) |
+                    Q(clave_admin__icontains=search) |
+                    Q(user__email__icontains=search)
+                )
         
         # Aplicar ordenamiento
-        if sort_order == 'desc':
-            sort_by = f'-{sort_by}'
-        
-        # Mapear campos de ordenamiento CORREGIDO
-        sort_mapping = {
-            'id': 'id',
-            'first_name': 'user__first_name',
-            'last_name': 'user__last_name',
-            'email': 'user__email',
-            'clave_admin': 'clave_admin'
-        }
-        
-        sort_field = sort_mapping.get(sort_by, 'id')
-        admins = admins.order_by(sort_field)
-        
-        # Paginación
-        paginator = self.pagination_class()
-        paginator.page_size = page_size
+        sort_field = self.sort_mapping.get(sort_by, 'id')
+        descending = sort_order == 'desc'
+
+        return admins, sort_field, descending
+
+    @conditional_get('admins')
+    @cached_list('admins')
+    def get(self, request, *args, **kwargs):
+        page_size = request.GET.get('page_size', 10)
+        admins, sort_field, descending = self.filter_queryset(request)
+        
+        # Paginación: por cursor si se envía ?cursor=, por número de página en otro caso
+        if KeysetPagination.cursor_query_param in request.GET:
+            paginator = self.cursor_pagination_class()
+            paginator.sort_field = sort_field
+            paginator.descending = descending
+        else:
+            admins = admins.order_by(f'-{sort_field}' if descending else sort_field)
+            paginator = self.pagination_class()
+            paginator.page_size = page_size
         result_page = paginator.paginate_queryset(admins, request, view=self)
         
-        # Serializar datos
-        serializer = AdminSerializer(result_page, many=True)
-        
-        # Agregar datos del usuario a cada admin
-        data = []
-        for admin_data in serializer.data:
-            admin_obj = Administradores.objects.get(id=admin_data['id'])
-            admin_data['first_name'] = admin_obj.user.first_name
-            admin_data['last_name'] = admin_obj.user.last_name
-            admin_data['email'] = admin_obj.user.email
-            data.append(admin_data)
+        # Serializar datos (mismo JSON que AdminSerializer, con first_name, last_name y email)
+        data = fast_admin_serializer.many(result_page)
         
         return paginator.get_paginated_response(data)
 
@@ -85,12 +101,8 @@ class AdminView(generics.CreateAPIView):
     
     #Obtener usuario por ID
     def get(self, request, *args, **kwargs):
-        admin = get_object_or_404(Administradores, id = request.GET.get("id"))
+        admin = get_object_or_404(Administradores.objects.select_related('user'), id = request.GET.get("id"))
         admin_data = AdminSerializer(admin, many=False).data
-        # Agregar datos del usuario
-        admin_data['first_name'] = admin.user.first_name
-        admin_data['last_name'] = admin.user.last_name
-        admin_data['email'] = admin.user.email
         # Si todo es correcto, regresamos la información
         return Response(admin_data, 200)
     
@@ -122,7 +134,7 @@ class AdminView(generics.CreateAPIView):
 
             user.save()
             #Cifrar la contraseña
-            user.set_password(password)
+            hashing_service.set_password(user, password)
             user.save()
 
             group, created = Group.objects.get_or_create(name=role)
@@ -169,7 +181,7 @@ class AdminView(generics.CreateAPIView):
         # Si se proporcionó password, la actualizamos
         password = request.data.get("password")
         if password:
-            user.set_password(password)
+            hashing_service.set_password(user, password)
         
         user.save()
         
@@ -190,26 +202,18 @@ class AdminView(generics.CreateAPIView):
 
 class TotalUsers(APIView):
     permission_classes = (permissions.IsAuthenticated,)
-    
-    def get(self, request, *args, **kwargs):
-        # TOTAL ADMINISTRADORES
-        admin_qs = Administradores.objects.filter(user__is_active=True)
-        total_admins = admin_qs.count()
-
-        # TOTAL MAESTROS
-        maestros_qs = Maestros.objects.filter(user__is_active=True)
-        total_maestros = maestros_qs.count()
 
-        # TOTAL ALUMNOS
-        alumnos_qs = Alumnos.objects.filter(user__is_active=True)
-        total_alumnos = alumnos_qs.count()
-
-        # Respuesta final SIEMPRE válida
+    # Totales de administradores, maestros y alumnos activos, desde la tabla
+    # de contadores (mantenida por señales), no con COUNT(*). condition()
+    # responde 304 según If-None-Match (listas de ETags, W/ y *)
+    @method_decorator(condition(etag_func=lambda request, *args, **kwargs: counters.etag_for(counters.request_totals(request))))
+    def get(self, request, *args, **kwargs):
+        totals = counters.request_totals(request)
         return Response(
             {
-                "admins": total_admins,
-                "maestros": total_maestros,
-                "alumnos": total_alumnos
+                "admins": totals["admins"],
+                "maestros": totals["maestros"],
+                "alumnos": totals["alumnos"]
             },
             status=200
         )
\ No newline at end of file